@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Cold start budget for importing the app, in milliseconds
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "800"))
+
+
+def measure_import(module: str) -> dict:
+    """
+    Import a module in a fresh interpreter with -X importtime
+
+    Returns:
+        Cumulative import time in microseconds of every imported module
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            # Keep the first (outermost) entry of modules imported several times
+            timings.setdefault(name.strip(), int(cumulative))
+    return timings
+
+
+def run(module: str, runs: int, top: int) -> dict:
+    """Measure the cold import of a module, returning a summary"""
+    # The first run compiles the bytecode, it is not representative
+    measure_import(module)
+    samples = [measure_import(module) for _ in range(runs)]
+
+    totals = [timings[module] / 1000 for timings in samples]
+    heaviest = sorted(
+        (
+            (name, statistics.median(timings.get(name, 0) for timings in samples))
+            for name in samples[0]
+            if name != module and "." not in name
+        ),
+        key=lambda entry: entry[1],
+        reverse=True,
+    )[:top]
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": round(statistics.median(totals), 1),
+        "min_ms": round(min(totals), 1),
+        "max_ms": round(max(totals), 1),
+        "budget_ms": IMPORT_TIME_BUDGET_MS,
+        "top_packages_ms": {name: round(us / 1000, 1) for name, us in heaviest},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the cold import time of the app against a budget"
+    )
+    # src.app defers importing the routes to create_app(), after load_config()
+    parser.add_argument("--module", default="src.api.routes", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Number of imports")
+    parser.add_argument("--top", type=int, default=10, help="Packages to list")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    summary = run(args.module, args.runs, args.top)
+    print(
+        f"import {summary['module']}: median {summary['median_ms']} ms "
+        f"(min {summary['min_ms']}, max {summary['max_ms']}, "
+        f"budget {summary['budget_ms']:.0f} ms)"
+    )
+    for name, ms in summary["top_packages_ms"].items():
+        print(f"  {name:<24} {ms:>8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if summary["median_ms"] > IMPORT_TIME_BUDGET_MS:
+        print(f"Import time is over the budget of {IMPORT_TIME_BUDGET_MS:.0f} ms")
+        sys.exit(1)
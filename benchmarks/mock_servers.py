@@ -0,0 +1,302 @@
+"""
+Local stand-ins for the OpenAI and Fashn APIs, for benchmarks
+
+    python -m benchmarks.mock_servers --openai-latency-ms 300
+
+The OpenAI mock answers /chat/completions (vision classification with a
+synthetic clothing item, outfit recommendations built from the item ids in
+the prompt, plain or streamed) and /embeddings. The Fashn mock implements
+/run and /status/<id>, completing renders after a delay, and serves the
+rendered images. Latency and error rates are configurable per server.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic_closet import synthetic_item, tiny_jpeg
+
+_ITEM_ROW = re.compile(r"^(\d+)\|", re.MULTILINE)
+
+
+@dataclass
+class MockSettings:
+    """Behaviour of a mock server"""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 0
+
+    def delay(self, rng):
+        """Sleep for one simulated response time"""
+        delay = self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(self, status, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fail(self):
+        """Apply the latency and return True if this request should fail"""
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        server.settings.delay(server.rng)
+        return server.rng.random() < server.settings.error_rate
+
+
+class _OpenAIHandler(_Handler):
+    def do_POST(self):
+        payload = self._read_json()
+        if self._fail():
+            self._send(500, {"error": {"message": "Simulated server error"}})
+        elif self.path.endswith("/chat/completions"):
+            self._chat_completion(payload)
+        elif self.path.endswith("/embeddings"):
+            self._embeddings(payload)
+        else:
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _chat_completion(self, payload):
+        content = payload["messages"][-1]["content"]
+        if isinstance(content, list):
+            # Vision request: classify the image as a random item
+            rng = random.Random(json.dumps(content)[-64:])
+            item = synthetic_item(rng)
+            text = json.dumps({key: item[key] for key in _CLASSIFIED_FIELDS})
+        else:
+            text = json.dumps(_outfits(content, self.server.rng))
+
+        usage = {
+            "prompt_tokens": len(json.dumps(payload["messages"])) // 4,
+            "completion_tokens": len(text) // 4,
+        }
+        if not payload.get("stream"):
+            self._send(
+                200,
+                {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "model": payload.get("model"),
+                    "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": text}}
+                    ],
+                    "usage": usage,
+                },
+            )
+            return
+
+        events = [
+            {"choices": [{"index": 0, "delta": {"content": text[i : i + 40]}}]}
+            for i in range(0, len(text), 40)
+        ]
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            events.append({"choices": [], "usage": usage})
+        body = "".join(f"data: {json.dumps(event)}\n\n" for event in events)
+        self._send(200, (body + "data: [DONE]\n\n").encode(), "text/event-stream")
+
+    def _embeddings(self, payload):
+        dimensions = payload.get("dimensions") or 256
+        data = []
+        for index, text in enumerate(payload["input"]):
+            rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+            vector = [rng.gauss(0, 1) for _ in range(dimensions)]
+            data.append({"index": index, "embedding": vector})
+        self._send(200, {"data": data, "model": payload.get("model")})
+
+
+# Fields the classifier asks the vision model for
+_CLASSIFIED_FIELDS = (
+    "type",
+    "category",
+    "description",
+    "colors",
+    "patterns",
+    "textures",
+    "structure",
+    "derived_properties",
+)
+
+
+def _outfits(prompt, rng):
+    """Recommend outfits from the item ids listed in an outfit prompt"""
+    ids = _ITEM_ROW.findall(prompt)
+    outfits = []
+    for index in range(min(4, len(ids) // 2)):
+        outfits.append(
+            {
+                "items": rng.sample(ids, 2),
+                "style_description": f"Synthetic outfit {index + 1}",
+                "occasions": ["casual", "weekend"],
+                "styling_tips": "Roll up the sleeves.",
+            }
+        )
+    return {"outfits": outfits}
+
+
+class _FashnHandler(_Handler):
+    def do_POST(self):
+        payload = self._read_json()
+        if not self.path.endswith("/run"):
+            self._send(404, {"error": "Not found"})
+            return
+        failed = self._fail()
+        if not payload.get("model_image") or not payload.get("garment_image"):
+            self._send(400, {"id": None, "error": "Missing image"})
+            return
+        task_id = uuid.uuid4().hex
+        with self.server.lock:
+            self.server.tasks[task_id] = (time.monotonic(), failed)
+        self._send(200, {"id": task_id, "error": None})
+
+    def do_GET(self):
+        if self.path.startswith("/cdn/"):
+            self._send(200, tiny_jpeg(self.path), "image/jpeg")
+            return
+        task_id = self.path.rsplit("/", 1)[-1]
+        self._fail()
+        with self.server.lock:
+            task = self.server.tasks.get(task_id)
+        if task is None:
+            self._send(404, {"id": task_id, "status": "failed", "error": "Not found"})
+            return
+
+        started, failed = task
+        if time.monotonic() - started < self.server.render_ms / 1000:
+            self._send(200, {"id": task_id, "status": "processing", "error": None})
+        elif failed:
+            error = {"name": "PoseError", "message": "Simulated pose error"}
+            self._send(200, {"id": task_id, "status": "failed", "error": error})
+        else:
+            host, port = self.server.server_address
+            output = [f"http://{host}:{port}/cdn/{task_id}.jpg"]
+            self._send(
+                200,
+                {"id": task_id, "status": "completed", "output": output, "error": None},
+            )
+
+
+class MockServer:
+    """A mock API served from a background thread"""
+
+    def __init__(self, handler, settings=None, host="127.0.0.1", port=0):
+        self.settings = settings or MockSettings()
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.settings = self.settings
+        self.httpd.rng = random.Random(self.settings.seed)
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = 0
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests(self) -> int:
+        """Number of API requests received"""
+        return self.httpd.requests
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, name="mock-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def openai_server(settings=None, **kwargs) -> MockServer:
+    """Mock of the OpenAI chat completions and embeddings API"""
+    return MockServer(_OpenAIHandler, settings, **kwargs)
+
+
+def fashn_server(settings=None, render_ms=1000.0, **kwargs) -> MockServer:
+    """Mock of the Fashn API, completing renders after render_ms"""
+    server = MockServer(_FashnHandler, settings, **kwargs)
+    server.httpd.render_ms = render_ms
+    server.httpd.tasks = {}
+    return server
+
+
+def add_mock_arguments(parser):
+    """Add the mock server options to an argument parser"""
+    group = parser.add_argument_group("mock servers")
+    group.add_argument("--openai-latency-ms", type=float, default=200.0)
+    group.add_argument("--openai-jitter-ms", type=float, default=50.0)
+    group.add_argument("--openai-error-rate", type=float, default=0.0)
+    group.add_argument("--fashn-latency-ms", type=float, default=20.0)
+    group.add_argument("--fashn-render-ms", type=float, default=1000.0)
+    group.add_argument("--fashn-error-rate", type=float, default=0.0)
+    group.add_argument("--seed", type=int, default=0)
+
+
+def mock_servers_from_args(args, openai_port=0, fashn_port=0):
+    """Create the (OpenAI, Fashn) mock servers configured by the arguments"""
+    openai = openai_server(
+        MockSettings(
+            args.openai_latency_ms,
+            args.openai_jitter_ms,
+            args.openai_error_rate,
+            args.seed,
+        ),
+        port=openai_port,
+    )
+    fashn = fashn_server(
+        MockSettings(args.fashn_latency_ms, 0.0, args.fashn_error_rate, args.seed),
+        render_ms=args.fashn_render_ms,
+        port=fashn_port,
+    )
+    return openai, fashn
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the OpenAI and Fashn mocks")
+    parser.add_argument("--openai-port", type=int, default=8001)
+    parser.add_argument("--fashn-port", type=int, default=8002)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    openai, fashn = mock_servers_from_args(args, args.openai_port, args.fashn_port)
+    with openai, fashn:
+        print(f"OPENAI_BASE_URL={openai.base_url}")
+        print(f"FASHN_BASE_URL={fashn.base_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,333 @@
+"""
+Endpoint benchmarks against local OpenAI and Fashn stand-ins
+
+    python -m benchmarks.run_benchmarks --sizes 10 1000 10000 --output results.json
+    python -m benchmarks.run_benchmarks --baseline results.json
+
+For every closet size, a synthetic closet is written to a temporary
+directory and the app is started there (python -m src.server) with
+OPENAI_BASE_URL and FASHN_BASE_URL pointing at the mock servers. Each
+endpoint is then called from a pool of clients, and its throughput and
+latency percentiles are written as JSON. With --baseline, the run fails when
+an endpoint is slower than the baseline by more than --tolerance.
+
+/closet/outfits is measured with the recommendation cache disabled, so every
+request builds a prompt and calls the (mock) model; /wearit waits for the
+render (?wait=1) of a garment not tried on before, and /upload_image waits
+for the classification of a new image.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.mock_servers import add_mock_arguments, mock_servers_from_args
+from benchmarks.synthetic_closet import tiny_jpeg, write_closet
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_SIZES = (10, 1000, 10000)
+ENDPOINTS = ("/closet", "/closet/<id>", "/closet/outfits", "/wearit", "/upload_image")
+TRYON_CATEGORIES = ("tops", "bottoms", "one-pieces")
+OCCASION_PARAMS = (
+    {},
+    {"occasion": "casual"},
+    {"occasion": "business_casual"},
+    {"occasion": "weekend"},
+    {"occasion": "formal"},
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of a sorted list"""
+    index = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+class App:
+    """The app running in a subprocess, in its own working directory"""
+
+    def __init__(self, workdir, env, startup_timeout=120):
+        self.workdir = Path(workdir)
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.env = {
+            **os.environ,
+            "PYTHONPATH": str(ROOT_DIR),
+            "SERVER_HOST": "127.0.0.1",
+            "SERVER_PORT": str(self.port),
+            "SERVER_WORKERS": "1",
+            **env,
+        }
+        self.startup_timeout = startup_timeout
+        self._process = None
+        self._log = None
+
+    def __enter__(self):
+        self._log = open(self.workdir / "server.log", "w")
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "src.server"],
+            cwd=self.workdir,
+            env=self.env,
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(
+                    f"The app exited during startup, see {self.workdir}/server.log"
+                )
+            try:
+                httpx.get(f"{self.base_url}/closet?limit=1", timeout=5)
+                return self
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f"The app did not start in {self.startup_timeout}s")
+
+    def __exit__(self, *exc_info):
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+        self._log.close()
+
+
+def measure(base_url, make_request, requests, concurrency) -> dict:
+    """
+    Send requests from a pool of clients and summarize their latency
+
+    Args:
+        base_url: URL of the app
+        make_request: Function (client, index) -> response
+        requests: Number of requests
+        concurrency: Number of concurrent clients
+    """
+    local = threading.local()
+    latencies = []
+    errors = []
+
+    def run(index):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = httpx.Client(base_url=base_url, timeout=300)
+        started = time.perf_counter()
+        try:
+            response = make_request(client, index)
+            if response.status_code >= 400:
+                errors.append(f"HTTP {response.status_code}")
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "error_kinds": sorted(set(errors)),
+        "throughput_rps": round(requests / elapsed, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+def benchmark_size(size, args, openai_url, fashn_url) -> list[dict]:
+    """Benchmark every endpoint against a closet of the given size"""
+    with tempfile.TemporaryDirectory(prefix=f"closet-{size}-") as workdir:
+        workdir = Path(workdir)
+        items = write_closet(workdir / "data", size, seed=args.seed)
+        person_path = workdir / "person.jpg"
+        person_path.write_bytes(tiny_jpeg("person"))
+
+        env = {
+            "OPENAI_API_KEY": "benchmark",
+            "OPENAI_BASE_URL": openai_url,
+            "FASHN_API_KEY": "benchmark",
+            "FASHN_BASE_URL": fashn_url,
+            "FASHN_POLL_INTERVAL": str(args.fashn_poll_interval),
+            "OUTFIT_CACHE_TTL": "0",
+            "SOCKETIO_ASYNC_MODE": "threading",
+        }
+        rng = random.Random(args.seed)
+        garments = [item for item in items if item["category"] in TRYON_CATEGORIES]
+        rng.shuffle(garments)
+
+        scenarios = {
+            "/closet": (lambda client, i: client.get("/closet"), args.requests),
+            "/closet/<id>": (
+                lambda client, i: client.get(f"/closet/{rng.choice(items)['id']}"),
+                args.requests,
+            ),
+            "/closet/outfits": (
+                lambda client, i: client.get(
+                    "/closet/outfits",
+                    params=OCCASION_PARAMS[i % len(OCCASION_PARAMS)],
+                ),
+                args.outfit_requests,
+            ),
+            "/wearit": (
+                lambda client, i: client.post(
+                    "/wearit?wait=1",
+                    json={
+                        "person_path": str(person_path),
+                        "cloth_path": garments[i]["image_path"],
+                        "category": garments[i]["category"],
+                    },
+                ),
+                # Each garment once, so no render comes from the try-on cache
+                min(args.tryon_requests, len(garments)),
+            ),
+            # Last, as it grows the closet; classified inline by the mock
+            "/upload_image": (
+                lambda client, i: client.post(
+                    "/upload_image?wait=1",
+                    files={"file": (f"upload-{i}.jpg", tiny_jpeg(f"upload-{i}"))},
+                ),
+                args.upload_requests,
+            ),
+        }
+
+        results = []
+        with App(workdir, env) as app:
+            for endpoint in args.endpoints:
+                make_request, requests = scenarios[endpoint]
+                if requests <= 0:
+                    continue
+                result = measure(app.base_url, make_request, requests, args.concurrency)
+                results.append({"closet_size": size, "endpoint": endpoint, **result})
+                print(
+                    f"{size:>6} items  {endpoint:<16} "
+                    f"{result['throughput_rps']:>8.1f} req/s  "
+                    f"p50 {result['p50_ms']:>8.1f} ms  "
+                    f"p99 {result['p99_ms']:>8.1f} ms  "
+                    f"errors {result['errors']}"
+                )
+        return results
+
+
+def compare(results, baseline, tolerance) -> list[str]:
+    """Return the regressions of results against a baseline run"""
+    previous = {
+        (result["closet_size"], result["endpoint"]): result
+        for result in baseline["results"]
+    }
+    regressions = []
+    for result in results:
+        before = previous.get((result["closet_size"], result["endpoint"]))
+        if before is None:
+            continue
+        name = f"{result['endpoint']} at {result['closet_size']} items"
+        for key in ("p50_ms", "p99_ms"):
+            if result[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {before[key]} -> {result[key]}")
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput_rps {before['throughput_rps']} "
+                f"-> {result['throughput_rps']}"
+            )
+        if result["errors"] > before["errors"]:
+            regressions.append(
+                f"{name}: errors {before['errors']} -> {result['errors']}"
+            )
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the API endpoints against mock OpenAI and Fashn"
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Closet sizes"
+    )
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--outfit-requests", type=int, default=20)
+    parser.add_argument("--tryon-requests", type=int, default=20)
+    parser.add_argument("--upload-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fashn-poll-interval", type=float, default=0.1)
+    parser.add_argument(
+        "--output", default="benchmark_results.json", help="JSON results file"
+    )
+    parser.add_argument("--baseline", help="Previous results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown against the baseline (0.25 = 25%%)",
+    )
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    openai, fashn = mock_servers_from_args(args)
+    results = []
+    with openai, fashn:
+        for size in args.sizes:
+            results.extend(benchmark_size(size, args, openai.base_url, fashn.base_url))
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "baseline")
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
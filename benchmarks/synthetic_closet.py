@@ -0,0 +1,161 @@
+"""
+Synthetic closets for benchmarks
+
+    python -m benchmarks.synthetic_closet --items 1000 --data-dir /tmp/closet/data
+
+Items follow the clothing_item schema the classifier asks for: every string
+field is one of the example values listed in the template, so they exercise
+the same code paths as classified items. Each item gets its own small JPEG.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.services.llm.prompt_templates import clothing_item
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional, images then share one sample JPEG
+    Image = None
+
+SAMPLE_IMAGE = Path(__file__).resolve().parent.parent / "data" / "images"
+
+# Item types that fit each category, so local outfit slots are consistent
+TYPES_BY_CATEGORY = {
+    "tops": ("shirt", "t-shirt", "blouse", "sweater", "jacket"),
+    "bottoms": ("pants", "jeans", "skirt", "shorts"),
+    "one-pieces": ("dress", "jumpsuit"),
+    "shoes": ("shoes", "sneakers", "boots"),
+}
+
+COLORS = (
+    ("navy blue", "#000080"),
+    ("white", "#FFFFFF"),
+    ("black", "#000000"),
+    ("red", "#FF0000"),
+    ("beige", "#F5F5DC"),
+    ("olive", "#808000"),
+    ("sky blue", "#87CEEB"),
+    ("burgundy", "#800020"),
+)
+
+
+def _options(example: str) -> list[str]:
+    """Return the example values of a template string ("a, b, or c, etc.")"""
+    options = []
+    for option in example.split(","):
+        option = option.strip()
+        if option.startswith("or "):
+            option = option[len("or ") :]
+        if option and option != "etc.":
+            options.append(option)
+    return options
+
+
+def _fill(template, rng):
+    """Generate a value shaped like a template value"""
+    if isinstance(template, dict):
+        return {key: _fill(value, rng) for key, value in template.items()}
+    if isinstance(template, bool):
+        return rng.random() < 0.6
+    if isinstance(template, list):
+        if template and isinstance(template[0], str):
+            # Lists of examples, e.g. ["preppy", "classic"]
+            options = [option for value in template for option in _options(value)]
+            return rng.sample(options, rng.randint(1, len(options)))
+        return [_fill(template[0], rng) for _ in range(rng.randint(1, 2))]
+    return rng.choice(_options(template))
+
+
+def synthetic_item(rng: random.Random) -> dict:
+    """Generate the analysis of one clothing item"""
+    item = _fill(clothing_item, rng)
+    category = rng.choice(tuple(TYPES_BY_CATEGORY))
+    item["category"] = category
+    item["type"] = rng.choice(TYPES_BY_CATEGORY[category])
+    for color in item["colors"]:
+        color["name"], color["hex"] = rng.choice(COLORS)
+    item["derived_properties"]["style_categories"] = rng.sample(
+        ["preppy", "classic", "casual", "sporty", "bohemian", "minimalist"], 2
+    )
+    item["derived_properties"]["dress_code_compatibility"] = rng.sample(
+        ["casual", "smart_casual", "business_casual", "weekend", "formal"], 2
+    )
+    item["description"] = (
+        f"A {item['structure']['silhouette']} {item['colors'][0]['name']} "
+        f"{item['type']} with a {item['patterns'][0]['type']} pattern."
+    )
+    return item
+
+
+def tiny_jpeg(seed) -> bytes:
+    """Return a small JPEG whose bytes are unique to the seed"""
+    digest = hashlib.sha256(str(seed).encode("utf-8")).digest()
+    if Image is not None:
+        buffer = io.BytesIO()
+        Image.new("RGB", (48, 64), tuple(digest[:3])).save(buffer, "JPEG")
+        data = buffer.getvalue()
+    else:
+        data = min(SAMPLE_IMAGE.glob("*.jpg"), key=lambda p: p.stat().st_size)
+        data = data.read_bytes()
+    # Bytes after the end-of-image marker are ignored by decoders
+    return data + digest
+
+
+def write_closet(data_dir, count: int, seed: int = 0) -> list[dict]:
+    """
+    Write a closet of synthetic items in the JSON storage layout
+
+    Args:
+        data_dir: Directory used as the app's data/ directory
+        count: Number of items
+        seed: Random seed; the same seed gives the same closet
+
+    Returns:
+        The items written
+    """
+    rng = random.Random(seed)
+    data_dir = Path(data_dir)
+    images_dir = data_dir / "images"
+    closet_dir = data_dir / "closet"
+    images_dir.mkdir(parents=True, exist_ok=True)
+    closet_dir.mkdir(parents=True, exist_ok=True)
+
+    added = datetime(2024, 11, 16)
+    items = []
+    for index in range(1, count + 1):
+        item = synthetic_item(rng)
+        image = tiny_jpeg(f"{seed}-{index}")
+        filename = f"synthetic-{index}.jpg"
+        (images_dir / filename).write_bytes(image)
+        item.update(
+            {
+                "id": str(index),
+                "date_added": (added + timedelta(minutes=index)).isoformat(),
+                "image_filename": filename,
+                "image_path": (images_dir / filename).as_posix(),
+                "image_sha256": hashlib.sha256(image).hexdigest(),
+                "status": "ready",
+            }
+        )
+        items.append(item)
+
+    with open(closet_dir / "closet.json", "w") as f:
+        json.dump({"items": items}, f)
+    return items
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic closet")
+    parser.add_argument("--items", type=int, default=1000, help="Number of items")
+    parser.add_argument("--data-dir", required=True, help="Data directory to fill")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    write_closet(args.data_dir, args.items, args.seed)
+    print(f"Wrote {args.items} items to {args.data_dir}")
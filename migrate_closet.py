@@ -0,0 +1,34 @@
+import argparse
+
+from src.utils.sqlite_storage import SqliteClosetStorage
+from src.utils.storage import ClosetStorage
+
+
+def migrate_closet(db_path: str = None) -> int:
+    """
+    Import the JSON closet (snapshot and journal) into the SQLite backend
+
+    Args:
+        db_path: Optional path of the SQLite database to write to
+
+    Returns:
+        Number of items imported
+    """
+    closet = ClosetStorage()
+    closet.backfill_image_hashes()
+    items = closet.get_all_items()
+    SqliteClosetStorage(db_path).import_items(items)
+    return len(items)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Import data/closet/closet.json into the SQLite closet backend"
+    )
+    parser.add_argument(
+        "--db", help="Path of the SQLite database (default: data/closet/closet.db)"
+    )
+    args = parser.parse_args()
+
+    count = migrate_closet(args.db)
+    print(f"Imported {count} items")
@@ -1,18 +1,68 @@
 import argparse
 import mimetypes
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
 from pathlib import Path
 
 import requests
 
 
-def upload_images(folder_path: str, api_url: str) -> None:
+def upload_batch(image_paths: list[Path], api_url: str) -> None:
+    """
+    Upload one batch of images in a single multipart request
+
+    Args:
+        image_paths: Paths of the images in the batch
+        api_url: URL of the batch upload endpoint
+    """
+    with ExitStack() as stack:
+        files = [
+            (
+                "files",
+                (
+                    image_path.name,
+                    stack.enter_context(open(image_path, "rb")),
+                    mimetypes.guess_type(str(image_path))[0],
+                ),
+            )
+            for image_path in image_paths
+        ]
+
+        # Send POST request to API
+        response = requests.post(api_url, files=files)
+
+    if response.status_code != 200:
+        print(
+            f"Failed to upload batch of {len(image_paths)} images. "
+            f"Status code: {response.status_code}"
+        )
+        print(f"Response: {response.text}")
+        return
+
+    for result in response.json()["results"]:
+        if result["status"] == "failed":
+            print(
+                f"Failed to process {result['filename']}: "
+                f"{result.get('error', 'classification failed')}"
+            )
+        elif result.get("duplicate"):
+            print(f"Already in closet: {result['filename']}")
+        else:
+            print(f"Successfully uploaded: {result['filename']}")
+
+
+def upload_images(
+    folder_path: str, api_url: str, batch_size: int = 10, workers: int = 4
+) -> None:
     """
     Upload all images from the specified folder to the API endpoint
 
     Args:
         folder_path: Path to folder containing images
-        api_url: URL of the API endpoint
+        api_url: URL of the batch upload endpoint
+        batch_size: Number of images sent per request
+        workers: Number of batches uploaded in parallel
     """
     # Convert string path to Path object
     image_dir = Path(folder_path)
@@ -22,37 +72,33 @@ def upload_images(folder_path: str, api_url: str) -> None:
         raise FileNotFoundError(f"Directory not found: {folder_path}")
 
     # Get all files from the directory
-    image_files = [f for f in image_dir.iterdir() if f.is_file()]
+    image_files = sorted(f for f in image_dir.iterdir() if f.is_file())
 
     # Common image extensions
     valid_extensions = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 
+    image_paths = []
     for image_path in image_files:
         # Skip files that aren't images
         if image_path.suffix.lower() not in valid_extensions:
             print(f"Skipping non-image file: {image_path.name}")
             continue
+        image_paths.append(image_path)
 
-        # Get the mime type
-        mime_type, _ = mimetypes.guess_type(str(image_path))
-
-        try:
-            with open(image_path, "rb") as img_file:
-                files = {"file": (image_path.name, img_file, mime_type)}
+    batches = [
+        image_paths[i : i + batch_size] for i in range(0, len(image_paths), batch_size)
+    ]
 
-                # Send POST request to API
-                response = requests.post(api_url, files=files)
-
-                if response.status_code == 200:
-                    print(f"Successfully uploaded: {image_path.name}")
-                else:
-                    print(
-                        f"Failed to upload {image_path.name}. Status code: {response.status_code}"
-                    )
-                    print(f"Response: {response.text}")
-
-        except Exception as e:
-            print(f"Error uploading {image_path.name}: {str(e)}")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(upload_batch, batch, api_url): batch for batch in batches
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                names = ", ".join(path.name for path in futures[future])
+                print(f"Error uploading {names}: {str(e)}")
 
 
 if __name__ == "__main__":
@@ -60,9 +106,15 @@ if __name__ == "__main__":
         description="Upload images from a folder to an API endpoint"
     )
     parser.add_argument("folder", help="Path to the folder containing images")
+    parser.add_argument(
+        "--batch-size", type=int, default=10, help="Images sent per request"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Batches uploaded in parallel"
+    )
     args = parser.parse_args()
 
     # API endpoint configuration
-    API_ENDPOINT = "http://localhost:5000/upload_image"
+    API_ENDPOINT = os.getenv("SEED_API_URL", "http://localhost:5000/upload_images")
 
-    upload_images(args.folder, API_ENDPOINT)
+    upload_images(args.folder, API_ENDPOINT, args.batch_size, args.workers)
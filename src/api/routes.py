@@ -1,14 +1,51 @@
+import json
 import logging
 import os
-
-from flask import Blueprint, jsonify, render_template, request, send_from_directory
-from flask_socketio import SocketIO
-
-from src.services.fashn.fashnClient import FashnClient
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from flask import (
+    Blueprint,
+    Response,
+    g,
+    jsonify,
+    render_template,
+    request,
+    send_file,
+    send_from_directory,
+    stream_with_context,
+    url_for,
+)
+from flask_socketio import SocketIO, emit
+
+from src.services.fashn.prerender import TRYON_PRERENDER, TryOnPrerenderer
+from src.services.fashn.tryon import TryOnService
+from src.services.fashn.tryon_cache import TryOnCache
+from src.services.jobs import COMPLETED, FAILED, JobQueue, JobRegistry, QueueFullError
+from src.services.llm.analysis_cache import get_analysis_cache
 from src.services.llm.classifier import process_clothing_image
-from src.services.llm.outfit_recommender import generate_outfit_recommendations
+from src.services.llm.outfit_recommender import (
+    generate_outfit_recommendations,
+    recommend_outfits_locally,
+    stream_outfit_recommendations,
+)
 from src.services.llm.prompt_templates import clothing_item
-from src.utils.storage import ClosetStorage
+from src.services.llm.transport import get_transport
+from src.services.outfits.cache import RecommendationCache
+from src.services.outfits.similarity import GarmentSimilarity
+from src.utils.closet_index import ClosetIndex
+from src.utils.image_derivatives import DERIVATIVE_SIZES, ImageDerivatives
+from src.utils.image_prep import sniff_mime_type
+from src.utils.metrics import (
+    CLOSET_ITEMS,
+    CONTENT_TYPE,
+    QUEUE_DEPTH,
+    REGISTRY,
+    REQUEST_LATENCY,
+)
+from src.utils.storage import get_closet_storage
+from src.utils.tracing import shutdown_tracing
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -17,15 +54,181 @@ logger = logging.getLogger(__name__)
 # Initialize Blueprint and storage
 api = Blueprint("api", __name__)
 socketio = SocketIO()
-closet_storage = ClosetStorage()
-
+closet_storage = get_closet_storage()
+closet_index = ClosetIndex(closet_storage)
+
+# Background jobs; finished jobs are pushed to SocketIO clients. With several
+# workers, JOBS_SHARED_DIR lets any of them answer GET /jobs/<id>
+jobs = JobRegistry(shared_dir=os.getenv("JOBS_SHARED_DIR") or None)
+classification_queue = JobQueue(
+    jobs,
+    "classifier",
+    max_workers=int(os.getenv("CLASSIFY_WORKERS", "4")),
+    max_pending=int(os.getenv("CLASSIFY_QUEUE_SIZE", "100")),
+    on_done=lambda job: socketio.emit("job_complete", job),
+)
+
+# Try-ons wait on the shared event loop; results are pushed like other jobs
+# and renders are kept locally, served by GET /tryon/<key>
+tryon_cache = TryOnCache()
+tryon_service = TryOnService(
+    jobs,
+    on_done=lambda job: socketio.emit("job_complete", job),
+    cache=tryon_cache,
+    url_for_key=lambda key: f"/tryon/{key}",
+)
+
+# Cached renders never change for a key
+TRYON_MAX_AGE = 31536000
+
+# Optional background try-ons of the top recommended outfits
+tryon_prerenderer = TryOnPrerenderer(tryon_service)
+
+# Embeddings of classified items, computed in the background
+garment_similarity = GarmentSimilarity(closet_storage)
+embedding_queue = JobQueue(
+    jobs,
+    "embedder",
+    max_workers=int(os.getenv("EMBEDDING_WORKERS", "2")),
+    max_pending=int(os.getenv("EMBEDDING_QUEUE_SIZE", "1000")),
+)
+
+# Recommend outfits with the local engine when the model fails
+OUTFIT_LOCAL_FALLBACK = os.getenv("OUTFIT_LOCAL_FALLBACK", "true").lower() != "false"
+
+# Downscaled closet images for listings, generated on first request
+image_derivatives = ImageDerivatives(closet_storage.images_dir)
+IMAGE_MAX_AGE = int(os.getenv("IMAGE_MAX_AGE", "86400"))
+
+# Upper bound for the page size of GET /closet
+MAX_PAGE_SIZE = 500
+
+# Batch uploads: files per request and concurrent classifications per batch
+MAX_BATCH_SIZE = int(os.getenv("BATCH_MAX_FILES", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
 
 # Configure upload settings
 UPLOAD_FOLDER = "uploads/images"
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg"}
 
-# Create upload folder if it doesn't exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# The user's photo that outfits are pre-rendered on
+TRYON_PERSON_IMAGE = os.getenv(
+    "TRYON_PERSON_IMAGE", os.path.join(UPLOAD_FOLDER, "person.jpg")
+)
+
+
+def recommend_outfits(occasion=None, season=None, style=None):
+    """Generate outfit recommendations with their items expanded"""
+    outfit_recommendations = generate_outfit_recommendations(
+        closet_storage, occasion=occasion, season=season, style=style
+    )
+    if outfit_recommendations is None:
+        return None
+    return [expand_outfit(outfit) for outfit in outfit_recommendations]
+
+
+def expand_outfit(outfit):
+    """Replace the item ids of an outfit with the items themselves"""
+    return {
+        **outfit,
+        "items": [closet_storage.get_item(item_id) for item_id in outfit["items"]],
+    }
+
+
+def with_renders(outfits):
+    """Start pre-rendering the top outfits when enabled, adding render handles"""
+    if not TRYON_PRERENDER:
+        return outfits
+    return tryon_prerenderer.prerender(outfits, TRYON_PERSON_IMAGE)
+
+
+def stream_outfits(occasion=None, season=None, style=None):
+    """
+    Yield expanded outfit recommendations as soon as each one is generated
+
+    Fresh cached recommendations are replayed at once; otherwise the
+    completion is streamed and the full set is cached when it ends.
+    """
+    for index, outfit in enumerate(_stream_outfits(occasion, season, style)):
+        if index < tryon_prerenderer.max_outfits:
+            outfit = with_renders([outfit])[0]
+        yield outfit
+
+
+def _stream_outfits(occasion=None, season=None, style=None):
+    cached = outfit_cache.peek(occasion=occasion, season=season, style=style)
+    if cached is not None:
+        yield from cached
+        return
+
+    version = closet_storage.version
+    outfits = []
+    try:
+        for outfit in stream_outfit_recommendations(
+            closet_storage, occasion=occasion, season=season, style=style
+        ):
+            outfit = expand_outfit(outfit)
+            outfits.append(outfit)
+            yield outfit
+    except Exception as e:
+        if outfits or not OUTFIT_LOCAL_FALLBACK:
+            raise
+        logger.warning(f"Outfit model failed, recommending locally: {e}")
+        yield from local_outfits(occasion, season, style)
+        return
+    outfit_cache.put(outfits, version, occasion=occasion, season=season, style=style)
+
+
+def local_outfits(occasion=None, season=None, style=None):
+    """Recommend expanded outfits with the local engine, without the model"""
+    return [
+        expand_outfit(outfit)
+        for outfit in recommend_outfits_locally(
+            closet_storage, occasion=occasion, season=season, style=style
+        )
+    ]
+
+
+# Recommendations are reused until the closet changes or they expire
+outfit_cache = RecommendationCache(closet_storage, recommend_outfits)
+
+# Values read when /metrics is scraped
+CLOSET_ITEMS.set_function(lambda: len(closet_storage.get_all_items()))
+QUEUE_DEPTH.set_function(lambda: classification_queue.pending, "classification")
+QUEUE_DEPTH.set_function(lambda: embedding_queue.pending, "embedding")
+
+
+@api.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@api.after_request
+def record_request_latency(response):
+    """Record the time taken by the route (until the body starts, if streamed)"""
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_LATENCY.labels(
+            request.method, route, str(response.status_code)
+        ).observe(time.perf_counter() - started)
+    return response
+
+
+def shutdown(timeout=None):
+    """Let queued background jobs finish and release connections"""
+
+    def drain():
+        classification_queue.shutdown(wait=True)
+        embedding_queue.shutdown(wait=True)
+
+    drainer = threading.Thread(target=drain, daemon=True)
+    drainer.start()
+    drainer.join(timeout)
+    if drainer.is_alive():
+        logger.warning(f"Background jobs still running after {timeout}s, exiting")
+    get_transport().close()
+    shutdown_tracing()
 
 
 def allowed_file(filename):
@@ -33,6 +236,98 @@ def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def classify_item(item_id, image_data, image_sha256):
+    """Classify a pending closet item and store its analysis"""
+    analysis = process_clothing_image(image_data, image_sha256=image_sha256)
+    failed = analysis.get("type") == "unknown"
+    item = closet_storage.update_item(
+        item_id, {**analysis, "status": "failed" if failed else "ready"}
+    )
+    if failed:
+        raise RuntimeError(analysis.get("description", "Classification failed"))
+    index_embedding(item_id)
+    return item
+
+
+def index_embedding(item_id):
+    """Queue the embedding of a classified item for similarity search"""
+    try:
+        embedding_queue.submit(
+            "embedding", garment_similarity.index_item, item_id, item_id=item_id
+        )
+    except QueueFullError:
+        # The item is embedded on demand by the next similarity search
+        logger.warning(f"Embedding queue full, deferring item {item_id}")
+
+
+def store_classified_image(image, analysis=None):
+    """Classify an ingested image and add it to the closet as a new item"""
+    try:
+        # Process the in-memory image
+        analysis_result = analysis or process_clothing_image(
+            image.data, image_sha256=image.sha256
+        )
+        analysis_result["image_sha256"] = image.sha256
+        analysis_result["status"] = (
+            "failed" if analysis_result["type"] == "unknown" else "ready"
+        )
+
+        # Save to closet, moving the image to its final name
+        item_id = closet_storage.add_item(analysis_result, image)
+    finally:
+        closet_storage.discard_image(image)
+    if analysis_result["status"] == "ready":
+        index_embedding(item_id)
+    return item_id, analysis_result
+
+
+def enqueue_classification(image, unknown_analysis, item_id=None):
+    """
+    Queue the classification of an ingested image
+
+    The image is stored as a new pending item, or, when item_id is given,
+    that existing item is marked pending and classified again.
+    """
+    try:
+        if item_id is None:
+            item_id = closet_storage.add_item(
+                {**unknown_analysis, "image_sha256": image.sha256, "status": "pending"},
+                image,
+            )
+        else:
+            closet_storage.update_item(item_id, {"status": "pending"})
+    finally:
+        closet_storage.discard_image(image)
+
+    try:
+        job = classification_queue.submit(
+            "classification",
+            classify_item,
+            item_id,
+            image.data,
+            image.sha256,
+            item_id=item_id,
+        )
+    except QueueFullError as e:
+        logger.warning(f"Could not queue classification of item {item_id}: {e}")
+        closet_storage.update_item(item_id, {"status": "failed"})
+        return jsonify({"error": str(e), "item_id": item_id}), 503
+
+    logger.info(f"Queued classification of item {item_id} as job {job['id']}")
+    return (
+        jsonify(
+            {
+                "message": "Image accepted for processing",
+                "filename": image.filename,
+                "item_id": item_id,
+                "job_id": job["id"],
+                "status": "pending",
+            }
+        ),
+        202,
+    )
+
+
 @api.route("/", methods=["GET"])
 def home():
     """Render the image upload page"""
@@ -69,14 +364,44 @@ def upload_image():
 
             if file and allowed_file(file.filename):
                 try:
-                    # Save image and get filepath
-                    filename, filepath = closet_storage.save_image(file)
-
-                    # Process the image
-                    analysis_result = process_clothing_image(str(filepath))
-
-                    # Save to closet with original file
-                    item_id = closet_storage.add_item(analysis_result, file)
+                    # Write the upload to disk once, hashing it on the way
+                    image = closet_storage.ingest_image(file)
+
+                    existing_item = closet_storage.find_by_hash(image.sha256)
+                    if existing_item is not None:
+                        if existing_item.get("status") == "failed":
+                            # Retry items whose classification failed earlier
+                            return enqueue_classification(
+                                image, unknown_analysis, item_id=existing_item["id"]
+                            )
+                        closet_storage.discard_image(image)
+                        logger.info(
+                            f"Image already in closet as item {existing_item['id']}"
+                        )
+                        return (
+                            jsonify(
+                                {
+                                    "message": "Image already in closet",
+                                    "filename": existing_item["image_filename"],
+                                    "item_id": existing_item["id"],
+                                    "analysis": existing_item,
+                                    "duplicate": True,
+                                }
+                            ),
+                            200,
+                        )
+
+                    # Classify inline when the analysis is cached or the
+                    # caller asked to wait, otherwise in the background
+                    wait = request.args.get("wait", "").lower() in ("1", "true")
+                    cached_analysis = get_analysis_cache().get(image.sha256)
+                    if not wait and cached_analysis is None:
+                        return enqueue_classification(image, unknown_analysis)
+
+                    item_id, analysis_result = store_classified_image(
+                        image, cached_analysis
+                    )
+                    filename = image.filename
 
                     logger.info(f"Successfully processed and stored image: {filename}")
                     return (
@@ -85,6 +410,7 @@ def upload_image():
                                 "message": "Image processed and stored successfully",
                                 "filename": filename,
                                 "item_id": item_id,
+                                "status": analysis_result["status"],
                                 "analysis": analysis_result,
                             }
                         ),
@@ -124,18 +450,239 @@ def upload_image():
             )
 
 
+def classify_batch_image(image, item_id=None):
+    """Classify one image of a batch upload and return its per-file result"""
+    try:
+        if item_id is None:
+            item_id, analysis_result = store_classified_image(image)
+        else:
+            closet_storage.discard_image(image)
+            try:
+                analysis_result = classify_item(item_id, image.data, image.sha256)
+            except RuntimeError:
+                analysis_result = closet_storage.get_item(item_id)
+        return {
+            "filename": image.filename,
+            "item_id": item_id,
+            "status": analysis_result["status"],
+            "analysis": analysis_result,
+        }
+    except Exception as e:
+        logger.error(f"Error processing {image.filename}: {e}", exc_info=True)
+        return {"filename": image.filename, "status": "failed", "error": str(e)}
+
+
+@api.route("/upload_images", methods=["POST"])
+def upload_images():
+    """
+    Upload many images in one multipart request (field "files")
+
+    The images are classified concurrently, at most BATCH_CONCURRENCY at a
+    time (the "concurrency" query parameter can lower that), and the
+    response lists one result per file, in request order.
+    """
+    files = [file for file in request.files.getlist("files") if file.filename]
+    if not files:
+        return jsonify({"error": "No files in request"}), 400
+    if len(files) > MAX_BATCH_SIZE:
+        return (
+            jsonify({"error": f"At most {MAX_BATCH_SIZE} files per batch"}),
+            400,
+        )
+
+    try:
+        concurrency = int(request.args.get("concurrency", BATCH_CONCURRENCY))
+    except ValueError:
+        return jsonify({"error": "concurrency must be an integer"}), 400
+    concurrency = max(1, min(concurrency, BATCH_CONCURRENCY))
+
+    results = [None] * len(files)
+    to_classify = []
+    first_with_hash = {}
+    try:
+        for index, file in enumerate(files):
+            if not allowed_file(file.filename):
+                results[index] = {
+                    "filename": file.filename,
+                    "status": "failed",
+                    "error": "Invalid file type",
+                }
+                continue
+
+            image = closet_storage.ingest_image(file)
+            if image.sha256 in first_with_hash:
+                # Same bytes twice in one batch: classify them once
+                closet_storage.discard_image(image)
+                first_with_hash[image.sha256].append(index)
+                continue
+
+            existing_item = closet_storage.find_by_hash(image.sha256)
+            if existing_item is not None and existing_item.get("status") != "failed":
+                closet_storage.discard_image(image)
+                results[index] = {
+                    "filename": existing_item["image_filename"],
+                    "item_id": existing_item["id"],
+                    "status": existing_item.get("status", "ready"),
+                    "duplicate": True,
+                }
+                continue
+
+            first_with_hash[image.sha256] = []
+            item_id = existing_item["id"] if existing_item is not None else None
+            to_classify.append((index, image, item_id))
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {
+                executor.submit(classify_batch_image, image, item_id): (index, image)
+                for index, image, item_id in to_classify
+            }
+            for future in as_completed(futures):
+                index, image = futures[future]
+                results[index] = future.result()
+                for duplicate_index in first_with_hash[image.sha256]:
+                    results[duplicate_index] = {
+                        **results[index],
+                        "filename": files[duplicate_index].filename,
+                        "duplicate": True,
+                    }
+
+    except Exception as e:
+        logger.error(f"Unexpected error in batch upload: {e}", exc_info=True)
+        for _, image, _ in to_classify:
+            closet_storage.discard_image(image)
+        return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
+
+    failed = sum(1 for result in results if result["status"] == "failed")
+    logger.info(f"Batch upload of {len(files)} files done, {failed} failed")
+    return (
+        jsonify(
+            {
+                "results": results,
+                "succeeded": len(results) - failed,
+                "failed": failed,
+            }
+        ),
+        200,
+    )
+
+
+@api.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Get the status of a background job"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+
 @api.route("/images/<path:filename>")
 def serve_image(filename):
-    """Serve images from the data/images directory"""
-    return send_from_directory(closet_storage.images_dir, filename)
+    """
+    Serve images from the data/images directory
+
+    Pass ?size=thumb or ?size=medium for a downscaled JPEG. Responses carry
+    an ETag and Cache-Control, and conditional requests get 304.
+    """
+    size = request.args.get("size", None)
+    if size is None:
+        return send_from_directory(
+            closet_storage.images_dir.resolve(), filename, max_age=IMAGE_MAX_AGE
+        )
+    if size not in DERIVATIVE_SIZES:
+        return (
+            jsonify({"error": f"size must be one of {', '.join(DERIVATIVE_SIZES)}"}),
+            400,
+        )
+
+    try:
+        derivative = image_derivatives.get(filename, size)
+        if derivative is None:
+            return jsonify({"error": "Image not found"}), 404
+        path, etag = derivative
+        with open(path, "rb") as f:
+            mime_type = sniff_mime_type(f.read(16))
+        return send_file(
+            path.resolve(), mimetype=mime_type, etag=etag, max_age=IMAGE_MAX_AGE
+        )
+    except Exception as e:
+        logger.error(f"Error serving {size} image {filename}: {e}")
+        return jsonify({"error": f"Error serving image: {str(e)}"}), 500
+
+
+def with_image_urls(item):
+    """Add the URLs of an item's image and its thumbnail"""
+    filename = item.get("image_filename")
+    if not filename:
+        return item
+    return {
+        **item,
+        "image_url": url_for("api.serve_image", filename=filename),
+        "thumbnail_url": url_for("api.serve_image", filename=filename, size="thumb"),
+    }
+
+
+@api.route("/tryon/<key>")
+def serve_tryon(key):
+    """Serve a cached try-on render"""
+    path = tryon_cache.get_path(key)
+    if path is None:
+        return jsonify({"error": "Try-on not found"}), 404
+    with open(path, "rb") as f:
+        mime_type = sniff_mime_type(f.read(16))
+    return send_file(path.resolve(), mimetype=mime_type, max_age=TRYON_MAX_AGE)
 
 
 @api.route("/closet", methods=["GET"])
 def get_closet():
-    """Get all items in the closet"""
+    """
+    Get the items in the closet
+
+    Optional query parameters:
+        type, category, season, formality, color: Filters, combined with AND
+        limit: Page size, with a next_cursor returned while more items remain
+        cursor: next_cursor value of the previous page
+        fields: Comma-separated item fields to return (e.g. id,type,image_filename)
+    """
     try:
-        items = closet_storage.get_all_items()
-        return jsonify({"items": items}), 200
+        limit = request.args.get("limit", None)
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                return jsonify({"error": "limit must be an integer"}), 400
+            if not 1 <= limit <= MAX_PAGE_SIZE:
+                return (
+                    jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}),
+                    400,
+                )
+
+        try:
+            items, next_cursor, total = closet_index.query(
+                category=request.args.get("category", None),
+                item_type=request.args.get("type", None),
+                season=request.args.get("season", None),
+                formality=request.args.get("formality", None),
+                color=request.args.get("color", None),
+                limit=limit,
+                cursor=request.args.get("cursor", None),
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        items = [with_image_urls(item) for item in items]
+
+        fields = request.args.get("fields", None)
+        if fields:
+            fields = [field.strip() for field in fields.split(",") if field.strip()]
+            items = [
+                {field: item[field] for field in fields if field in item}
+                for item in items
+            ]
+
+        return (
+            jsonify({"items": items, "next_cursor": next_cursor, "total": total}),
+            200,
+        )
     except Exception as e:
         logger.error(f"Error getting closet items: {e}")
         return jsonify({"error": f"Error getting closet items: {str(e)}"}), 500
@@ -154,6 +701,53 @@ def get_item(item_id):
         return jsonify({"error": f"Error getting item: {str(e)}"}), 500
 
 
+@api.route("/closet/<item_id>/similar", methods=["GET"])
+def get_similar_items(item_id):
+    """Get the items most similar to an item and the items that go with it"""
+    try:
+        limit = request.args.get("limit", 10, type=int)
+        if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+            return (
+                jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}),
+                400,
+            )
+        per_slot = request.args.get("per_slot", 3, type=int)
+        if per_slot is None or not 1 <= per_slot <= MAX_PAGE_SIZE:
+            return (
+                jsonify({"error": f"per_slot must be between 1 and {MAX_PAGE_SIZE}"}),
+                400,
+            )
+
+        similar = garment_similarity.similar_items(item_id, limit=limit)
+        if similar is None:
+            return jsonify({"error": "Item not found"}), 404
+        goes_with = garment_similarity.complementary_candidates(
+            item_id, per_slot=per_slot
+        )
+
+        def with_score(matches):
+            return [{**item, "similarity": score} for item, score in matches]
+
+        return (
+            jsonify(
+                {
+                    "item_id": item_id,
+                    "similar": with_score(similar),
+                    "goes_with": {
+                        slot: with_score(matches) for slot, matches in goes_with.items()
+                    },
+                }
+            ),
+            200,
+        )
+    except RuntimeError as e:
+        logger.error(f"Similarity search unavailable: {e}")
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        logger.error(f"Error getting items similar to {item_id}: {e}")
+        return jsonify({"error": f"Error getting similar items: {str(e)}"}), 500
+
+
 @api.route("/closet/outfits", methods=["GET"])
 def get_outfit_recommendations():
     """Get outfit recommendations with optional filters"""
@@ -163,24 +757,21 @@ def get_outfit_recommendations():
         season = request.args.get("season", None)
         style = request.args.get("style", None)
 
-        outfit_recommendations = generate_outfit_recommendations(
-            closet_storage, occasion=occasion, season=season, style=style
-        )
+        try:
+            outfit_recommendations = outfit_cache.get(
+                occasion=occasion, season=season, style=style
+            )
+        except Exception as e:
+            if not OUTFIT_LOCAL_FALLBACK:
+                raise
+            # Local outfits are not cached, the model is tried again next time
+            logger.warning(f"Outfit model failed, recommending locally: {e}")
+            outfit_recommendations = local_outfits(occasion, season, style)
 
         if outfit_recommendations is None:
             return jsonify({"error": "Outfit recommendations not found"}), 404
 
-        outfit_recommendations_expanded = [
-            {
-                **outfit,
-                "items": [
-                    closet_storage.get_item(item_id) for item_id in outfit["items"]
-                ],
-            }
-            for outfit in outfit_recommendations
-        ]
-
-        return jsonify(outfit_recommendations_expanded), 200
+        return jsonify(with_renders(outfit_recommendations)), 200
 
     except Exception as e:
         logger.error(f"Error getting outfit recommendations: {e}")
@@ -190,26 +781,101 @@ def get_outfit_recommendations():
         )
 
 
+@api.route("/closet/outfits/stream", methods=["GET"])
+def stream_outfit_recommendations_events():
+    """Stream outfit recommendations as server-sent events"""
+    occasion = request.args.get("occasion", None)
+    season = request.args.get("season", None)
+    style = request.args.get("style", None)
+
+    def events():
+        try:
+            for outfit in stream_outfits(occasion, season, style):
+                yield f"event: outfit\ndata: {json.dumps(outfit)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming outfit recommendations: {e}")
+            error = {"error": f"Error getting outfit recommendations: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@socketio.on("recommend_outfits")
+def recommend_outfits_event(data=None):
+    """Push outfit recommendations to the requesting client one by one"""
+    filters = data or {}
+    try:
+        for outfit in stream_outfits(
+            filters.get("occasion"), filters.get("season"), filters.get("style")
+        ):
+            emit("outfit", outfit)
+        emit("outfits_done", {})
+    except Exception as e:
+        logger.error(f"Error streaming outfit recommendations: {e}")
+        emit("outfits_error", {"error": str(e)})
+
+
+@api.route("/person_image", methods=["POST"])
+def upload_person_image():
+    """Store the user's photo used for try-on pre-renders"""
+    file = request.files.get("file")
+    if file is None or not file.filename:
+        return jsonify({"error": "No file part"}), 400
+    if not allowed_file(file.filename):
+        return jsonify({"error": "File type not allowed"}), 400
+    try:
+        os.makedirs(os.path.dirname(TRYON_PERSON_IMAGE) or ".", exist_ok=True)
+        temp_path = f"{TRYON_PERSON_IMAGE}.{os.getpid()}.tmp"
+        file.save(temp_path)
+        os.replace(temp_path, TRYON_PERSON_IMAGE)
+        return jsonify({"person_path": TRYON_PERSON_IMAGE}), 200
+    except Exception as e:
+        logger.error(f"Error saving person image: {e}")
+        return jsonify({"error": f"Error saving person image: {str(e)}"}), 500
+
+
 @api.route("/wearit", methods=["POST"])
 def wear_item():
-    """Wear an item of clothing"""
+    """
+    Wear an item of clothing
+
+    Returns 202 with a job_id right away; the result is available from
+    GET /jobs/<job_id> and pushed as a job_complete SocketIO event. Pass
+    ?wait=1 to wait for the rendered image instead.
+    """
 
     try:
-        fashnClient = FashnClient.getInstance()
         data = request.get_json()
         person_path = data.get("person_path")
         cloth_path = data.get("cloth_path")
         category = data.get("category")
-        image_url, error = fashnClient.wear_it(person_path, cloth_path, category)
-        if error:
-            return jsonify({"error": error.message}), 500
-        else:
-            return (jsonify({"image_url": image_url})), 200
+        job, future = tryon_service.submit(person_path, cloth_path, category)
+        if job["status"] == COMPLETED:
+            return jsonify({**job["result"], "job_id": job["id"]}), 200
+
+        if request.args.get("wait", "").lower() not in ("1", "true"):
+            return jsonify({"job_id": job["id"], "status": job["status"]}), 202
+
+        job = future.result()
+        if job["status"] == FAILED:
+            return jsonify({"error": job["error"], "job_id": job["id"]}), 500
+        return jsonify({**job["result"], "job_id": job["id"]}), 200
     except Exception as e:
         logger.error(f"Error wearing item: {str(e)}")
         return jsonify({"error": f"Error wearing item: {str(e)}"}), 500
 
 
+@api.route("/metrics")
+def metrics():
+    """Expose the application metrics in the Prometheus text format"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
 @api.route("/outfits")
 def outfits():
     """Render the outfits template"""
@@ -1,28 +1,27 @@
-import os
 import logging
-from pathlib import Path
-from dotenv import load_dotenv
 from flask import Flask
-from src.api.routes import api, socketio
+from src.config import load_config
+from src.utils.tracing import configure_tracing
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def create_app():
-    # Get the project root directory (parent of src)
-    root_dir = Path(__file__).parent.parent
+def create_app(**socketio_options):
+    """
+    Create the Flask application
 
-    # Load environment variables from config/.env
-    env_path = root_dir / "config" / ".env"
-    load_dotenv(env_path)
+    Args:
+        **socketio_options: Passed to SocketIO.init_app (e.g. async_mode,
+            message_queue)
+    """
+    load_config()
+    configure_tracing()
 
-    # Verify environment variables
-    required_vars = ["OPENAI_API_KEY"]
-    missing_vars = [var for var in required_vars if not os.getenv(var)]
-    if missing_vars:
-        raise RuntimeError(f"Missing required environment variables: {missing_vars}")
+    # Imported after load_config(), as routes, storage and the clients read
+    # their settings at import time
+    from src.api.routes import api, socketio
 
     app = Flask(__name__, template_folder="templates", static_folder="static")
 
@@ -30,13 +29,16 @@ def create_app():
     app.register_blueprint(api)
 
     # Initialize SocketIO
-    socketio.init_app(app)
+    socketio.init_app(app, **socketio_options)
 
     return app
 
 
-app = create_app()
-
 if __name__ == "__main__":
+    # Development server with the debugger and reloader, see src/server.py
+    # for production
+    app = create_app()
+    from src.api.routes import socketio
+
     logger.info("Starting Flask application...")
     socketio.run(app, debug=True, port=5000)
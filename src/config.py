@@ -0,0 +1,25 @@
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Get the project root directory (parent of src)
+ROOT_DIR = Path(__file__).parent.parent
+
+REQUIRED_VARS = ["OPENAI_API_KEY"]
+
+
+def load_config():
+    """
+    Load environment variables from config/.env and check the required ones
+
+    Variables already set in the environment take precedence. Call this
+    before importing the application modules so their settings see the
+    values from the file.
+    """
+    load_dotenv(ROOT_DIR / "config" / ".env")
+
+    # Verify environment variables
+    missing_vars = [var for var in REQUIRED_VARS if not os.getenv(var)]
+    if missing_vars:
+        raise RuntimeError(f"Missing required environment variables: {missing_vars}")
@@ -0,0 +1,192 @@
+"""
+Production entry point
+
+    python -m src.server
+
+Settings (environment or config/.env):
+    SERVER_HOST, SERVER_PORT: Address to listen on (default 0.0.0.0:5000)
+    SERVER_WORKERS: Worker processes, all accepting connections from one
+        listening socket; set SOCKETIO_MESSAGE_QUEUE so events reach every
+        client, and connect SocketIO clients with the websocket transport
+        (long-polling sessions live in a single worker)
+    JOBS_SHARED_DIR: Directory where job status is shared between the
+        workers (default data/jobs when SERVER_WORKERS > 1)
+    SOCKETIO_ASYNC_MODE: gevent, eventlet, threading or auto (default),
+        which picks the first one installed
+    SOCKETIO_MESSAGE_QUEUE: Message queue URL shared by the workers
+        (e.g. redis://localhost:6379/0)
+    SERVER_SHUTDOWN_TIMEOUT: Seconds given to background jobs on shutdown
+"""
+
+import importlib.util
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+
+from src.config import load_config
+
+logger = logging.getLogger(__name__)
+
+ASYNC_MODES = ("gevent", "eventlet", "threading")
+
+
+def detect_async_mode(requested="auto") -> str:
+    """Return the SocketIO async mode to use"""
+    if requested != "auto":
+        if requested not in ASYNC_MODES:
+            raise ValueError(f"SOCKETIO_ASYNC_MODE must be one of {ASYNC_MODES}")
+        return requested
+    for mode in ("gevent", "eventlet"):
+        if importlib.util.find_spec(mode) is not None:
+            return mode
+    return "threading"
+
+
+def _monkey_patch(async_mode):
+    """Make blocking I/O cooperative; must run before the app is imported"""
+    if async_mode == "gevent":
+        from gevent import monkey
+
+        monkey.patch_all()
+    elif async_mode == "eventlet":
+        import eventlet
+
+        eventlet.monkey_patch()
+
+
+def _raise_system_exit(signum, frame):
+    raise SystemExit(0)
+
+
+def _serve_listener(app, listener, async_mode):
+    """Serve the app on an already listening socket, like SocketIO.run"""
+    # Rebuild the socket after monkey patching, so it is cooperative
+    listener = socket.socket(fileno=listener.detach())
+    if async_mode == "gevent":
+        from gevent import pywsgi
+
+        try:
+            from geventwebsocket.handler import WebSocketHandler
+        except ImportError:
+            server = pywsgi.WSGIServer(listener, app)
+        else:
+            server = pywsgi.WSGIServer(listener, app, handler_class=WebSocketHandler)
+        server.serve_forever()
+    elif async_mode == "eventlet":
+        import eventlet.wsgi
+
+        eventlet.wsgi.server(listener, app)
+    else:
+        from werkzeug.serving import make_server
+
+        host, port = listener.getsockname()[:2]
+        make_server(
+            host, port, app, threaded=True, fd=listener.fileno()
+        ).serve_forever()
+
+
+def serve(host, port, async_mode, listener=None):
+    """
+    Run one server process until it receives SIGINT or SIGTERM
+
+    Args:
+        host, port: Address to listen on
+        async_mode: SocketIO async mode
+        listener: Optional listening socket shared with other workers, used
+            instead of binding host:port
+    """
+    _monkey_patch(async_mode)
+    logging.basicConfig(level=logging.INFO)
+
+    from src.api import routes
+    from src.app import create_app
+
+    app = create_app(
+        async_mode=async_mode,
+        message_queue=os.getenv("SOCKETIO_MESSAGE_QUEUE") or None,
+    )
+    signal.signal(signal.SIGTERM, _raise_system_exit)
+
+    if async_mode == "threading":
+        logger.warning(
+            "Serving with the threading async mode; install gevent or eventlet "
+            "for many concurrent clients"
+        )
+    logger.info(f"Serving on {host}:{port} ({async_mode}, pid {os.getpid()})")
+    try:
+        if listener is not None:
+            _serve_listener(app, listener, async_mode)
+        else:
+            routes.socketio.run(
+                app,
+                host=host,
+                port=port,
+                debug=False,
+                use_reloader=False,
+                log_output=True,
+                allow_unsafe_werkzeug=async_mode == "threading",
+            )
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        logger.info("Shutting down, finishing background jobs")
+        routes.shutdown(timeout=float(os.getenv("SERVER_SHUTDOWN_TIMEOUT", "30")))
+
+
+def main():
+    load_config()
+    host = os.getenv("SERVER_HOST", "0.0.0.0")
+    port = int(os.getenv("SERVER_PORT", "5000"))
+    workers = int(os.getenv("SERVER_WORKERS", "1"))
+    async_mode = detect_async_mode(os.getenv("SOCKETIO_ASYNC_MODE", "auto"))
+
+    if workers <= 1:
+        serve(host, port, async_mode)
+        return
+
+    if not os.getenv("SOCKETIO_MESSAGE_QUEUE"):
+        logger.warning(
+            "SOCKETIO_MESSAGE_QUEUE is not set, SocketIO events only reach "
+            "clients of the worker that emits them"
+        )
+
+    # Jobs run in the worker that accepted them, any worker may be polled
+    os.environ.setdefault("JOBS_SHARED_DIR", "data/jobs")
+
+    # The workers accept connections from one socket bound here, and the
+    # kernel hands each connection to one of them. Spawned workers start from
+    # a clean interpreter, so each can monkey patch.
+    listener = socket.create_server((host, port), backlog=2048)
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=serve,
+            args=(host, port, async_mode, listener),
+            name=f"worker-{index}",
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    listener.close()
+    logger.info(f"Started {workers} workers on {host}:{port}")
+
+    def stop(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    # Ctrl+C reaches the workers directly, each shuts down on its own
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for process in processes:
+        process.join()
+    sys.exit(max(process.exitcode or 0 for process in processes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_loop = None
+_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the shared asyncio event loop, starting it on first use
+
+    The loop runs forever in a daemon thread, so any number of coroutines
+    (e.g. try-ons waiting on a remote API) can wait on it without holding a
+    request thread each.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="event-loop", daemon=True
+            ).start()
+            _loop = loop
+            logger.info("Started the shared event loop")
+        return _loop
+
+
+def run_coroutine(coro):
+    """Schedule a coroutine on the shared loop and return a concurrent Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
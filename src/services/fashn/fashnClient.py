@@ -1,17 +1,42 @@
-import base64
+import asyncio
 import os
 import logging
-from time import sleep
+import threading
+import time
 import httpx
 
+from src.services.event_loop import run_coroutine
+from src.utils.image_prep import prepare_image
+from src.utils.metrics import FASHN_DURATION, FASHN_POLLS
+from src.utils.tracing import span
+
 logger = logging.getLogger(__name__)
 
-Fashn_BASE_URL = "https://api.fashn.ai/v1"
+Fashn_BASE_URL = os.getenv("FASHN_BASE_URL", "https://api.fashn.ai/v1")
 _TIMEOUT = 60
 
+# Images are re-encoded as JPEG, downscaled to this size
+TRYON_IMAGE_MAX_EDGE = int(os.getenv("TRYON_IMAGE_MAX_EDGE", "1536"))
+TRYON_JPEG_QUALITY = int(os.getenv("TRYON_JPEG_QUALITY", "90"))
+
+# Status polling: the interval grows from the first to the max value
+FASHN_POLL_INTERVAL = float(os.getenv("FASHN_POLL_INTERVAL", "0.5"))
+FASHN_MAX_POLL_INTERVAL = float(os.getenv("FASHN_MAX_POLL_INTERVAL", "5"))
+FASHN_POLL_BACKOFF = 1.5
+FASHN_TRYON_TIMEOUT = float(os.getenv("FASHN_TRYON_TIMEOUT", "120"))
+
+# Try-ons running at Fashn at once; further ones wait without a thread
+FASHN_MAX_CONCURRENT = int(os.getenv("FASHN_MAX_CONCURRENT", "10"))
+FASHN_MAX_RETRIES = 3
+
+
+class TryOnError(Exception):
+    """Raised when Fashn reports an error or a try-on does not finish in time"""
 
-# Have to use jpg for the base64 encoding
-# TODO: support other image format
+    def __init__(self, message, name=None):
+        super().__init__(message)
+        self.message = message
+        self.name = name
 
 
 class FashnClient:
@@ -27,10 +52,9 @@ class FashnClient:
                 logger.error("Fashn API key not found in environment variables")
                 raise ValueError("FASHN_API_KEY environment variable is not set")
             FashnClient._instance = self
-            self._client = httpx.Client(
-                base_url=Fashn_BASE_URL,
-                headers={"Authorization": f"Bearer {api_key}"},
-            )
+            self._api_key = api_key
+            self._lock = threading.Lock()
+            self._slots = None
 
     @classmethod
     def getInstance(cls):
@@ -38,19 +62,60 @@ class FashnClient:
             cls._instance = cls()
         return cls._instance
 
-    def _get_image_md5_content(self, image_path) -> tuple[str, bytes]:
-        with open(image_path, "rb") as fp:
-            content = fp.read()
-            image_md5 = base64.b64encode(content).decode("utf-8")
-            base64_string = "data:image/jpg;base64," + image_md5
-        return base64_string
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Client used from the shared event loop, created on first use"""
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.AsyncClient(
+                    base_url=Fashn_BASE_URL, timeout=_TIMEOUT
+                )
+            return self._client
+
+    def _concurrency_slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding running try-ons, created on the shared loop"""
+        with self._lock:
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(FASHN_MAX_CONCURRENT)
+            return self._slots
+
+    def _get_image_md5_content(self, image_path) -> str:
+        # Downscaled, re-encoded and cached per content hash
+        prepared = prepare_image(
+            image_path, max_edge=TRYON_IMAGE_MAX_EDGE, quality=TRYON_JPEG_QUALITY
+        )
+        return prepared.data_url()
+
+    async def _request(self, method, path, **kwargs) -> dict:
+        """Send a request, waiting out rate limits, and return the JSON body"""
+        for attempt in range(FASHN_MAX_RETRIES + 1):
+            response = await self.client.request(
+                method,
+                path,
+                headers={"Authorization": f"Bearer {self._api_key}"},
+                **kwargs,
+            )
+            if response.status_code != 429 or attempt == FASHN_MAX_RETRIES:
+                break
+            try:
+                delay = float(response.headers.get("Retry-After", ""))
+            except ValueError:
+                delay = FASHN_POLL_INTERVAL * 2**attempt
+            logger.warning(f"Rate limited by Fashn, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        response.raise_for_status()
+        return response.json()
 
     # https://developer.Fashnni.ai/api/#section/Examples
-    def _upload_image(self, model_image_path, cloth_image_path, clothing_type):
-        encoded_image_model = self._get_image_md5_content(model_image_path)
-        encoded_image_cloth = self._get_image_md5_content(cloth_image_path)
+    async def _upload_image(self, model_image_path, cloth_image_path, clothing_type):
+        # Image preparation is CPU bound, keep it off the event loop
+        encoded_image_model, encoded_image_cloth = await asyncio.gather(
+            asyncio.to_thread(self._get_image_md5_content, model_image_path),
+            asyncio.to_thread(self._get_image_md5_content, cloth_image_path),
+        )
 
-        response = self._client.post(
+        body = await self._request(
+            "POST",
             "/run",
             json={
                 "model_image": encoded_image_model,
@@ -58,36 +123,96 @@ class FashnClient:
                 "category": clothing_type,  # TODO support other types 'tops' | 'bottoms' | 'one-pieces'
             },
         )
-        body = response.json()
-        task_id = body["id"]
-
-        return task_id
-
-    def _get_image(self, task_id):
-        response = self._client.get(
-            f"/status/{task_id}",
-        )
-        return response.json()
+        if body.get("error"):
+            raise TryOnError(*_error_details(body["error"]))
+        return body["id"]
+
+    async def _get_image(self, task_id):
+        return await self._request("GET", f"/status/{task_id}")
+
+    async def awear_it(self, model_image_path, cloth_image_path, clothing_type) -> str:
+        """
+        Render a garment on a person and return the URL of the result
+
+        Runs on the shared event loop: the status is polled with a growing
+        interval, so waiting try-ons hold no thread.
+
+        Raises:
+            TryOnError: When Fashn reports an error or the try-on times out
+            httpx.HTTPError: When the Fashn API cannot be reached
+        """
+        started = time.perf_counter()
+        outcome = "failed"
+        try:
+            async with self._concurrency_slots():
+                with span("fashn.upload", category=clothing_type):
+                    task_id = await self._upload_image(
+                        model_image_path, cloth_image_path, clothing_type
+                    )
+                with span("fashn.poll", task_id=task_id) as current:
+                    output = await self._poll(task_id, current)
+            outcome = "completed"
+            return output
+        except TryOnError as e:
+            if e.name == "TimeoutError":
+                outcome = "timeout"
+            raise
+        finally:
+            FASHN_DURATION.labels(outcome).observe(time.perf_counter() - started)
+
+    async def _poll(self, task_id, current_span) -> str:
+        """Poll a try-on with a growing interval until it has finished"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + FASHN_TRYON_TIMEOUT
+        interval = FASHN_POLL_INTERVAL
+        polls = 0
+        outcome = "failed"
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                response = await self._get_image(task_id)
+                polls += 1
+                current_span.set_attribute("polls", polls)
+                if response.get("error") is not None:
+                    raise TryOnError(*_error_details(response["error"]))
+                if response["status"] == "completed":
+                    logger.info(f"Try-on {task_id} completed after {polls} polls")
+                    outcome = "completed"
+                    return response["output"][0]
+                if response["status"] in ("failed", "canceled"):
+                    raise TryOnError(f"Try-on {task_id} {response['status']}")
+                if loop.time() + interval > deadline:
+                    outcome = "timeout"
+                    raise TryOnError(
+                        f"Try-on {task_id} did not finish in {FASHN_TRYON_TIMEOUT}s",
+                        name="TimeoutError",
+                    )
+                interval = min(interval * FASHN_POLL_BACKOFF, FASHN_MAX_POLL_INTERVAL)
+        finally:
+            FASHN_POLLS.labels(outcome).observe(polls)
+
+    async def adownload(self, url) -> bytes:
+        """Download a rendered image (output URLs expire after a while)"""
+        response = await self.client.get(url)
+        response.raise_for_status()
+        return response.content
 
     def wear_it(self, model_image_path, cloth_image_path, clothing_type):
-        task_id = self._upload_image(model_image_path, cloth_image_path, clothing_type)
-        response = None
-
-        # Get the image
-        for i in range(50):
-            response = self._get_image(task_id)
-            if response["status"] == "completed" or response["error"] is not None:
-                break
-            else:
-                print("sleeping")
-                sleep(2)
-        error = response["error"]
-        if error is not None:
+        """Blocking version of awear_it(), returning (output_url, error)"""
+        try:
+            future = run_coroutine(
+                self.awear_it(model_image_path, cloth_image_path, clothing_type)
+            )
+            return future.result(), None
+        except TryOnError as error:
             return "", error
 
-        # Print the output URL to download the enhanced image
-        output_url = response["output"][0]
-        return output_url, error
+
+def _error_details(error):
+    """Return (message, name) of an error reported by Fashn"""
+    if isinstance(error, dict):
+        return error.get("message") or str(error), error.get("name")
+    return str(error), None
 
 
 # client = FashnClient.getInstance()
@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from src.services.jobs import COMPLETED, FAILED
+from src.services.outfits.candidates import outfit_slot
+
+logger = logging.getLogger(__name__)
+
+TRYON_PRERENDER = os.getenv("TRYON_PRERENDER", "false").lower() in ("1", "true")
+TRYON_PRERENDER_OUTFITS = int(os.getenv("TRYON_PRERENDER_OUTFITS", "2"))
+TRYON_PRERENDER_CONCURRENCY = int(os.getenv("TRYON_PRERENDER_CONCURRENCY", "4"))
+TRYON_PRERENDER_QUOTA = int(os.getenv("TRYON_PRERENDER_QUOTA", "20"))
+TRYON_PRERENDER_QUOTA_WINDOW = float(os.getenv("TRYON_PRERENDER_QUOTA_WINDOW", "3600"))
+
+# Outfit slots Fashn can render, named like its garment categories
+TRYON_CATEGORIES = ("tops", "bottoms", "one-pieces")
+
+
+class TryOnPrerenderer:
+    """
+    Starts try-ons of recommended outfits before the user asks for them.
+
+    Each garment of the first outfits is rendered on the user's person photo
+    through the TryOnService, so a later /wearit for it is a cache hit. At
+    most ``max_concurrent`` pre-renders run at once (others are skipped and
+    retried on a later request), and each user may start ``quota`` renders
+    per ``window`` seconds; cached renders are free.
+    """
+
+    def __init__(
+        self,
+        service,
+        max_outfits=TRYON_PRERENDER_OUTFITS,
+        max_concurrent=TRYON_PRERENDER_CONCURRENCY,
+        quota=TRYON_PRERENDER_QUOTA,
+        window=TRYON_PRERENDER_QUOTA_WINDOW,
+    ):
+        self.service = service
+        self.max_outfits = max_outfits
+        self.max_concurrent = max_concurrent
+        self.quota = quota
+        self.window = window
+        self._lock = threading.Lock()
+        self._running = {}
+        self._started = defaultdict(deque)
+
+    def _take_quota(self, user):
+        """Count a render against the user's quota, False if none is left"""
+        now = time.monotonic()
+        started = self._started[user]
+        while started and started[0] <= now - self.window:
+            started.popleft()
+        if len(started) >= self.quota:
+            return False
+        started.append(now)
+        return True
+
+    def _handle(self, item, job):
+        handle = {"item_id": item["id"], "category": item["category"]}
+        if job is None:
+            return {**handle, "status": "skipped"}
+        handle["job_id"] = job["id"]
+        if job["status"] == COMPLETED:
+            return {
+                **handle,
+                "status": "ready",
+                "image_url": job["result"]["image_url"],
+            }
+        if job["status"] == FAILED:
+            return {**handle, "status": "failed"}
+        return {**handle, "status": "pending"}
+
+    def _render(self, user, person_path, item):
+        """Return the job rendering an item, starting it if allowed"""
+        key = (person_path, item["image_path"], item["category"])
+        with self._lock:
+            job_id = self._running.get(key)
+            if job_id is not None:
+                job = self.service.registry.get(job_id)
+                if job is not None:
+                    return job
+
+        if self.service.cache is not None:
+            cache_key = self.service.cache.key(*key)
+            if self.service.cache.get_path(cache_key) is not None:
+                job, _ = self.service.submit(*key)
+                return job
+
+        with self._lock:
+            if len(self._running) >= self.max_concurrent:
+                return None
+            if not self._take_quota(user):
+                logger.info(f"Try-on pre-render quota reached for {user}")
+                return None
+            job, future = self.service.submit(*key)
+            self._running[key] = job["id"]
+
+        def finished(_):
+            with self._lock:
+                self._running.pop(key, None)
+
+        future.add_done_callback(finished)
+        return job
+
+    def prerender(self, outfits, person_path, user=None):
+        """
+        Start rendering the garments of the first outfits
+
+        Args:
+            outfits: Expanded outfits (with item dicts), best first
+            person_path: Path of the user's person photo
+            user: Key the quota is counted against (default: the photo path)
+
+        Returns:
+            The outfits, the first ones with a "renders" list of handles
+            (status ready, pending, failed or skipped, with job_id and
+            image_url when known)
+        """
+        if not os.path.isfile(person_path):
+            logger.debug(f"No person photo at {person_path}, skipping pre-render")
+            return outfits
+
+        user = user or person_path
+        rendered = []
+        for index, outfit in enumerate(outfits):
+            if index >= self.max_outfits:
+                rendered.append(outfit)
+                continue
+            renders = []
+            for item in outfit["items"]:
+                if not item or outfit_slot(item) not in TRYON_CATEGORIES:
+                    continue
+                try:
+                    job = self._render(user, person_path, item)
+                except (ValueError, OSError) as e:
+                    logger.warning(f"Cannot pre-render item {item['id']}: {e}")
+                    job = None
+                renders.append(self._handle(item, job))
+            rendered.append({**outfit, "renders": renders})
+        return rendered
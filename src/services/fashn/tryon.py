@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from concurrent.futures import Future
+
+from src.services.event_loop import run_coroutine
+from src.services.jobs import COMPLETED, FAILED, RUNNING
+
+logger = logging.getLogger(__name__)
+
+
+class TryOnService:
+    """
+    Runs Fashn try-ons as background jobs on the shared event loop.
+
+    Jobs are recorded in a JobRegistry like classification jobs, and the
+    optional ``on_done`` callback receives a copy of every finished job.
+    With a TryOnCache, renders are downloaded and stored locally: repeated
+    try-ons complete immediately and identical ones in flight share a render.
+    Results hold the local ``image_url`` built by ``url_for_key``.
+    """
+
+    def __init__(self, registry, on_done=None, cache=None, url_for_key=None):
+        self.registry = registry
+        self.on_done = on_done
+        self.cache = cache
+        self.url_for_key = url_for_key
+        # Renders in progress by cache key, only touched from the event loop
+        self._renders = {}
+
+    def _cached_result(self, key):
+        if self.cache is None or self.cache.get_path(key) is None:
+            return None
+        return {"image_url": self.url_for_key(key), "cached": True}
+
+    def submit(self, person_path, cloth_path, category):
+        """
+        Start a try-on in the background
+
+        Returns:
+            A copy of the new job and a concurrent Future resolving to the
+            finished job; cached try-ons are returned already completed
+
+        Raises:
+            ValueError: When the Fashn API key is not configured
+            OSError: When an image file cannot be read
+        """
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(person_path, cloth_path, category)
+            result = self._cached_result(key)
+            if result is not None:
+                job = self.registry.create(
+                    "tryon",
+                    person_path=person_path,
+                    cloth_path=cloth_path,
+                    category=category,
+                    status=COMPLETED,
+                    result=result,
+                )
+                future = Future()
+                future.set_result(job)
+                return job, future
+
+        # httpx and the image pipeline are loaded with the first try-on
+        from src.services.fashn.fashnClient import FashnClient
+
+        client = FashnClient.getInstance()
+        job = self.registry.create(
+            "tryon", person_path=person_path, cloth_path=cloth_path, category=category
+        )
+        future = run_coroutine(
+            self._run(client, job["id"], key, person_path, cloth_path, category)
+        )
+        return job, future
+
+    async def _render(self, client, key, person_path, cloth_path, category):
+        """Render a try-on and store it in the cache, returning the job result"""
+        image_url = await client.awear_it(person_path, cloth_path, category)
+        if self.cache is None:
+            return {"image_url": image_url}
+        data = await client.adownload(image_url)
+        await asyncio.to_thread(self.cache.put, key, data)
+        return {"image_url": self.url_for_key(key), "source_url": image_url}
+
+    async def _run(self, client, job_id, key, person_path, cloth_path, category):
+        """Run a try-on, sharing the render of an identical one in flight"""
+        self.registry.update(job_id, status=RUNNING)
+        try:
+            render = self._renders.get(key) if key is not None else None
+            if render is None:
+                render = asyncio.ensure_future(
+                    self._render(client, key, person_path, cloth_path, category)
+                )
+                if key is not None:
+                    self._renders[key] = render
+                    render.add_done_callback(lambda _: self._renders.pop(key, None))
+            result = await asyncio.shield(render)
+            job = self.registry.update(job_id, status=COMPLETED, result=result)
+        except Exception as e:
+            logger.error(f"Try-on job {job_id} failed: {e}")
+            job = self.registry.update(job_id, status=FAILED, error=str(e))
+
+        if self.on_done is not None and job is not None:
+            try:
+                self.on_done(job)
+            except Exception as e:
+                logger.error(f"Error notifying completion of job {job_id}: {e}")
+        return job
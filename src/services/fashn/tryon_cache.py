@@ -0,0 +1,62 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+
+from src.utils.disk_cache import DiskLRUCache
+
+logger = logging.getLogger(__name__)
+
+TRYON_CACHE_DIR = os.getenv("TRYON_CACHE_DIR", "data/cache/tryon")
+TRYON_CACHE_MAX_BYTES = int(os.getenv("TRYON_CACHE_MAX_BYTES", "536870912"))
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+
+
+class TryOnCache:
+    """
+    Persistent cache of rendered try-on images.
+
+    Renders are keyed by the content hashes of the person and garment images
+    and the garment category, and stored as files under ``directory`` with
+    LRU eviction beyond ``max_bytes``. File hashes are memoized per path,
+    modification time and size, so the same person photo is hashed once.
+    """
+
+    def __init__(self, directory=TRYON_CACHE_DIR, max_bytes=TRYON_CACHE_MAX_BYTES):
+        self._cache = DiskLRUCache(directory, max_bytes=max_bytes)
+        self._lock = threading.Lock()
+        self._file_hashes = {}
+
+    def file_hash(self, path) -> str:
+        """Return the SHA-256 of a file, reusing it while the file is unchanged"""
+        stat = os.stat(path)
+        signature = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._file_hashes.get(signature)
+        if digest is None:
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            with self._lock:
+                if len(self._file_hashes) >= 1024:
+                    self._file_hashes.clear()
+                self._file_hashes[signature] = digest
+        return digest
+
+    def key(self, person_path, garment_path, category) -> str:
+        """Return the cache key of a try-on"""
+        parts = (self.file_hash(person_path), self.file_hash(garment_path), category)
+        return hashlib.sha1(":".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+    def get_path(self, key):
+        """Return the path of a cached render, or None"""
+        if not _KEY_PATTERN.match(key):
+            return None
+        return self._cache.get_path(key)
+
+    def put(self, key, data):
+        """Store a rendered image"""
+        path = self._cache.put(key, data)
+        logger.info(f"Cached try-on {key} ({len(data)} bytes)")
+        return path
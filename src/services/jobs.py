@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Job statuses
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when a job queue has no room for another job"""
+
+
+class JobRegistry:
+    """
+    In-memory registry of background jobs that can be looked up by id.
+
+    Only the most recent ``max_jobs`` jobs are kept, so finished jobs do not
+    accumulate forever. With ``shared_dir``, every job is also written there
+    as JSON, so worker processes sharing a listening socket can report the
+    jobs of the others.
+    """
+
+    def __init__(self, max_jobs=10000, shared_dir=None):
+        self.max_jobs = max_jobs
+        self.shared_dir = Path(shared_dir) if shared_dir else None
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def _shared_path(self, job_id):
+        return self.shared_dir / f"{job_id}.json"
+
+    def _share(self, job):
+        """Write a job to the shared directory, replacing it atomically"""
+        if self.shared_dir is None:
+            return
+        path = self._shared_path(job["id"])
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            self.shared_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(job, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.warning(f"Could not share job {job['id']}: {e}")
+
+    def _unshare(self, job_id):
+        if self.shared_dir is not None:
+            self._shared_path(job_id).unlink(missing_ok=True)
+
+    def _load_shared(self, job_id):
+        """Read a job written by another process, or None"""
+        if self.shared_dir is None or not job_id.isalnum():
+            return None
+        try:
+            with open(self._shared_path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def create(self, kind, **data):
+        """Register a new pending job and return a copy of it"""
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": PENDING,
+            "created_at": now,
+            "updated_at": now,
+            "result": None,
+            "error": None,
+            **data,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            evicted = []
+            while len(self._jobs) > self.max_jobs:
+                evicted.append(self._jobs.popitem(last=False)[0])
+        self._share(job)
+        for job_id in evicted:
+            self._unshare(job_id)
+        return dict(job)
+
+    def update(self, job_id, **fields):
+        """Update a job and return a copy of it, or None if it is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(fields, updated_at=time.time())
+            job = dict(job)
+        self._share(job)
+        return job
+
+    def get(self, job_id):
+        """Return a copy of a job, or None if it is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        return self._load_shared(job_id)
+
+
+class JobQueue:
+    """
+    Bounded thread pool that runs registered jobs in the background.
+
+    At most ``max_pending`` jobs can be queued or running at once; further
+    submissions raise QueueFullError instead of growing the backlog. The
+    optional ``on_done`` callback receives a copy of every finished job.
+    """
+
+    def __init__(self, registry, name, max_workers=4, max_pending=100, on_done=None):
+        self.registry = registry
+        self.name = name
+        self.on_done = on_done
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending_lock = threading.Lock()
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name
+        )
+
+    def submit(self, kind, fn, *args, **data):
+        """
+        Run fn(*args) in the background as a new job
+
+        Args:
+            kind: Job kind reported by the job status
+            fn: Callable whose return value becomes the job result
+            *args: Arguments passed to fn
+            **data: Extra fields stored on the job (e.g. item_id)
+
+        Returns:
+            A copy of the new job
+        """
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError(f"The {self.name} queue is full")
+        self._count_pending(1)
+        try:
+            job = self.registry.create(kind, **data)
+            self._executor.submit(self._run, job["id"], fn, args)
+        except Exception:
+            self._count_pending(-1)
+            self._slots.release()
+            raise
+        return job
+
+    def _count_pending(self, delta):
+        with self._pending_lock:
+            self._pending += delta
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs queued or running"""
+        return self._pending
+
+    def _run(self, job_id, fn, args):
+        """Run a job and record its outcome"""
+        try:
+            self.registry.update(job_id, status=RUNNING)
+            result = fn(*args)
+            job = self.registry.update(job_id, status=COMPLETED, result=result)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+            job = self.registry.update(job_id, status=FAILED, error=str(e))
+        finally:
+            self._count_pending(-1)
+            self._slots.release()
+
+        if self.on_done is not None and job is not None:
+            try:
+                self.on_done(job)
+            except Exception as e:
+                logger.error(f"Error notifying completion of job {job_id}: {e}")
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs and optionally wait for running ones"""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import logging
+import os
+
+from src.services.llm.prompt_templates import clothing_item
+from src.utils.disk_cache import DiskLRUCache
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR", "data/cache/analysis")
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "10000"))
+
+
+def schema_fingerprint() -> str:
+    """Return a short hash of the clothing_item prompt schema"""
+    schema = json.dumps(clothing_item, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(schema).hexdigest()[:12]
+
+
+class AnalysisCache:
+    """
+    Persistent cache of clothing analyses keyed by image content hash.
+
+    Keys are prefixed with a fingerprint of the ``clothing_item`` schema, so
+    changing the prompt schema makes every older entry a miss. Stale entries
+    are purged when the cache is opened.
+    """
+
+    def __init__(self, directory=ANALYSIS_CACHE_DIR, max_entries=None):
+        self.fingerprint = schema_fingerprint()
+        self._cache = DiskLRUCache(
+            directory,
+            max_entries=max_entries or ANALYSIS_CACHE_MAX_ENTRIES,
+            suffix=".json",
+        )
+        self.purge_stale()
+
+    def _key(self, image_sha256):
+        return f"{self.fingerprint}-{image_sha256}"
+
+    def get(self, image_sha256):
+        """Return the cached analysis for an image hash, or None"""
+        data = self._cache.get(self._key(image_sha256))
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            logger.warning(f"Dropping corrupted analysis cache entry {image_sha256}")
+            self.invalidate(image_sha256)
+            return None
+
+    def put(self, image_sha256, analysis):
+        """Store the analysis for an image hash"""
+        self._cache.put(self._key(image_sha256), json.dumps(analysis).encode("utf-8"))
+
+    def invalidate(self, image_sha256):
+        """Remove the cached analysis for an image hash"""
+        self._cache.delete(self._key(image_sha256))
+
+    def purge_stale(self):
+        """Remove entries created with a different prompt schema"""
+        stale = [
+            key
+            for key in self._cache.keys()
+            if not key.startswith(f"{self.fingerprint}-")
+        ]
+        for key in stale:
+            self._cache.delete(key)
+        if stale:
+            logger.info(f"Purged {len(stale)} analyses from an older prompt schema")
+
+    def clear(self):
+        """Remove every cached analysis"""
+        for key in self._cache.keys():
+            self._cache.delete(key)
+
+
+_analysis_cache = None
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Return the shared analysis cache, creating it on first use"""
+    global _analysis_cache
+    if _analysis_cache is None:
+        _analysis_cache = AnalysisCache()
+    return _analysis_cache
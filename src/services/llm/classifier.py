@@ -1,25 +1,29 @@
-import base64
 import json
 import logging
 import os
+from typing import Union
 
-import requests
-from langchain_openai import ChatOpenAI
+import httpx
 
+from src.services.llm.analysis_cache import get_analysis_cache
 from src.services.llm.prompt_templates import clothing_item
+from src.services.llm.rate_limiter import RateLimiter
+from src.services.llm.transport import get_transport
+from src.utils.image_prep import prepare_image
+from src.utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Shared by the background classification queue and batch uploads
+vision_rate_limiter = RateLimiter(int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "0")))
 
-def analyze_image_with_vision_api(image_path: str) -> str:
-    """Analyze image using OpenAI's vision API directly"""
-    api_key = os.getenv("OPENAI_API_KEY")
-
-    # Read and encode the image
-    with open(image_path, "rb") as image_file:
-        base64_image = base64.b64encode(image_file.read()).decode("utf-8")
 
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
+def analyze_image_with_vision_api(
+    image: Union[str, bytes], image_sha256: str = None
+) -> str:
+    """Analyze image using OpenAI's vision API directly"""
+    # Downscale and re-encode the image to keep the request small
+    prepared_image = prepare_image(image, sha256=image_sha256)
 
     payload = {
         "model": "gpt-4o",
@@ -38,7 +42,7 @@ def analyze_image_with_vision_api(image_path: str) -> str:
                     },
                     {
                         "type": "image_url",
-                        "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
+                        "image_url": {"url": prepared_image.data_url()},
                     },
                 ],
             }
@@ -47,15 +51,15 @@ def analyze_image_with_vision_api(image_path: str) -> str:
     }
 
     try:
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions", headers=headers, json=payload
-        )
-        response.raise_for_status()
+        # Share the request budget with every other classification in flight
+        with span("openai.vision", model=payload["model"]):
+            response_json = get_transport().chat_completion(
+                payload, rate_limiter=vision_rate_limiter
+            )
 
         # Log the raw response for debugging
-        logger.info(f"Raw API response: {response.text}")
+        logger.info(f"Raw API response: {json.dumps(response_json)}")
 
-        response_json = response.json()
         if "choices" not in response_json or not response_json["choices"]:
             raise ValueError("No choices in response")
 
@@ -66,10 +70,11 @@ def analyze_image_with_vision_api(image_path: str) -> str:
         # First, try to find JSON-like structure
         import re
 
-        json_match = re.search(r"\{.*\}", content, re.DOTALL)
-        if json_match:
-            json_str = json_match.group()
-            return json.loads(json_str)
+        with span("classifier.parse", content_length=len(content)):
+            json_match = re.search(r"\{.*\}", content, re.DOTALL)
+            if json_match:
+                json_str = json_match.group()
+                return json.loads(json_str)
 
         # If no JSON found, create a structured response
         logger.warning("No JSON found in response, creating structured response")
@@ -77,7 +82,7 @@ def analyze_image_with_vision_api(image_path: str) -> str:
         result["description"] = content
         return result
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"API request failed: {str(e)}")
         raise
     except json.JSONDecodeError as e:
@@ -88,17 +93,36 @@ def analyze_image_with_vision_api(image_path: str) -> str:
         raise
 
 
-def process_clothing_image(image_path: str) -> dict:
-    """Process a clothing image and classify it."""
+def process_clothing_image(image: Union[str, bytes], image_sha256: str = None) -> dict:
+    """
+    Process a clothing image and classify it.
+
+    The image can be given as a file path or as the image bytes.
+
+    When the SHA-256 of the image bytes is given, a cached analysis of the same
+    image is returned without calling the vision API, and complete analyses
+    are added to the cache.
+    """
+    cache = get_analysis_cache() if image_sha256 else None
+    if cache is not None:
+        cached = cache.get(image_sha256)
+        if cached is not None:
+            logger.info(f"Using cached analysis for image {image_sha256}")
+            return cached
+
     try:
         # Get structured analysis directly from vision API
-        result = analyze_image_with_vision_api(image_path)
+        result = analyze_image_with_vision_api(image, image_sha256=image_sha256)
 
         # Ensure all required fields are present
         required_fields = clothing_item.keys()
-        for field in required_fields:
-            if field not in result:
-                result[field] = "Not specified"
+        missing_fields = [field for field in required_fields if field not in result]
+        for field in missing_fields:
+            result[field] = "Not specified"
+
+        # Only complete analyses are worth reusing
+        if cache is not None and not missing_fields and result.get("type") != "unknown":
+            cache.put(image_sha256, result)
 
         return result
 
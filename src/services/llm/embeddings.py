@@ -0,0 +1,75 @@
+import hashlib
+import logging
+import os
+
+from src.services.llm.transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIMENSIONS = int(os.getenv("OPENAI_EMBEDDING_DIMENSIONS", "256"))
+
+# Inputs sent per embeddings request
+EMBEDDING_BATCH_SIZE = 256
+
+
+def _names(values) -> list[str]:
+    """Return the names of a list of strings or attribute dicts"""
+    if not isinstance(values, list):
+        return []
+    names = []
+    for value in values:
+        if isinstance(value, dict):
+            value = value.get("name") or value.get("type")
+        if value and value != "none":
+            names.append(str(value))
+    return names
+
+
+def item_embedding_text(item: dict) -> str:
+    """Describe the visual and styling attributes of an item as one text"""
+    derived = item.get("derived_properties")
+    if not isinstance(derived, dict):
+        derived = {}
+    parts = [
+        f"{item.get('type', '')} ({item.get('category', '')})",
+        item.get("description", ""),
+        "colors: " + ", ".join(_names(item.get("colors"))),
+        "patterns: " + ", ".join(_names(item.get("patterns"))),
+        f"formality: {derived.get('formality', '')}",
+        "styles: " + ", ".join(_names(derived.get("style_categories"))),
+    ]
+    return "\n".join(part for part in parts if part)
+
+
+def text_fingerprint(text: str) -> str:
+    """Return a short hash identifying an embedding input"""
+    key = f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}:{text}".encode("utf-8")
+    return hashlib.sha256(key).hexdigest()[:16]
+
+
+def embed_texts(texts: list[str]) -> list[list[float]]:
+    """
+    Compute embeddings for a list of texts
+
+    Returns:
+        One embedding per text, in the same order
+
+    Raises:
+        httpx.HTTPError: When the embeddings request fails
+    """
+    embeddings = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        batch = texts[start : start + EMBEDDING_BATCH_SIZE]
+        result = get_transport().post(
+            "/embeddings",
+            {
+                "model": EMBEDDING_MODEL,
+                "input": batch,
+                "dimensions": EMBEDDING_DIMENSIONS,
+            },
+        )
+        data = sorted(result["data"], key=lambda entry: entry["index"])
+        embeddings.extend(entry["embedding"] for entry in data)
+    logger.info(f"Computed {len(embeddings)} embeddings with {EMBEDDING_MODEL}")
+    return embeddings
@@ -3,19 +3,34 @@ import logging
 import os
 import re
 
-import requests
-
 from src.services.llm.prompt_templates import (
     outfit_recommendations,
     outfit_recommender_system_prompt,
 )
-from src.utils.storage import ClosetStorage
+from src.services.llm.transport import get_transport
+from src.services.outfits.candidates import select_candidates
+from src.utils.storage import BaseClosetStorage
+from src.utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on the estimated size of the outfit prompt
+OUTFIT_PROMPT_TOKEN_BUDGET = int(os.getenv("OUTFIT_PROMPT_TOKEN_BUDGET", "12000"))
+
+ITEM_TABLE_COLUMNS = (
+    "id|type|category|colors|patterns|formality|seasons|styles|dress_codes"
+)
+SEASON_CODES = {"spring": "sp", "summer": "su", "fall": "fa", "winter": "wi"}
+
+# Locally ranked combinations suggested to the model
+OUTFIT_PRERANK_COUNT = int(os.getenv("OUTFIT_PRERANK_COUNT", "5"))
+
+# Encoded table rows, keyed by item id
+_encoded_items = {}
+
 
 def generate_outfit_recommendations(
-    closet: ClosetStorage,
+    closet: BaseClosetStorage,
     occasion: str = None,
     season: str = None,
     style: str = None,
@@ -24,7 +39,7 @@ def generate_outfit_recommendations(
     Generate outfit recommendations based on available clothes in the closet.
 
     Args:
-        closet: ClosetStorage instance
+        closet: Closet storage backend
         occasion: Optional filter for specific occasions
         season: Optional filter for specific seasons
         style: Optional filter for specific styles
@@ -33,46 +48,15 @@ def generate_outfit_recommendations(
         List of outfit recommendations, each containing item combinations and styling advice
     """
     try:
-        # Initialize storage and get all items
-        available_items = closet.get_all_items()
-
-        if not available_items:
+        payload = _build_outfit_payload(closet, occasion, season, style)
+        if payload is None:
             return []
 
-        # Create prompt for GPT-4
-        prompt = _create_outfit_prompt(available_items, occasion, season, style)
-
-        # Get API key
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
-
-        # Prepare the API request
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}",
-        }
-
-        payload = {
-            "model": "gpt-4o",
-            "messages": [
-                {
-                    "role": "system",
-                    "content": outfit_recommender_system_prompt,
-                },
-                {"role": "user", "content": prompt},
-            ],
-            "max_tokens": 1000,
-        }
-
         # Make API request
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions", headers=headers, json=payload
-        )
-        response.raise_for_status()
+        with span("openai.chat", model=payload["model"]):
+            result = get_transport().chat_completion(payload)
 
         # Parse response
-        result = response.json()
         outfits = _parse_outfit_response(result["choices"][0]["message"]["content"])
 
         return outfits
@@ -82,8 +66,228 @@ def generate_outfit_recommendations(
         raise
 
 
+def _outfit_candidates(closet, occasion, season, style):
+    """Return the ready items that fit the request, capped per outfit slot"""
+    # Get all items, skipping those still being classified
+    available_items = [
+        item
+        for item in closet.get_all_items()
+        if item.get("status", "ready") == "ready"
+    ]
+    return select_candidates(available_items, occasion, season, style)
+
+
+def recommend_outfits_locally(
+    closet: BaseClosetStorage,
+    occasion: str = None,
+    season: str = None,
+    style: str = None,
+) -> list[dict]:
+    """
+    Generate outfit recommendations with the local rule-based engine
+
+    Takes the same arguments and returns the same shape as
+    generate_outfit_recommendations(), without calling the model.
+    """
+    # numpy is imported with the local engine, on first use
+    from src.services.outfits.local_recommender import generate_local_outfits
+
+    candidates = _outfit_candidates(closet, occasion, season, style)
+    return generate_local_outfits(candidates, occasion, season, style)
+
+
+def _prerank(candidates, occasion, season, style):
+    """Rank combinations locally, returning the items of the best ones"""
+    from src.services.outfits.local_recommender import rank_outfits
+
+    try:
+        ranked = rank_outfits(
+            candidates, occasion, season, style, count=OUTFIT_PRERANK_COUNT
+        )
+    except RuntimeError as e:
+        logger.warning(f"Skipping outfit pre-ranking: {e}")
+        return []
+    return [pieces for _, pieces in ranked]
+
+
+def _build_outfit_payload(closet, occasion, season, style):
+    """Build the chat completion payload, or None if no item is available"""
+    with span("outfits.prompt") as current:
+        candidates = _outfit_candidates(closet, occasion, season, style)
+        current.set_attribute("candidates", len(candidates))
+        if not candidates:
+            return None
+
+        # Put the items of the best local combinations first, so they survive
+        # trimming to the token budget, and suggest those combinations
+        suggestions = _prerank(candidates, occasion, season, style)
+        suggested_ids = {piece["id"] for pieces in suggestions for piece in pieces}
+        candidates = sorted(
+            candidates, key=lambda item: item["id"] not in suggested_ids
+        )
+
+        # Create prompt for GPT-4
+        prompt = _create_outfit_prompt(candidates, occasion, season, style, suggestions)
+
+    return {
+        "model": "gpt-4o",
+        "messages": [
+            {
+                "role": "system",
+                "content": outfit_recommender_system_prompt,
+            },
+            {"role": "user", "content": prompt},
+        ],
+        "max_tokens": 1000,
+    }
+
+
+def stream_outfit_recommendations(
+    closet: BaseClosetStorage,
+    occasion: str = None,
+    season: str = None,
+    style: str = None,
+):
+    """
+    Generate outfit recommendations, yielding each outfit as soon as it is complete
+
+    Same arguments as generate_outfit_recommendations(). The completion is
+    streamed and every object of the "outfits" array is parsed as soon as its
+    closing brace arrives.
+    """
+    payload = _build_outfit_payload(closet, occasion, season, style)
+    if payload is None:
+        return
+
+    parser = OutfitStreamParser()
+    count = 0
+    with span("openai.chat.stream", model=payload["model"]) as current:
+        for chunk in get_transport().stream_chat_completion(payload):
+            for outfit in parser.feed(chunk):
+                count += 1
+                yield outfit
+        current.set_attribute("outfits", count)
+    if not count:
+        raise ValueError("No outfits found in response")
+
+
+class OutfitStreamParser:
+    """
+    Incremental parser for a streamed {"outfits": [...]} response.
+
+    feed() accepts arbitrary chunks of the response text and returns the
+    outfit objects completed by that chunk. Brace depth is tracked outside of
+    JSON strings, so braces inside descriptions do not confuse it.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0
+        self._in_array = False
+        self._depth = 0
+        self._start = None
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> list[dict]:
+        self._buffer += chunk
+        outfits = []
+
+        if not self._in_array:
+            match = re.search(r'"outfits"\s*:\s*\[', self._buffer)
+            if not match:
+                return outfits
+            self._in_array = True
+            self._position = match.end()
+
+        buffer = self._buffer
+        for index in range(self._position, len(buffer)):
+            char = buffer[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._start = index
+                self._depth += 1
+            elif char == "}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        outfits.append(json.loads(buffer[self._start : index + 1]))
+                    except json.JSONDecodeError as e:
+                        logger.error(f"Skipping malformed outfit in stream: {e}")
+
+        # Drop text that is no longer needed
+        keep_from = self._start if self._depth else len(buffer)
+        self._buffer = buffer[keep_from:]
+        self._start = 0 if self._depth else None
+        self._position = len(buffer) - keep_from
+        return outfits
+
+
+def _field(value) -> str:
+    """Render a value as one cell of the item table"""
+    if isinstance(value, (list, tuple)):
+        value = "/".join(str(v) for v in value if v and v != "none")
+    return str(value or "-").replace("|", "/").replace("\n", " ").strip()
+
+
+def _encode_item(item: dict) -> str:
+    """Encode the styling-relevant attributes of an item as one table row"""
+    derived = item.get("derived_properties")
+    if not isinstance(derived, dict):
+        derived = {}
+    seasons = derived.get("season_suitability")
+    if not isinstance(seasons, dict):
+        seasons = {}
+    colors = item.get("colors") if isinstance(item.get("colors"), list) else []
+    patterns = item.get("patterns") if isinstance(item.get("patterns"), list) else []
+
+    return "|".join(
+        _field(value)
+        for value in (
+            item.get("id"),
+            item.get("type"),
+            item.get("category"),
+            [color.get("name") for color in colors if isinstance(color, dict)],
+            [pattern.get("type") for pattern in patterns if isinstance(pattern, dict)],
+            derived.get("formality"),
+            [SEASON_CODES[s] for s in SEASON_CODES if seasons.get(s) is True],
+            derived.get("style_categories"),
+            derived.get("dress_code_compatibility"),
+        )
+    )
+
+
+def _encoded_item(item: dict) -> str:
+    """Return the table row of an item, reusing it while the item is unchanged"""
+    cached = _encoded_items.get(item["id"])
+    # Storage replaces items instead of mutating them, so identity means unchanged
+    if cached is not None and cached[0] is item:
+        return cached[1]
+    row = _encode_item(item)
+    _encoded_items[item["id"]] = (item, row)
+    return row
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a prompt (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
 def _create_outfit_prompt(
-    items: list[dict], occasion: str = None, season: str = None, style: str = None
+    items: list[dict],
+    occasion: str = None,
+    season: str = None,
+    style: str = None,
+    suggestions: list[list[dict]] = None,
 ) -> str:
     """Create a formatted prompt for the GPT-4 API"""
 
@@ -99,16 +303,48 @@ def _create_outfit_prompt(
         f"\nPlease consider these filters: {', '.join(filters)}" if filters else ""
     )
 
-    return f"""Available clothing items in the closet:
-
-{json.dumps(items, indent=2)}
+    header = f"""Available clothing items in the closet, one per line:
+{ITEM_TABLE_COLUMNS}
+(seasons: {"/".join(f"{code}={name}" for name, code in SEASON_CODES.items())})
+"""
+    suggestion_text = ""
+    if suggestions:
+        combinations = "; ".join(
+            "+".join(str(piece["id"]) for piece in pieces) for pieces in suggestions
+        )
+        suggestion_text = (
+            "\nCombinations that score well on color harmony, formality and "
+            f"season (ids): {combinations}\n"
+        )
 
-Please create 3-5 outfit combinations using these items.{filter_text}
+    footer = f"""{suggestion_text}
+Please create 3-5 outfit combinations using these items, referring to them by id.{filter_text}
 
 Respond in the following JSON format:
-{json.dumps(outfit_recommendations, indent=2)}
+{json.dumps(outfit_recommendations)}
 """
 
+    # Keep the prompt within the token budget, dropping items past it
+    budget = OUTFIT_PROMPT_TOKEN_BUDGET * 4 - len(header) - len(footer)
+    rows = []
+    for item in items:
+        row = _encoded_item(item)
+        budget -= len(row) + 1
+        if budget < 0:
+            logger.warning(
+                f"Outfit prompt over budget of {OUTFIT_PROMPT_TOKEN_BUDGET} tokens, "
+                f"sending {len(rows)} of {len(items)} items"
+            )
+            break
+        rows.append(row)
+
+    prompt = header + "\n".join(rows) + "\n" + footer
+    logger.info(
+        f"Outfit prompt: {len(rows)} items, {len(prompt)} chars, "
+        f"~{estimate_tokens(prompt)} tokens"
+    )
+    return prompt
+
 
 def _parse_outfit_response(response_text: str) -> list[dict]:
     """Parse the GPT response into structured outfit recommendations"""
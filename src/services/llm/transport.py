@@ -0,0 +1,304 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+import httpx
+
+from src.utils.metrics import OPENAI_LATENCY, record_openai_usage
+
+logger = logging.getLogger(__name__)
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+
+# Responses worth retrying: rate limits and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+
+class LLMTransport:
+    """
+    Shared HTTP transport for the OpenAI API.
+
+    Keeps pooled keep-alive HTTP/2 connections (httpx[http2]), applies
+    connect/read timeouts, and retries 429 and 5xx responses with exponential
+    backoff, honouring Retry-After. Both sync and asyncio interfaces are
+    provided; the async client is meant to be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        base_url=OPENAI_BASE_URL,
+        timeout=OPENAI_TIMEOUT,
+        connect_timeout=OPENAI_CONNECT_TIMEOUT,
+        max_retries=OPENAI_MAX_RETRIES,
+        max_connections=OPENAI_MAX_CONNECTIONS,
+    ):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self._lock = threading.Lock()
+        self._client = None
+        self._async_client = None
+
+    def _client_kwargs(self):
+        return {
+            "base_url": self.base_url,
+            "timeout": self._timeout,
+            "limits": self._limits,
+            "http2": True,
+        }
+
+    @property
+    def client(self) -> httpx.Client:
+        """Pooled synchronous client, created on first use"""
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(**self._client_kwargs())
+            return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """Pooled asyncio client, created on first use"""
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = httpx.AsyncClient(**self._client_kwargs())
+            return self._async_client
+
+    def _headers(self):
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable is not set")
+        return {"Authorization": f"Bearer {api_key}"}
+
+    def _retry_delay(self, response, attempt):
+        """Return the delay before the next attempt"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    return min(float(retry_after), BACKOFF_MAX_SECONDS)
+                except ValueError:
+                    pass
+        delay = BACKOFF_BASE_SECONDS * 2**attempt
+        return min(delay + random.uniform(0, delay / 2), BACKOFF_MAX_SECONDS)
+
+    def _observe(self, path, payload, started, outcome, usage=None):
+        """Record the latency and token usage of a request"""
+        model = payload.get("model", "")
+        OPENAI_LATENCY.labels(path, model, outcome).observe(
+            time.perf_counter() - started
+        )
+        record_openai_usage(model, usage)
+
+    def _should_retry(self, response, error, attempt):
+        if attempt >= self.max_retries:
+            return False
+        if error is not None:
+            return True
+        return response.status_code in RETRY_STATUS_CODES
+
+    def post(self, path, payload, rate_limiter=None) -> dict:
+        """
+        POST a JSON payload and return the decoded JSON response
+
+        Args:
+            path: API path relative to the base URL (e.g. /chat/completions)
+            payload: JSON request body
+            rate_limiter: Optional RateLimiter shared by related callers; on a
+                429 response it pauses all of them, not just this request
+
+        Raises:
+            httpx.HTTPError: When the request still fails after all retries
+        """
+        headers = self._headers()
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            response, error = None, None
+            try:
+                response = self.client.post(path, json=payload, headers=headers)
+            except httpx.TransportError as e:
+                error = e
+
+            if not self._should_retry(response, error, attempt):
+                break
+
+            delay = self._retry_delay(response, attempt)
+            logger.warning(
+                f"OpenAI request to {path} failed "
+                f"({error or response.status_code}), retrying in {delay:.1f}s"
+            )
+            if rate_limiter is not None and response is not None:
+                if response.status_code == 429:
+                    rate_limiter.backoff(delay)
+                    continue
+            time.sleep(delay)
+
+        if error is not None or response.is_error:
+            self._observe(path, payload, started, "error")
+        if error is not None:
+            raise error
+        response.raise_for_status()
+        body = response.json()
+        self._observe(path, payload, started, "ok", body.get("usage"))
+        return body
+
+    async def apost(self, path, payload, rate_limiter=None) -> dict:
+        """Asyncio version of post()"""
+        headers = self._headers()
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            if rate_limiter is not None:
+                await asyncio.to_thread(rate_limiter.acquire)
+            response, error = None, None
+            try:
+                response = await self.async_client.post(
+                    path, json=payload, headers=headers
+                )
+            except httpx.TransportError as e:
+                error = e
+
+            if not self._should_retry(response, error, attempt):
+                break
+
+            delay = self._retry_delay(response, attempt)
+            logger.warning(
+                f"OpenAI request to {path} failed "
+                f"({error or response.status_code}), retrying in {delay:.1f}s"
+            )
+            if rate_limiter is not None and response is not None:
+                if response.status_code == 429:
+                    rate_limiter.backoff(delay)
+                    continue
+            await asyncio.sleep(delay)
+
+        if error is not None or response.is_error:
+            self._observe(path, payload, started, "error")
+        if error is not None:
+            raise error
+        response.raise_for_status()
+        body = response.json()
+        self._observe(path, payload, started, "ok", body.get("usage"))
+        return body
+
+    def stream(self, path, payload, rate_limiter=None):
+        """
+        POST a JSON payload and yield the events of a server-sent event stream
+
+        Failed attempts are retried like post() as long as nothing has been
+        yielded yet. Each event is the decoded JSON of one ``data:`` line;
+        the stream ends at the ``[DONE]`` sentinel.
+
+        Raises:
+            httpx.HTTPError: When the request still fails after all retries
+        """
+        headers = self._headers()
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            response, error, streaming, usage = None, None, False, None
+            try:
+                with self.client.stream(
+                    "POST", path, json={**payload, "stream": True}, headers=headers
+                ) as response:
+                    if response.status_code < 400:
+                        streaming = True
+                        for line in response.iter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:") :].strip()
+                            if data == "[DONE]":
+                                break
+                            event = json.loads(data)
+                            # Sent last when stream_options.include_usage is set
+                            usage = event.get("usage") or usage
+                            yield event
+                        self._observe(path, payload, started, "ok", usage)
+                        return
+                    response.read()
+            except httpx.TransportError as e:
+                if streaming:
+                    self._observe(path, payload, started, "error")
+                    # Part of the stream was already consumed, cannot replay
+                    raise
+                error = e
+
+            if not self._should_retry(response, error, attempt):
+                break
+
+            delay = self._retry_delay(response, attempt)
+            logger.warning(
+                f"OpenAI stream to {path} failed "
+                f"({error or response.status_code}), retrying in {delay:.1f}s"
+            )
+            if rate_limiter is not None and response is not None:
+                if response.status_code == 429:
+                    rate_limiter.backoff(delay)
+                    continue
+            time.sleep(delay)
+
+        self._observe(path, payload, started, "error")
+        if error is not None:
+            raise error
+        response.raise_for_status()
+
+    def stream_chat_completion(self, payload, rate_limiter=None):
+        """Create a chat completion and yield its content as it is generated"""
+        payload = {**payload, "stream_options": {"include_usage": True}}
+        for event in self.stream(
+            "/chat/completions", payload, rate_limiter=rate_limiter
+        ):
+            for choice in event.get("choices", []):
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    yield content
+
+    def chat_completion(self, payload, rate_limiter=None) -> dict:
+        """Create a chat completion"""
+        return self.post("/chat/completions", payload, rate_limiter=rate_limiter)
+
+    async def achat_completion(self, payload, rate_limiter=None) -> dict:
+        """Create a chat completion from asyncio code"""
+        return await self.apost("/chat/completions", payload, rate_limiter=rate_limiter)
+
+    def close(self):
+        """Close the pooled synchronous connections"""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self):
+        """Close the pooled asyncio connections"""
+        with self._lock:
+            client, self._async_client = self._async_client, None
+        if client is not None:
+            await client.aclose()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> LLMTransport:
+    """Return the shared OpenAI transport"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = LLMTransport()
+        return _transport
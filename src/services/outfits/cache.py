@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src.utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+OUTFIT_CACHE_TTL = float(os.getenv("OUTFIT_CACHE_TTL", "3600"))
+OUTFIT_CACHE_MAX_ENTRIES = int(os.getenv("OUTFIT_CACHE_MAX_ENTRIES", "256"))
+OUTFIT_CACHE_STALE_WHILE_REVALIDATE = os.getenv(
+    "OUTFIT_CACHE_STALE_WHILE_REVALIDATE", "false"
+).lower() in ("1", "true", "yes")
+
+
+def normalize_filters(occasion=None, season=None, style=None) -> tuple:
+    """Normalize request filters so equivalent requests share a cache entry"""
+
+    def normalize(value):
+        value = " ".join(str(value or "").replace("_", " ").lower().split())
+        return value or None
+
+    return normalize(occasion), normalize(season), normalize(style)
+
+
+class RecommendationCache:
+    """
+    Cache of outfit recommendations per closet version and filters.
+
+    Entries are keyed by the normalized (occasion, season, style) filters and
+    remember the storage version they were generated for, so any change to
+    the closet invalidates them. Entries also expire after ``ttl`` seconds and
+    the least recently used ones are evicted beyond ``max_entries``.
+
+    With ``stale_while_revalidate`` an outdated entry is served immediately
+    while a single background thread regenerates it. Concurrent misses for
+    the same filters wait for one generation instead of each calling the model.
+    """
+
+    def __init__(
+        self,
+        storage,
+        generate,
+        ttl=OUTFIT_CACHE_TTL,
+        max_entries=OUTFIT_CACHE_MAX_ENTRIES,
+        stale_while_revalidate=OUTFIT_CACHE_STALE_WHILE_REVALIDATE,
+    ):
+        self.storage = storage
+        self.generate = generate
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_while_revalidate = stale_while_revalidate
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._key_locks = {}
+        self._refreshing = set()
+
+    def _is_fresh(self, entry, version):
+        return entry["version"] == version and time.monotonic() < entry["expires_at"]
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, version, outfits):
+        with self._lock:
+            self._entries[key] = {
+                "version": version,
+                "expires_at": time.monotonic() + self.ttl,
+                "outfits": outfits,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._key_locks.pop(evicted, None)
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _regenerate(self, key):
+        """Generate and store the outfits for a key, once per concurrent miss"""
+        with self._key_lock(key):
+            version = self.storage.version
+            entry = self._lookup(key)
+            if entry is not None and self._is_fresh(entry, version):
+                return entry["outfits"]
+            outfits = self.generate(*key)
+            self._store(key, version, outfits)
+            return outfits
+
+    def _refresh_in_background(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._regenerate(key)
+            except Exception as e:
+                logger.error(f"Error refreshing outfit recommendations {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def get(self, occasion=None, season=None, style=None):
+        """Return the outfits for the given filters, generating them if needed"""
+        key = normalize_filters(occasion, season, style)
+        entry = self._lookup(key)
+        if entry is not None:
+            if self._is_fresh(entry, self.storage.version):
+                record_cache("outfits", True)
+                return entry["outfits"]
+            if self.stale_while_revalidate:
+                logger.info(f"Serving stale outfit recommendations for {key}")
+                record_cache("outfits", True)
+                self._refresh_in_background(key)
+                return entry["outfits"]
+        record_cache("outfits", False)
+        return self._regenerate(key)
+
+    def peek(self, occasion=None, season=None, style=None):
+        """Return the cached outfits if they are still fresh, without generating"""
+        entry = self._lookup(normalize_filters(occasion, season, style))
+        fresh = entry is not None and self._is_fresh(entry, self.storage.version)
+        record_cache("outfits", fresh)
+        return entry["outfits"] if fresh else None
+
+    def put(self, outfits, version, occasion=None, season=None, style=None):
+        """Store outfits generated elsewhere for the given closet version"""
+        self._store(normalize_filters(occasion, season, style), version, outfits)
+
+    def clear(self):
+        """Drop every cached recommendation"""
+        with self._lock:
+            self._entries.clear()
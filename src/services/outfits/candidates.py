@@ -0,0 +1,104 @@
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+SHOE_TYPES = {"shoes", "sneakers", "boots", "sandals", "heels", "loafers", "flats"}
+
+# Maximum number of candidates sent to the model per outfit slot
+SLOT_CAPS = {
+    "tops": int(os.getenv("OUTFIT_MAX_TOPS", "15")),
+    "bottoms": int(os.getenv("OUTFIT_MAX_BOTTOMS", "10")),
+    "one-pieces": int(os.getenv("OUTFIT_MAX_ONE_PIECES", "8")),
+    "shoes": int(os.getenv("OUTFIT_MAX_SHOES", "6")),
+    "other": int(os.getenv("OUTFIT_MAX_OTHER", "4")),
+}
+
+# Occasion words that imply a dress code the closet data uses
+_OCCASION_SYNONYMS = {
+    "work": {"business", "smart"},
+    "office": {"business", "smart"},
+    "interview": {"business", "formal"},
+    "wedding": {"formal", "cocktail"},
+    "party": {"cocktail", "smart"},
+    "date": {"smart", "cocktail"},
+    "gym": {"athletic", "sporty", "athleisure"},
+    "vacation": {"beach", "weekend", "casual"},
+}
+
+
+def _words(value) -> set:
+    """Split a value or list of values into lowercase words"""
+    if isinstance(value, (list, tuple)):
+        value = " ".join(str(v) for v in value)
+    return set(re.findall(r"[a-z]+", str(value or "").lower()))
+
+
+def outfit_slot(item: dict) -> str:
+    """Return the outfit slot (tops, bottoms, one-pieces, shoes, other) of an item"""
+    category = item.get("category")
+    if category == "shoes" or str(item.get("type", "")).lower() in SHOE_TYPES:
+        return "shoes"
+    return category if category in ("tops", "bottoms", "one-pieces") else "other"
+
+
+def _derived(item: dict) -> dict:
+    derived = item.get("derived_properties")
+    return derived if isinstance(derived, dict) else {}
+
+
+def _suits_season(item: dict, season: str) -> bool:
+    """Items are kept unless they are explicitly unsuitable for the season"""
+    seasons = _derived(item).get("season_suitability")
+    if not isinstance(seasons, dict):
+        return True
+    return seasons.get(season.lower()) is not False
+
+
+def _relevance(item: dict, occasion_words: set, style_words: set) -> int:
+    """Score how well an item matches the requested occasion and style"""
+    derived = _derived(item)
+    score = 0
+    if occasion_words:
+        dress_codes = _words(derived.get("dress_code_compatibility"))
+        score += 2 * len(occasion_words & dress_codes)
+        score += len(occasion_words & _words(derived.get("formality")))
+    if style_words:
+        score += 2 * len(style_words & _words(derived.get("style_categories")))
+    return score
+
+
+def select_candidates(
+    items: list[dict], occasion: str = None, season: str = None, style: str = None
+) -> list[dict]:
+    """
+    Narrow the closet to the items worth sending to the outfit model
+
+    Items unsuitable for the season are dropped, the rest are ranked by how
+    well their dress codes, formality and style categories match the
+    occasion and style, and each outfit slot is capped (see SLOT_CAPS).
+    The result is deterministic and keeps closet order among equal scores.
+    """
+    if season:
+        items = [item for item in items if _suits_season(item, season)]
+
+    occasion_words = _words(occasion)
+    for word in list(occasion_words):
+        occasion_words |= _OCCASION_SYNONYMS.get(word, set())
+    style_words = _words(style)
+
+    by_slot = {}
+    for position, item in enumerate(items):
+        score = _relevance(item, occasion_words, style_words)
+        by_slot.setdefault(outfit_slot(item), []).append((-score, position, item))
+
+    candidates = []
+    for slot, ranked in by_slot.items():
+        ranked.sort(key=lambda entry: entry[:2])
+        candidates.extend(entry for entry in ranked[: SLOT_CAPS.get(slot, 0)])
+
+    # Restore closet order so the prompt is stable across requests
+    candidates.sort(key=lambda entry: entry[1])
+    logger.info(f"Selected {len(candidates)} of {len(items)} items as candidates")
+    return [item for _, _, item in candidates]
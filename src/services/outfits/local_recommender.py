@@ -0,0 +1,372 @@
+import colorsys
+import logging
+import os
+import re
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the local engine is then unavailable
+    np = None
+
+from src.services.outfits.candidates import outfit_slot
+
+logger = logging.getLogger(__name__)
+
+LOCAL_OUTFIT_COUNT = int(os.getenv("LOCAL_OUTFIT_COUNT", "5"))
+
+SEASONS = ("spring", "summer", "fall", "winter")
+
+# Formality levels, from sportswear to black tie
+FORMALITY_LEVELS = {
+    "athletic": 0,
+    "sporty": 0,
+    "casual": 1,
+    "smart casual": 2,
+    "business casual": 3,
+    "business": 4,
+    "formal": 5,
+    "black tie": 6,
+}
+MAX_FORMALITY = max(FORMALITY_LEVELS.values())
+
+# Formality implied by occasion words
+OCCASION_FORMALITY = {
+    "gym": 0,
+    "sport": 0,
+    "workout": 0,
+    "beach": 1,
+    "weekend": 1,
+    "casual": 1,
+    "date": 2,
+    "dinner": 2,
+    "party": 2,
+    "work": 3,
+    "office": 3,
+    "interview": 4,
+    "business": 4,
+    "wedding": 5,
+    "gala": 5,
+    "formal": 5,
+}
+
+TEMPERATURES = {"warm": 1, "neutral": 0, "cool": -1}
+INTENSITIES = {"light": 0, "medium": 1, "dark": 2}
+
+# Weights of the outfit score components
+COLOR_WEIGHT = 0.45
+FORMALITY_WEIGHT = 0.3
+SEASON_WEIGHT = 0.25
+STYLE_BONUS = 0.1
+
+# Best-scoring combinations considered per requested outfit
+CANDIDATES_PER_OUTFIT = 50
+
+
+def _words(value) -> set:
+    return set(re.findall(r"[a-z]+", str(value or "").lower()))
+
+
+def _main_color(item: dict) -> dict:
+    colors = item.get("colors")
+    if isinstance(colors, list):
+        for color in colors:
+            if isinstance(color, dict):
+                return color
+    return {}
+
+
+def _hex_to_hsv(value):
+    """Return (hue in degrees, saturation, value) of a #RRGGBB color"""
+    try:
+        value = str(value).lstrip("#")
+        red, green, blue = (int(value[i : i + 2], 16) / 255 for i in (0, 2, 4))
+    except (ValueError, IndexError):
+        return 0.0, 0.0, 0.5
+    hue, saturation, brightness = colorsys.rgb_to_hsv(red, green, blue)
+    return hue * 360, saturation, brightness
+
+
+def _formality(item: dict) -> int:
+    derived = item.get("derived_properties")
+    formality = derived.get("formality") if isinstance(derived, dict) else None
+    formality = str(formality or "").lower().replace("_", " ").strip()
+    return FORMALITY_LEVELS.get(formality, FORMALITY_LEVELS["casual"])
+
+
+def _target_formality(occasion):
+    """Return the formality level an occasion calls for, or None"""
+    levels = [
+        OCCASION_FORMALITY[w] for w in _words(occasion) if w in OCCASION_FORMALITY
+    ]
+    return max(levels) if levels else None
+
+
+def _features(items: list[dict], style: str = None) -> dict:
+    """Extract the scoring features of items as NumPy arrays"""
+    style_words = _words(style)
+    hues, saturations, brightness, temperatures, intensities = [], [], [], [], []
+    formality, seasons, style_match = [], [], []
+    for item in items:
+        color = _main_color(item)
+        hue, saturation, value = _hex_to_hsv(color.get("hex"))
+        hues.append(hue)
+        saturations.append(saturation)
+        brightness.append(value)
+        temperatures.append(TEMPERATURES.get(color.get("temperature"), 0))
+        intensities.append(INTENSITIES.get(color.get("intensity"), 1))
+        formality.append(_formality(item))
+
+        derived = item.get("derived_properties")
+        derived = derived if isinstance(derived, dict) else {}
+        suitability = derived.get("season_suitability")
+        suitability = suitability if isinstance(suitability, dict) else {}
+        seasons.append([suitability.get(s) is not False for s in SEASONS])
+        style_match.append(bool(style_words & _words(derived.get("style_categories"))))
+
+    temperatures = np.array(temperatures)
+    saturations = np.array(saturations)
+    brightness = np.array(brightness)
+    return {
+        "hue": np.array(hues),
+        "temperature": temperatures,
+        "intensity": np.array(intensities),
+        # Whites, greys, blacks and neutral-toned colors go with anything
+        "neutral": (temperatures == 0) | (saturations < 0.15) | (brightness < 0.15),
+        "formality": np.array(formality, dtype=float),
+        "seasons": np.array(seasons, dtype=bool).reshape(len(items), len(SEASONS)),
+        "style": np.array(style_match, dtype=float),
+    }
+
+
+def _hue_distance(a, b):
+    distance = np.abs(a["hue"][:, None] - b["hue"][None, :]) % 360
+    return np.minimum(distance, 360 - distance)
+
+
+def _color_harmony(a: dict, b: dict):
+    """Score the color harmony of every pair of items from a and b (0 to 1)"""
+    distance = _hue_distance(a, b)
+    score = np.select(
+        [distance <= 30, distance >= 150, np.abs(distance - 120) <= 15],
+        [0.9, 0.8, 0.6],
+        0.3,
+    )
+    score = np.where(a["neutral"][:, None] | b["neutral"][None, :], 1.0, score)
+    # Warm next to cool tends to clash, light next to dark adds contrast
+    score = score - 0.2 * (a["temperature"][:, None] * b["temperature"][None, :] < 0)
+    score = score + 0.1 * (
+        np.abs(a["intensity"][:, None] - b["intensity"][None, :]) >= 1
+    )
+    return np.clip(score, 0.0, 1.0)
+
+
+def _formality_fit(features: dict, target):
+    """Score how close each item is to the target formality (0 to 1)"""
+    if target is None:
+        return np.ones(len(features["formality"]))
+    return 1 - np.abs(features["formality"] - target) / MAX_FORMALITY
+
+
+def _season_mask(features: dict, season):
+    """Items suitable for the requested season (all items without one)"""
+    if season and season.lower() in SEASONS:
+        return features["seasons"][:, SEASONS.index(season.lower())]
+    return np.ones(len(features["formality"]), dtype=bool)
+
+
+def _score_pairs(a: dict, b: dict, target, season):
+    """Score every (a, b) combination, -inf where it is not wearable"""
+    formality = (
+        1 - np.abs(a["formality"][:, None] - b["formality"][None, :]) / MAX_FORMALITY
+    )
+    fit_a, fit_b = _formality_fit(a, target), _formality_fit(b, target)
+    formality = (formality + fit_a[:, None] + fit_b[None, :]) / 3
+
+    # Share of the seasons in which both items can be worn
+    seasons = (a["seasons"].astype(float) @ b["seasons"].T.astype(float)) / len(SEASONS)
+    score = (
+        COLOR_WEIGHT * _color_harmony(a, b)
+        + FORMALITY_WEIGHT * formality
+        + SEASON_WEIGHT * seasons
+        + STYLE_BONUS * (a["style"][:, None] + b["style"][None, :])
+    )
+    mask = _season_mask(a, season)[:, None] & _season_mask(b, season)[None, :]
+    return np.where(mask & (seasons > 0), score, -np.inf)
+
+
+def _score_singles(features: dict, target, season):
+    """Score one-piece items worn on their own"""
+    seasons = features["seasons"].sum(axis=1) / len(SEASONS)
+    score = (
+        COLOR_WEIGHT * 0.8
+        + FORMALITY_WEIGHT * _formality_fit(features, target)
+        + SEASON_WEIGHT * seasons
+        + STYLE_BONUS * 2 * features["style"]
+    )
+    return np.where(_season_mask(features, season), score, -np.inf)
+
+
+def _subset(features: dict, rows) -> dict:
+    return {name: values[rows] for name, values in features.items()}
+
+
+def _describe(item: dict) -> str:
+    color = _main_color(item).get("name")
+    return f"{color} {item.get('type', 'item')}" if color else item.get("type", "item")
+
+
+def _styling_tip(items: list[dict], features: dict) -> str:
+    """Explain the color relationship between the first two pieces"""
+    if len(items) < 2 or features["neutral"][1]:
+        return (
+            f"Let the {_describe(items[0])} stand out and keep accessories "
+            "in neutral tones."
+        )
+    if features["neutral"][0]:
+        return (
+            f"The neutral {_describe(items[0])} lets the {_describe(items[1])} "
+            "take the lead."
+        )
+    distance = float(
+        _hue_distance(_subset(features, [0]), _subset(features, [1]))[0, 0]
+    )
+    if distance <= 30:
+        return "The analogous colors keep the look cohesive; add texture for interest."
+    if distance >= 150:
+        return "The complementary colors make a bold contrast; keep accessories simple."
+    return "Tie the pieces together with an accessory that repeats one of the colors."
+
+
+def _occasions(items: list[dict], occasion=None) -> list[str]:
+    """Dress codes shared by every piece, led by the requested occasion"""
+    shared = None
+    for item in items:
+        derived = item.get("derived_properties")
+        codes = (
+            derived.get("dress_code_compatibility") if isinstance(derived, dict) else []
+        )
+        codes = [str(c).replace("_", " ") for c in codes or [] if c and c != "none"]
+        shared = codes if shared is None else [c for c in shared if c in codes]
+    occasions = shared or []
+    if occasion and occasion not in occasions:
+        occasions = [occasion] + occasions
+    return occasions[:3]
+
+
+def _outfit(items: list[dict], occasion=None, style=None) -> dict:
+    """Build an outfit in the same shape as the model's recommendations"""
+    names = [_describe(item) for item in items]
+    description = names[0].capitalize()
+    if len(names) > 1:
+        description += " with " + " and ".join(names[1:])
+    if style:
+        description += f", for a {style} look"
+    return {
+        "items": [item["id"] for item in items],
+        "style_description": description,
+        "occasions": _occasions(items, occasion),
+        "styling_tips": _styling_tip(items, _features(items)),
+        "source": "local",
+    }
+
+
+def _best_positions(scores, count):
+    """Return the flat positions of the best finite scores, enough to pick from"""
+    flat = scores.ravel()
+    # Keep spare combinations, since pieces are not reused across outfits
+    keep = min(flat.size, count * CANDIDATES_PER_OUTFIT)
+    if keep == 0:
+        return []
+    positions = np.argpartition(-flat, keep - 1)[:keep]
+    return positions[np.isfinite(flat[positions])]
+
+
+def rank_outfits(
+    items: list[dict],
+    occasion: str = None,
+    season: str = None,
+    style: str = None,
+    count: int = LOCAL_OUTFIT_COUNT,
+) -> list[tuple[float, list[dict]]]:
+    """
+    Rank wearable combinations of closet items without calling a model
+
+    Every top is scored against every bottom at once (and every one-piece on
+    its own) for color harmony, formality and season suitability; the best
+    combinations that do not reuse a piece are kept and completed with the
+    best matching shoes.
+
+    Returns:
+        Up to count (score, items) pairs, best first
+    """
+    if np is None:
+        raise RuntimeError("The local outfit engine requires numpy (pip install numpy)")
+
+    by_slot = {}
+    for item in items:
+        by_slot.setdefault(outfit_slot(item), []).append(item)
+    tops, bottoms = by_slot.get("tops", []), by_slot.get("bottoms", [])
+    one_pieces, shoes = by_slot.get("one-pieces", []), by_slot.get("shoes", [])
+    target = _target_formality(occasion)
+
+    combinations = []
+    if tops and bottoms:
+        scores = _score_pairs(
+            _features(tops, style), _features(bottoms, style), target, season
+        )
+        for position in _best_positions(scores, count):
+            row, column = divmod(int(position), len(bottoms))
+            combinations.append(
+                (float(scores.flat[position]), [tops[row], bottoms[column]])
+            )
+    if one_pieces:
+        scores = _score_singles(_features(one_pieces, style), target, season)
+        for position in _best_positions(scores, count):
+            combinations.append((float(scores[position]), [one_pieces[position]]))
+    combinations.sort(key=lambda combination: -combination[0])
+
+    # Greedily keep the best combinations that do not share a piece
+    ranked, used = [], set()
+    for score, pieces in combinations:
+        if any(piece["id"] in used for piece in pieces):
+            continue
+        used.update(piece["id"] for piece in pieces)
+        ranked.append((score, pieces))
+        if len(ranked) >= count:
+            break
+
+    if shoes and ranked:
+        shoe_features = _features(shoes, style)
+        mask = _season_mask(shoe_features, season)
+        fit = _formality_fit(shoe_features, target)
+        for index, (score, pieces) in enumerate(ranked):
+            harmony = _color_harmony(_features(pieces), shoe_features).mean(axis=0)
+            shoe_scores = np.where(
+                mask, COLOR_WEIGHT * harmony + FORMALITY_WEIGHT * fit, -np.inf
+            )
+            best = int(np.argmax(shoe_scores))
+            if np.isfinite(shoe_scores[best]):
+                ranked[index] = (score, pieces + [shoes[best]])
+    return ranked
+
+
+def generate_local_outfits(
+    items: list[dict],
+    occasion: str = None,
+    season: str = None,
+    style: str = None,
+    count: int = LOCAL_OUTFIT_COUNT,
+) -> list[dict]:
+    """
+    Recommend outfits with the local rule-based engine
+
+    Returns outfits in the same shape as the model's recommendations (see
+    rank_outfits for how they are chosen), marked with "source": "local".
+    """
+    items = [item for item in items if item.get("status", "ready") == "ready"]
+    outfits = [
+        _outfit(pieces, occasion, style)
+        for _, pieces in rank_outfits(items, occasion, season, style, count)
+    ]
+    logger.info(f"Generated {len(outfits)} outfits locally from {len(items)} items")
+    return outfits
@@ -0,0 +1,146 @@
+import logging
+import threading
+
+from src.services.llm.embeddings import (
+    embed_texts,
+    item_embedding_text,
+    text_fingerprint,
+)
+from src.services.outfits.candidates import outfit_slot
+
+logger = logging.getLogger(__name__)
+
+# Slots worth combining with an item of a given slot
+COMPLEMENTARY_SLOTS = {
+    "tops": ("bottoms", "shoes", "other"),
+    "bottoms": ("tops", "shoes", "other"),
+    "one-pieces": ("shoes", "other"),
+    "shoes": ("tops", "bottoms", "one-pieces"),
+    "other": ("tops", "bottoms", "one-pieces", "shoes"),
+}
+
+
+def _is_ready(item):
+    return item.get("status", "ready") == "ready"
+
+
+class GarmentSimilarity:
+    """
+    Embedding-based similarity search over the closet.
+
+    Every ready item is embedded once from its description and attributes
+    (see item_embedding_text); the vectors live next to the closet in
+    ``closet.embeddings.npz`` and are recomputed only when that text changes.
+    """
+
+    def __init__(self, storage, embed=embed_texts):
+        self.storage = storage
+        self.embed = embed
+        self._lock = threading.Lock()
+        self._index = None
+
+    @property
+    def index(self):
+        """Embedding index, opened (and numpy imported) on first use"""
+        from src.utils.embedding_index import EmbeddingIndex
+
+        with self._lock:
+            if self._index is None:
+                path = self.storage.closet_dir / "closet.embeddings.npz"
+                self._index = EmbeddingIndex(path)
+            return self._index
+
+    def sync(self, items=None) -> int:
+        """
+        Embed the given items (default: the whole closet) that are missing or stale
+
+        Returns:
+            Number of items embedded
+        """
+        if items is None:
+            items = self.storage.get_all_items()
+        known = self.index.fingerprints()
+
+        pending = []
+        for item in items:
+            if not _is_ready(item):
+                continue
+            text = item_embedding_text(item)
+            fingerprint = text_fingerprint(text)
+            if known.get(item["id"]) != fingerprint:
+                pending.append((item["id"], fingerprint, text))
+        if not pending:
+            return 0
+
+        vectors = self.embed([text for _, _, text in pending])
+        self.index.upsert(
+            (item_id, fingerprint, vector)
+            for (item_id, fingerprint, _), vector in zip(pending, vectors)
+        )
+        return len(pending)
+
+    def index_item(self, item_id) -> int:
+        """Embed a single item after it has been classified"""
+        item = self.storage.get_item(item_id)
+        return self.sync([item]) if item is not None else 0
+
+    def _search(self, item, slot_items, limit):
+        vector = self.index.vector(item["id"])
+        if vector is None:
+            return []
+        matches = self.index.search(
+            vector,
+            limit=limit,
+            item_ids=[candidate["id"] for candidate in slot_items],
+            exclude=(item["id"],),
+        )
+        items = {candidate["id"]: candidate for candidate in slot_items}
+        return [(items[item_id], score) for item_id, score in matches]
+
+    def _prepare(self, item_id):
+        """Return the item and the ready closet items, embedding what is missing"""
+        items = [item for item in self.storage.get_all_items() if _is_ready(item)]
+        item = next((item for item in items if item["id"] == item_id), None)
+        if item is None:
+            return None, items
+        self.sync(items)
+        return item, items
+
+    def similar_items(self, item_id, limit=10):
+        """
+        Return the items of the same outfit slot most similar to an item
+
+        Returns:
+            List of (item, similarity) pairs, best first, or None if the item
+            does not exist or is not classified yet
+        """
+        item, items = self._prepare(item_id)
+        if item is None:
+            return None
+        slot = outfit_slot(item)
+        return self._search(
+            item, [other for other in items if outfit_slot(other) == slot], limit
+        )
+
+    def complementary_candidates(self, item_id, per_slot=3):
+        """
+        Propose items from the other outfit slots that go with an item
+
+        This is a local outfit-candidate generator: no model is called beyond
+        the embeddings of items that were never embedded.
+
+        Returns:
+            Dict mapping each complementary slot to (item, similarity) pairs,
+            or None if the item does not exist or is not classified yet
+        """
+        item, items = self._prepare(item_id)
+        if item is None:
+            return None
+        by_slot = {}
+        for other in items:
+            by_slot.setdefault(outfit_slot(other), []).append(other)
+        return {
+            slot: self._search(item, by_slot[slot], per_slot)
+            for slot in COMPLEMENTARY_SLOTS[outfit_slot(item)]
+            if by_slot.get(slot)
+        }
@@ -0,0 +1,172 @@
+import bisect
+import logging
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_attribute(value):
+    """Normalize an attribute value for index lookups"""
+    return str(value).strip().lower().replace("_", " ")
+
+
+def color_keys(item) -> set:
+    """
+    Return the color values an item is found by
+
+    Each color is indexed by its full name and by each word, so "blue" also
+    matches "navy blue".
+    """
+    keys = set()
+    colors = item.get("colors")
+    if isinstance(colors, list):
+        for color in colors:
+            if not isinstance(color, dict) or not color.get("name"):
+                continue
+            name = normalize_attribute(color["name"])
+            keys.add(name)
+            keys.update(name.split())
+    return keys
+
+
+class ClosetIndex:
+    """
+    Per-attribute inverted indexes over a closet storage backend.
+
+    The indexes map type, category, season, formality and color values to
+    sets of item ids. They are rebuilt only when the storage version changes, so
+    filtered and paginated listings never have to scan the whole closet.
+
+    Backends with their own indexes (indexed_queries, e.g. SQLite) answer
+    queries directly and no in-memory index is built for them.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._lock = threading.Lock()
+        self._version = None
+        self._items = {}
+        self._order = []
+        self._position = {}
+        self._by_category = {}
+        self._by_type = {}
+        self._by_season = {}
+        self._by_formality = {}
+        self._by_color = {}
+
+    def _rebuild(self, version):
+        """Rebuild every index from the current closet contents"""
+        by_category = defaultdict(set)
+        by_type = defaultdict(set)
+        by_season = defaultdict(set)
+        by_formality = defaultdict(set)
+        by_color = defaultdict(set)
+
+        items = self.storage.get_all_items()
+        for item in items:
+            item_id = item["id"]
+            if item.get("category"):
+                by_category[normalize_attribute(item["category"])].add(item_id)
+            if item.get("type"):
+                by_type[normalize_attribute(item["type"])].add(item_id)
+
+            derived = item.get("derived_properties")
+            if isinstance(derived, dict):
+                if derived.get("formality"):
+                    by_formality[normalize_attribute(derived["formality"])].add(item_id)
+                seasons = derived.get("season_suitability")
+                if isinstance(seasons, dict):
+                    for season, suitable in seasons.items():
+                        if suitable is True:
+                            by_season[normalize_attribute(season)].add(item_id)
+
+            for key in color_keys(item):
+                by_color[key].add(item_id)
+
+        self._items = {item["id"]: item for item in items}
+        self._order = [item["id"] for item in items]
+        self._position = {item_id: pos for pos, item_id in enumerate(self._order)}
+        self._by_category = dict(by_category)
+        self._by_type = dict(by_type)
+        self._by_season = dict(by_season)
+        self._by_formality = dict(by_formality)
+        self._by_color = dict(by_color)
+        self._version = version
+        logger.info(f"Rebuilt closet index for {len(items)} items")
+
+    def _ensure_current(self):
+        """Rebuild the indexes if the closet changed"""
+        version = self.storage.version
+        if version != self._version:
+            self._rebuild(version)
+
+    def query(
+        self,
+        category=None,
+        item_type=None,
+        season=None,
+        formality=None,
+        color=None,
+        limit=None,
+        cursor=None,
+    ):
+        """
+        Return a page of items matching all of the given filters
+
+        Args:
+            category: Optional category filter (e.g. "tops")
+            item_type: Optional garment type filter (e.g. "t-shirt")
+            season: Optional season the item must be suitable for
+            formality: Optional formality filter (e.g. "casual")
+            color: Optional color name or color word (e.g. "blue")
+            limit: Optional maximum number of items to return
+            cursor: Optional id of the last item of the previous page
+
+        Returns:
+            Tuple of (items, next_cursor, total), where next_cursor is None on
+            the last page and total counts all matching items
+        """
+        if self.storage.indexed_queries:
+            return self.storage.query_items(
+                category=category,
+                item_type=item_type,
+                season=season,
+                formality=formality,
+                color=color,
+                limit=limit,
+                cursor=cursor,
+            )
+
+        with self._lock:
+            self._ensure_current()
+
+            candidate_sets = []
+            for index, value in (
+                (self._by_category, category),
+                (self._by_type, item_type),
+                (self._by_season, season),
+                (self._by_formality, formality),
+                (self._by_color, color),
+            ):
+                if value:
+                    candidate_sets.append(index.get(normalize_attribute(value), set()))
+
+            if candidate_sets:
+                candidate_sets.sort(key=len)
+                matches = set.intersection(*candidate_sets)
+                ids = sorted(matches, key=self._position.__getitem__)
+            else:
+                ids = self._order
+
+            start = 0
+            if cursor is not None:
+                if cursor not in self._position:
+                    raise ValueError(f"Invalid cursor: {cursor}")
+                positions = [self._position[item_id] for item_id in ids]
+                start = bisect.bisect_right(positions, self._position[cursor])
+
+            end = len(ids) if limit is None else min(start + limit, len(ids))
+            page = [self._items[item_id] for item_id in ids[start:end]]
+            next_cursor = ids[end - 1] if end < len(ids) and end > start else None
+            return page, next_cursor, len(ids)
@@ -0,0 +1,126 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from src.utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+class DiskLRUCache:
+    """
+    Size-bounded cache of files in a directory with LRU eviction.
+
+    Each entry is stored as ``<key><suffix>``. Recency is tracked in memory
+    and mirrored in the file mtimes, so the LRU order survives restarts. The
+    directory is indexed on first use and created on the first write.
+    """
+
+    def __init__(self, directory, max_entries=None, max_bytes=None, suffix=""):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+
+    def _load(self):
+        """Index the existing cache files, oldest first (with the lock held)"""
+        if self._loaded:
+            return
+        self._loaded = True
+        files = []
+        for path in self.directory.glob(f"*{self.suffix}"):
+            if path.is_file() and not path.name.endswith(".tmp"):
+                stat = path.stat()
+                files.append((stat.st_mtime_ns, path, stat.st_size))
+
+        for _, path, size in sorted(files, key=lambda entry: entry[0]):
+            key = path.name[: len(path.name) - len(self.suffix)]
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def path_for(self, key):
+        """Return the file path used for a key"""
+        return self.directory / f"{key}{self.suffix}"
+
+    def keys(self):
+        """Return the cached keys, least recently used first"""
+        with self._lock:
+            self._load()
+            return list(self._entries)
+
+    def get_path(self, key):
+        """Return the path of a cached entry and mark it as recently used"""
+        with self._lock:
+            self._load()
+            if key not in self._entries:
+                record_cache(self.directory.name, False)
+                return None
+            path = self.path_for(key)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                self._forget(key)
+                record_cache(self.directory.name, False)
+                return None
+            self._entries.move_to_end(key)
+            record_cache(self.directory.name, True)
+            return path
+
+    def get(self, key):
+        """Return the cached bytes for a key, or None"""
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key)
+            return None
+
+    def put(self, key, data):
+        """Store bytes for a key, evicting old entries if needed"""
+        path = self.path_for(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._load()
+            self._forget(key)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+        return path
+
+    def delete(self, key):
+        """Remove an entry from the cache"""
+        with self._lock:
+            self._load()
+            if key in self._entries:
+                self.path_for(key).unlink(missing_ok=True)
+                self._forget(key)
+
+    def _forget(self, key):
+        """Drop a key from the in-memory index"""
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        """Remove least recently used entries until within the limits"""
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self.path_for(key).unlink(missing_ok=True)
+            self._forget(key)
+            logger.info(f"Evicted {key} from cache {self.directory}")
@@ -0,0 +1,224 @@
+import logging
+import os
+import threading
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, similarity search is then unavailable
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Closets larger than this are searched through the approximate index
+EMBEDDING_ANN_THRESHOLD = int(os.getenv("EMBEDDING_ANN_THRESHOLD", "5000"))
+
+
+class _LSHIndex:
+    """
+    Random-hyperplane locality-sensitive hashing for cosine similarity.
+
+    Each table hashes a vector to the signs of its projections on ``n_bits``
+    random hyperplanes; vectors sharing a bucket in any table are candidates.
+    """
+
+    def __init__(self, matrix, n_tables=8, n_bits=12, seed=0):
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((n_tables, n_bits, matrix.shape[1]))
+        self._weights = 1 << np.arange(n_bits)
+        self._buckets = [{} for _ in range(n_tables)]
+        for table, codes in enumerate(self._codes(matrix)):
+            buckets = self._buckets[table]
+            for row, code in enumerate(codes.tolist()):
+                buckets.setdefault(code, []).append(row)
+
+    def _codes(self, matrix):
+        """Return the bucket codes of each row, one array per table"""
+        signs = np.einsum("nd,tbd->tnb", matrix, self._planes) > 0
+        return signs.astype(np.int64) @ self._weights
+
+    def candidates(self, vector):
+        """Return the rows sharing a bucket with the vector in any table"""
+        rows = set()
+        for table, codes in enumerate(self._codes(vector[np.newaxis, :])):
+            rows.update(self._buckets[table].get(int(codes[0]), ()))
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+
+class EmbeddingIndex:
+    """
+    Persistent store of normalized item embeddings with cosine search.
+
+    Vectors are kept in one NumPy matrix, saved atomically to ``path`` and
+    reloaded when another process rewrites it. Each vector remembers the
+    fingerprint of the text it was computed from, so callers can tell when an
+    item must be embedded again. Search is an exact matrix product; above
+    ``ann_threshold`` vectors an LSH index narrows the rows scored first.
+    """
+
+    def __init__(self, path, ann_threshold=EMBEDDING_ANN_THRESHOLD):
+        if np is None:
+            raise RuntimeError("Similarity search requires numpy (pip install numpy)")
+        self.path = Path(path)
+        self.ann_threshold = ann_threshold
+        self._lock = threading.Lock()
+        self._signature = None
+        self._ids = []
+        self._fingerprints = []
+        self._rows = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._lsh = None
+
+    def _file_signature(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _set(self, ids, fingerprints, matrix):
+        self._ids = [str(item_id) for item_id in ids]
+        self._fingerprints = [str(fingerprint) for fingerprint in fingerprints]
+        self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+        self._matrix = matrix
+        self._lsh = None
+
+    def _refresh(self):
+        """Reload the vectors if the file changed since it was last read"""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        if signature is not None:
+            try:
+                with np.load(self.path, allow_pickle=False) as data:
+                    self._set(data["ids"], data["fingerprints"], data["vectors"])
+                logger.info(f"Loaded {len(self._ids)} embeddings from {self.path}")
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Error loading embeddings from {self.path}: {e}")
+        self._signature = signature
+
+    def _save(self):
+        """Atomically write the vectors to disk"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            np.savez(
+                f,
+                ids=np.array(self._ids, dtype=str),
+                fingerprints=np.array(self._fingerprints, dtype=str),
+                vectors=self._matrix,
+            )
+        os.replace(temp_path, self.path)
+        self._signature = self._file_signature()
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._ids)
+
+    def fingerprints(self) -> dict:
+        """Return the text fingerprint of every stored vector by item id"""
+        with self._lock:
+            self._refresh()
+            return dict(zip(self._ids, self._fingerprints))
+
+    def upsert(self, entries):
+        """
+        Add or replace vectors and save the index
+
+        Args:
+            entries: Iterable of (item_id, fingerprint, vector) tuples
+        """
+        entries = list(entries)
+        if not entries:
+            return
+        with self._lock:
+            self._refresh()
+            ids, fingerprints = list(self._ids), list(self._fingerprints)
+            vectors = np.array([vector for _, _, vector in entries], dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1, norms)
+
+            matrix = self._matrix
+            if not len(ids) or matrix.shape[1] != vectors.shape[1]:
+                # Empty index, or the embedding size changed: start over
+                ids, fingerprints = [], []
+                matrix = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+            rows = {item_id: row for row, item_id in enumerate(ids)}
+
+            appended = []
+            matrix = matrix.copy()
+            for (item_id, fingerprint, _), vector in zip(entries, vectors):
+                row = rows.get(item_id)
+                if row is None:
+                    rows[item_id] = len(ids) + len(appended)
+                    appended.append(vector)
+                    ids.append(item_id)
+                    fingerprints.append(fingerprint)
+                else:
+                    matrix[row] = vector
+                    fingerprints[row] = fingerprint
+            if appended:
+                matrix = np.vstack([matrix, np.array(appended)])
+
+            self._set(ids, fingerprints, matrix)
+            self._save()
+
+    def vector(self, item_id):
+        """Return the normalized vector of an item, or None"""
+        with self._lock:
+            self._refresh()
+            row = self._rows.get(item_id)
+            return None if row is None else self._matrix[row]
+
+    def search(self, vector, limit=10, item_ids=None, exclude=()):
+        """
+        Return the (item_id, similarity) pairs closest to a vector
+
+        Args:
+            vector: Query vector (normalized by the caller or not)
+            limit: Maximum number of results
+            item_ids: Optional collection restricting the searched items
+            exclude: Item ids never returned (e.g. the query item)
+        """
+        with self._lock:
+            self._refresh()
+            ids, positions, matrix = self._ids, self._rows, self._matrix
+            if len(ids) > self.ann_threshold and self._lsh is None:
+                self._lsh = _LSHIndex(matrix)
+            lsh = self._lsh if len(ids) > self.ann_threshold else None
+        if not ids:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+
+        allowed = None
+        if item_ids is not None or exclude:
+            allowed = np.zeros(len(ids), dtype=bool)
+            if item_ids is None:
+                allowed[:] = True
+            else:
+                rows = [positions[i] for i in item_ids if i in positions]
+                allowed[rows] = True
+            allowed[[positions[i] for i in exclude if i in positions]] = False
+
+        rows = None
+        if lsh is not None:
+            rows = lsh.candidates(query)
+            if allowed is not None:
+                rows = rows[allowed[rows]]
+            if len(rows) < limit:
+                rows = None  # Too few approximate matches, score everything
+        if rows is None:
+            rows = np.flatnonzero(allowed) if allowed is not None else None
+
+        scores = matrix @ query if rows is None else matrix[rows] @ query
+        count = min(limit, len(scores))
+        if count <= 0:
+            return []
+        best = np.argpartition(-scores, count - 1)[:count]
+        best = best[np.argsort(-scores[best])]
+        if rows is not None:
+            return [(ids[rows[i]], float(scores[i])) for i in best]
+        return [(ids[i], float(scores[i])) for i in best]
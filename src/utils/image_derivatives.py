@@ -0,0 +1,95 @@
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+
+from werkzeug.security import safe_join
+
+from src.utils.disk_cache import DiskLRUCache
+from src.utils.image_prep import prepare_image
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_CACHE_DIR = os.getenv("DERIVATIVE_CACHE_DIR", "data/cache/derivatives")
+DERIVATIVE_CACHE_MAX_BYTES = int(os.getenv("DERIVATIVE_CACHE_MAX_BYTES", "268435456"))
+DERIVATIVE_JPEG_QUALITY = int(os.getenv("DERIVATIVE_JPEG_QUALITY", "80"))
+
+# Longest edge in pixels of each derivative size
+DERIVATIVE_SIZES = {
+    "thumb": int(os.getenv("THUMBNAIL_MAX_EDGE", "256")),
+    "medium": int(os.getenv("MEDIUM_IMAGE_MAX_EDGE", "768")),
+}
+
+
+class ImageDerivatives:
+    """
+    Downscaled JPEG versions of the closet images, cached on disk.
+
+    Derivatives are generated on first request and stored in ``cache_dir``
+    with LRU eviction beyond ``max_bytes``. Their key covers the source file
+    name, modification time and size, so a changed source gets a new
+    derivative (and ETag) while the old one ages out.
+    """
+
+    def __init__(
+        self,
+        images_dir,
+        cache_dir=DERIVATIVE_CACHE_DIR,
+        max_bytes=DERIVATIVE_CACHE_MAX_BYTES,
+    ):
+        self.images_dir = Path(images_dir)
+        self._cache = DiskLRUCache(cache_dir, max_bytes=max_bytes, suffix=".jpg")
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def source_path(self, filename):
+        """Return the path of an original image, or None if it does not exist"""
+        path = safe_join(str(self.images_dir), filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        return Path(path)
+
+    def _key(self, source, size):
+        stat = source.stat()
+        signature = f"{source.name}:{stat.st_mtime_ns}:{stat.st_size}"
+        digest = hashlib.sha1(signature.encode("utf-8")).hexdigest()[:24]
+        return f"{size}-{digest}"
+
+    def get(self, filename, size):
+        """
+        Return (path, etag) of an image at the given size, or None
+
+        Args:
+            filename: Image file name relative to the images directory
+            size: One of DERIVATIVE_SIZES
+
+        Raises:
+            KeyError: When the size is unknown
+        """
+        max_edge = DERIVATIVE_SIZES[size]
+        source = self.source_path(filename)
+        if source is None:
+            return None
+        key = self._key(source, size)
+
+        path = self._cache.get_path(key)
+        if path is not None:
+            return path, key
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            path = self._cache.get_path(key)
+            if path is None:
+                prepared = prepare_image(
+                    str(source),
+                    max_edge=max_edge,
+                    quality=DERIVATIVE_JPEG_QUALITY,
+                    use_cache=False,
+                )
+                path = self._cache.put(key, prepared.data)
+                logger.info(f"Created {size} derivative of {filename}")
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return path, key
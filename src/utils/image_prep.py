@@ -0,0 +1,158 @@
+import base64
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Union
+
+from PIL import Image, ImageOps
+
+from src.utils.metrics import record_cache
+from src.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Defaults for images sent to the vision API
+VISION_IMAGE_MAX_EDGE = int(os.getenv("VISION_IMAGE_MAX_EDGE", "1024"))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+
+# Memory budget for prepared images kept for reuse
+PREPARED_CACHE_MAX_BYTES = int(os.getenv("PREPARED_IMAGE_CACHE_MAX_BYTES", "67108864"))
+
+_MAGIC_NUMBERS = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_mime_type(data: bytes) -> str:
+    """Guess the MIME type of image bytes from their signature"""
+    for magic, mime_type in _MAGIC_NUMBERS:
+        if data.startswith(magic):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class PreparedImage:
+    """Image bytes ready to be embedded in an API request"""
+
+    def __init__(self, data: bytes, mime_type: str):
+        self.data = data
+        self.mime_type = mime_type
+
+    def base64(self) -> str:
+        return base64.b64encode(self.data).decode("utf-8")
+
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.base64()}"
+
+
+class _PreparedImageCache:
+    """In-memory LRU of prepared images, bounded by total size"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared is not None:
+                self._entries.move_to_end(key)
+            return prepared
+
+    def put(self, key, prepared):
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= len(self._entries.pop(key).data)
+            self._entries[key] = prepared
+            self._total_bytes += len(prepared.data)
+            while self._total_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted.data)
+
+
+_cache = _PreparedImageCache(PREPARED_CACHE_MAX_BYTES)
+
+
+def _resize_and_encode(data: bytes, max_edge: int, quality: int) -> PreparedImage:
+    """Downscale to max_edge and re-encode as JPEG"""
+    with Image.open(io.BytesIO(data)) as image:
+        if image.format == "JPEG" and max(image.size) <= max_edge:
+            # Already small enough, avoid a lossy re-encode
+            return PreparedImage(data, "image/jpeg")
+
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+            # JPEG has no alpha channel, flatten onto white
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+        return PreparedImage(output.getvalue(), "image/jpeg")
+
+
+def prepare_image(
+    image: Union[str, bytes],
+    max_edge: int = VISION_IMAGE_MAX_EDGE,
+    quality: int = VISION_JPEG_QUALITY,
+    sha256: str = None,
+    use_cache: bool = True,
+) -> PreparedImage:
+    """
+    Prepare an image for an API request
+
+    The image is downscaled so its longest edge is at most max_edge and
+    re-encoded as JPEG at the given quality. Results are cached per content
+    hash, so preparing the same image again is free. Images Pillow cannot
+    decode are returned as-is with their detected MIME type.
+
+    Args:
+        image: Image bytes or a path to the image file
+        max_edge: Maximum width or height in pixels
+        quality: JPEG quality used when re-encoding
+        sha256: Optional SHA-256 of the image bytes, if already known
+        use_cache: Whether to keep the result in the in-memory cache
+    """
+    if isinstance(image, (bytes, bytearray)):
+        data = bytes(image)
+    else:
+        with open(image, "rb") as image_file:
+            data = image_file.read()
+
+    sha256 = sha256 or hashlib.sha256(data).hexdigest()
+    key = (sha256, max_edge, quality)
+    prepared = _cache.get(key) if use_cache else None
+    if use_cache:
+        record_cache("prepared_images", prepared is not None)
+    if prepared is not None:
+        return prepared
+
+    with span("image.encode", bytes=len(data), max_edge=max_edge) as current:
+        try:
+            prepared = _resize_and_encode(data, max_edge, quality)
+        except Exception as e:
+            logger.warning(f"Could not re-encode image {sha256}, sending as-is: {e}")
+            prepared = PreparedImage(data, sniff_mime_type(data))
+        current.set_attribute("encoded_bytes", len(prepared.data))
+
+    logger.info(
+        f"Prepared image {sha256[:12]}: {len(data)} -> {len(prepared.data)} bytes"
+    )
+    if use_cache:
+        _cache.put(key, prepared)
+    return prepared
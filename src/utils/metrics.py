@@ -0,0 +1,331 @@
+"""
+In-process metrics, served in the Prometheus text format at /metrics
+
+Recording is a dictionary lookup and a short critical section on a lock
+owned by that one labelled series, so it is cheap enough for every request.
+Gauges whose value can be read on demand (closet size, queue depth) take a
+callback evaluated only when the metrics are scraped.
+"""
+
+import bisect
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers both local work (ms) and model or try-on calls (tens of s)
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Timer:
+    """Context manager observing the seconds spent in its block"""
+
+    __slots__ = ("_series", "_start")
+
+    def __init__(self, series):
+        self._series = series
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._series.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _CounterSeries:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeSeries(_CounterSeries):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = float(value)
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+
+class _HistogramSeries:
+    __slots__ = ("_lock", "_bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        # Per-bucket (not cumulative) counts, the last one for +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """Return a context manager observing the duration of its block"""
+        return _Timer(self)
+
+
+class _Metric:
+    """A metric family: one series per combination of label values"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Return the series for the given label values (str), in labelnames order"""
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    def _all_series(self):
+        with self._lock:
+            return list(self._series.items())
+
+    def _samples(self):
+        """Yield (suffix, label values, extra labels, value) of every sample"""
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, values, extra, value in self._samples():
+            labels = _format_labels(self.labelnames, values, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_series(self):
+        return _CounterSeries()
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, series in self._all_series():
+            yield "", values, (), series.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._callbacks = {}
+
+    def _new_series(self):
+        return _GaugeSeries()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, fn, *values):
+        """Read the value of a series from fn() whenever metrics are rendered"""
+        with self._lock:
+            self._callbacks[values] = fn
+
+    def _samples(self):
+        for values, series in self._all_series():
+            yield "", values, (), series.value
+        with self._lock:
+            callbacks = list(self._callbacks.items())
+        for values, fn in callbacks:
+            try:
+                value = fn()
+            except Exception as e:
+                logger.warning(f"Cannot read metric {self.name}{values}: {e}")
+                continue
+            yield "", values, (), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _samples(self):
+        for values, series in self._all_series():
+            with series._lock:
+                counts, total = list(series.counts), series.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield "_bucket", values, (("le", _format_value(bound)),), cumulative
+            yield "_sum", values, (), total
+            yield "_count", values, (), cumulative
+
+
+class Registry:
+    """Set of metrics rendered together"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Content type of Registry.render()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_LATENCY = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time to produce the response of an API route",
+        ("method", "route", "status"),
+    )
+)
+OPENAI_LATENCY = REGISTRY.register(
+    Histogram(
+        "openai_request_duration_seconds",
+        "Duration of OpenAI API requests, retries included",
+        ("endpoint", "model", "outcome"),
+    )
+)
+OPENAI_TOKENS = REGISTRY.register(
+    Counter(
+        "openai_tokens_total",
+        "Tokens reported in the usage of OpenAI responses",
+        ("model", "kind"),
+    )
+)
+FASHN_POLLS = REGISTRY.register(
+    Histogram(
+        "fashn_tryon_polls",
+        "Status polls needed per Fashn try-on",
+        ("outcome",),
+        buckets=(1, 2, 3, 5, 8, 13, 21, 34),
+    )
+)
+FASHN_DURATION = REGISTRY.register(
+    Histogram(
+        "fashn_tryon_duration_seconds",
+        "Time from submitting a Fashn try-on to its result",
+        ("outcome",),
+    )
+)
+CACHE_REQUESTS = REGISTRY.register(
+    Counter(
+        "cache_requests_total",
+        "Cache lookups; hit ratio = hit / (hit + miss)",
+        ("cache", "result"),
+    )
+)
+STORAGE_LATENCY = REGISTRY.register(
+    Histogram(
+        "closet_storage_duration_seconds",
+        "Duration of closet storage reads and writes",
+        ("backend", "operation"),
+    )
+)
+CLOSET_ITEMS = REGISTRY.register(Gauge("closet_items", "Number of items in the closet"))
+QUEUE_DEPTH = REGISTRY.register(
+    Gauge("job_queue_depth", "Jobs queued or running in a background queue", ("queue",))
+)
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup"""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_openai_usage(model, usage):
+    """Count the tokens of an OpenAI response usage object"""
+    if not usage:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        tokens = usage.get(kind)
+        if tokens:
+            OPENAI_TOKENS.labels(model, kind[: -len("_tokens")]).inc(tokens)
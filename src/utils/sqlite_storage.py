@@ -0,0 +1,362 @@
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.utils.closet_index import color_keys, normalize_attribute
+from src.utils.storage import BaseClosetStorage
+
+logger = logging.getLogger(__name__)
+
+SEASONS = ("spring", "summer", "fall", "winter")
+
+# PRAGMA user_version of the current schema; older databases are migrated
+SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    category TEXT,
+    formality TEXT,
+    spring INTEGER NOT NULL DEFAULT 0,
+    summer INTEGER NOT NULL DEFAULT 0,
+    fall INTEGER NOT NULL DEFAULT 0,
+    winter INTEGER NOT NULL DEFAULT 0,
+    date_added TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_type ON items (type);
+CREATE INDEX IF NOT EXISTS idx_items_category ON items (category);
+CREATE INDEX IF NOT EXISTS idx_items_formality ON items (formality);
+CREATE INDEX IF NOT EXISTS idx_items_spring ON items (spring);
+CREATE INDEX IF NOT EXISTS idx_items_summer ON items (summer);
+CREATE INDEX IF NOT EXISTS idx_items_fall ON items (fall);
+CREATE INDEX IF NOT EXISTS idx_items_winter ON items (winter);
+CREATE INDEX IF NOT EXISTS idx_items_image_sha256
+    ON items (json_extract(data, '$.image_sha256'));
+CREATE TABLE IF NOT EXISTS item_colors (
+    color TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    PRIMARY KEY (color, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_item_colors_item_id ON item_colors (item_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+"""
+
+_UPSERT = """
+INSERT INTO items (
+    id, type, category, formality, spring, summer, fall, winter, date_added, data
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    type = excluded.type,
+    category = excluded.category,
+    formality = excluded.formality,
+    spring = excluded.spring,
+    summer = excluded.summer,
+    fall = excluded.fall,
+    winter = excluded.winter,
+    date_added = excluded.date_added,
+    data = excluded.data
+"""
+
+
+class SqliteClosetStorage(BaseClosetStorage):
+    """
+    Closet storage backed by a SQLite database in WAL mode.
+
+    The attributes used for filtering are stored normalized in indexed
+    columns (colors in the item_colors table) and the full analysis is kept
+    as JSON in the ``data`` column, so GET /closet filters and pages with
+    query_items() instead of loading the closet. WAL mode lets several
+    Flask/SocketIO workers read while one of them writes.
+    """
+
+    backend = "sqlite"
+    indexed_queries = True
+
+    def __init__(self, db_path=None):
+        super().__init__()
+        self.db_path = db_path or self.closet_dir / "closet.db"
+
+        # Parsed items are cached until the version counter in the meta table
+        # changes, which every write bumps inside its transaction.
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cached_version = None
+        self._items = []
+
+        self._ensure_storage_exists()
+
+    def _ensure_storage_exists(self):
+        """Ensure the directories and database schema exist"""
+        self._ensure_directories_exist()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        self._migrate(conn)
+
+    def _migrate(self, conn):
+        """Rewrite the rows of a database created by an older schema"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                # Rewriting every row brings it to the current schema:
+                # normalized filter columns and item_colors (version 1),
+                # image_sha256 for items stored before uploads were hashed (2)
+                # and a normalized type column (3)
+                rows = conn.execute("SELECT data FROM items ORDER BY rowid")
+                for (data,) in rows.fetchall():
+                    self._write_item(conn, self._with_image_hash(json.loads(data)))
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if version < SCHEMA_VERSION:
+            logger.info(f"Migrated {self.db_path} to schema version {SCHEMA_VERSION}")
+
+    def _connection(self):
+        """Return this thread's database connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_values(item):
+        """Return the column values for an item"""
+        derived = item.get("derived_properties") or {}
+        if not isinstance(derived, dict):
+            derived = {}
+        seasons = derived.get("season_suitability") or {}
+        if not isinstance(seasons, dict):
+            seasons = {}
+        seasons = {
+            normalize_attribute(season): suitable
+            for season, suitable in seasons.items()
+        }
+        return (
+            item["id"],
+            normalize_attribute(item["type"]) if item.get("type") else None,
+            normalize_attribute(item["category"]) if item.get("category") else None,
+            (
+                normalize_attribute(derived["formality"])
+                if derived.get("formality")
+                else None
+            ),
+            *(int(seasons.get(season) is True) for season in SEASONS),
+            item.get("date_added"),
+            json.dumps(item),
+        )
+
+    def _write_item(self, conn, item):
+        """Insert or replace an item and its color index rows"""
+        conn.execute(_UPSERT, self._row_values(item))
+        conn.execute("DELETE FROM item_colors WHERE item_id = ?", (item["id"],))
+        conn.executemany(
+            "INSERT INTO item_colors (color, item_id) VALUES (?, ?)",
+            [(color, item["id"]) for color in color_keys(item)],
+        )
+
+    def _read_version(self, conn):
+        """Return the closet version counter"""
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0]
+
+    @contextmanager
+    def _transaction(self):
+        """Run a write transaction that bumps the closet version if rows changed"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            changes = conn.total_changes
+            yield conn
+            # A write that matched no item must not invalidate the caches
+            # keyed on the version (outfits, closet index, embeddings)
+            if conn.total_changes != changes:
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def add_item(self, item_data, image_file):
+        """Add a new clothing item to the closet"""
+        try:
+            # Save the image first
+            filename, filepath = self._store_image(image_file)
+
+            # Add metadata to the item
+            item_data["date_added"] = datetime.now().isoformat()
+            item_data["image_filename"] = filename
+            item_data["image_path"] = str(filepath)
+
+            with self._measure_write("add"):
+                with self._transaction() as conn:
+                    count = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+                    item_data["id"] = str(count + 1)
+                    self._write_item(conn, item_data)
+
+            logger.info(f"Added item {item_data['id']} to closet")
+            return item_data["id"]
+
+        except Exception as e:
+            logger.error(f"Error adding item to closet: {e}")
+            raise
+
+    def update_item(self, item_id, fields):
+        """Update fields of an existing item, return the updated item or None"""
+        try:
+            with self._measure_write("update"):
+                with self._transaction() as conn:
+                    row = conn.execute(
+                        "SELECT data FROM items WHERE id = ?", (item_id,)
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    item = {**json.loads(row[0]), **fields, "id": item_id}
+                    self._write_item(conn, item)
+
+            logger.info(f"Updated item {item_id} in closet")
+            return item
+
+        except Exception as e:
+            logger.error(f"Error updating item {item_id}: {e}")
+            raise
+
+    def import_items(self, items):
+        """Insert or replace already-stored items, keeping their ids"""
+        with self._transaction() as conn:
+            for item in items:
+                self._write_item(conn, item)
+        logger.info(f"Imported {len(items)} items into {self.db_path}")
+
+    def get_all_items(self):
+        """Get all items in the closet"""
+        try:
+            conn = self._connection()
+            with self._measure_read("get_all_items"), self._lock:
+                version = self._read_version(conn)
+                if version != self._cached_version:
+                    rows = conn.execute("SELECT data FROM items ORDER BY rowid")
+                    self._items = [json.loads(data) for (data,) in rows]
+                    self._cached_version = version
+                return list(self._items)
+        except Exception as e:
+            logger.error(f"Error getting closet items: {e}")
+            raise
+
+    @property
+    def version(self):
+        """Value that changes whenever the closet contents change"""
+        return self._read_version(self._connection())
+
+    def get_item(self, item_id):
+        """Get a specific item from the closet"""
+        try:
+            with self._measure_read("get_item"):
+                row = (
+                    self._connection()
+                    .execute("SELECT data FROM items WHERE id = ?", (item_id,))
+                    .fetchone()
+                )
+            return json.loads(row[0]) if row else None
+        except Exception as e:
+            logger.error(f"Error getting item {item_id}: {e}")
+            raise
+
+    def find_by_hash(self, image_sha256):
+        """Get the item whose image has the given SHA-256, if any"""
+        with self._measure_read("find_by_hash"):
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT data FROM items "
+                    "WHERE json_extract(data, '$.image_sha256') = ? LIMIT 1",
+                    (image_sha256,),
+                )
+                .fetchone()
+            )
+        return json.loads(row[0]) if row else None
+
+    def query_items(
+        self,
+        category=None,
+        item_type=None,
+        season=None,
+        formality=None,
+        color=None,
+        limit=None,
+        cursor=None,
+    ):
+        """
+        Return a page of items matching all of the given filters
+
+        Same arguments, matching and ordering as ClosetIndex.query, answered
+        from the indexed columns; only the rows of the page are parsed.
+
+        Returns:
+            Tuple of (items, next_cursor, total)
+        """
+        clauses, params = [], []
+        for column, value in (
+            ("type", item_type),
+            ("category", category),
+            ("formality", formality),
+        ):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(normalize_attribute(value))
+        if season:
+            season = normalize_attribute(season)
+            clauses.append(f"{season} = 1" if season in SEASONS else "0")
+        if color:
+            clauses.append("id IN (SELECT item_id FROM item_colors WHERE color = ?)")
+            params.append(normalize_attribute(color))
+
+        def where(clauses):
+            return f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        conn = self._connection()
+        with self._measure_read("query_items"):
+            # One read transaction, so the total and the page agree
+            conn.execute("BEGIN")
+            try:
+                total = conn.execute(
+                    f"SELECT COUNT(*) FROM items {where(clauses)}", params
+                ).fetchone()[0]
+
+                if cursor is not None:
+                    row = conn.execute(
+                        "SELECT rowid FROM items WHERE id = ?", (cursor,)
+                    ).fetchone()
+                    if row is None:
+                        raise ValueError(f"Invalid cursor: {cursor}")
+                    clauses.append("rowid > ?")
+                    params.append(row[0])
+
+                sql = f"SELECT data FROM items {where(clauses)} ORDER BY rowid"
+                if limit is not None:
+                    # One more row tells whether another page follows
+                    sql += " LIMIT ?"
+                    params.append(limit + 1)
+                rows = conn.execute(sql, params).fetchall()
+            finally:
+                conn.execute("COMMIT")
+
+        items = [json.loads(data) for (data,) in rows]
+        next_cursor = None
+        if limit is not None and len(items) > limit:
+            items = items[:limit]
+            next_cursor = items[-1]["id"]
+        return items, next_cursor, total
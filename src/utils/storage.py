@@ -1,76 +1,508 @@
+import hashlib
 import json
 import logging
 import os
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 
+from src.utils.metrics import STORAGE_LATENCY
+from src.utils.tracing import span
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within a process
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+# Number of journal records after which the journal is folded into the snapshot
+COMPACTION_THRESHOLD = int(os.getenv("CLOSET_COMPACTION_THRESHOLD", "100"))
+
+# Chunk size used when streaming uploads to disk
+INGEST_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class IngestedImage:
+    """An uploaded image written to disk once, hashed and kept in memory"""
+
+    filename: str
+    path: Path
+    sha256: str
+    data: bytes
+    committed: bool = False
+
+    @property
+    def filepath(self):
+        return self.path.as_posix()
+
+
+class BaseClosetStorage:
+    """Common interface and image handling shared by the closet backends"""
+
+    # Backend name reported in metrics and traces
+    backend = None
+
+    # Whether query_items() is served from indexes kept by the backend itself
+    indexed_queries = False
 
-class ClosetStorage:
     def __init__(self):
         # Define base data directory
         self.data_dir = Path("data")
         self.closet_dir = self.data_dir / "closet"
         self.images_dir = self.data_dir / "images"
-        self.closet_file = self.closet_dir / "closet.json"
-        self._ensure_storage_exists()
 
-    def _ensure_storage_exists(self):
-        """Ensure all required directories and files exist"""
-        # Create directories
+    def _ensure_directories_exist(self):
+        """Ensure the closet and image directories exist"""
         self.closet_dir.mkdir(parents=True, exist_ok=True)
         self.images_dir.mkdir(parents=True, exist_ok=True)
 
-        # Initialize closet.json if it doesn't exist
-        if not self.closet_file.exists():
-            self.closet_file.write_text('{"items": []}')
+    @contextmanager
+    def _measure_write(self, operation):
+        """Trace and time a write to the closet"""
+        with span("storage.write", backend=self.backend, operation=operation):
+            with STORAGE_LATENCY.labels(self.backend, operation).time():
+                yield
 
-    def _load_closet(self):
-        """Load the current closet data"""
-        try:
-            with open(self.closet_file, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.error("Corrupted closet file, creating new one")
-            default_closet = {"items": []}
-            self._save_closet(default_closet)
-            return default_closet
-
-    def _save_closet(self, closet_data):
-        """Save the closet data"""
-        with open(self.closet_file, "w") as f:
-            json.dump(closet_data, f, indent=2)
+    def _measure_read(self, operation):
+        """Time a read from the closet"""
+        return STORAGE_LATENCY.labels(self.backend, operation).time()
 
     def save_image(self, image_file):
         """Save an image file to the images directory"""
         from werkzeug.utils import secure_filename
 
         filename = secure_filename(image_file.filename)
+        self._ensure_directories_exist()
         filepath = self.images_dir / filename
         image_file.save(filepath)
         return filename, filepath.as_posix()
 
+    def ingest_image(self, image_file):
+        """
+        Stream an upload to a temporary file while hashing and buffering it
+
+        The bytes are read from the upload exactly once. The returned image is
+        moved to its final name by add_item, or removed with discard_image.
+        """
+        from werkzeug.utils import secure_filename
+
+        filename = secure_filename(image_file.filename)
+        self._ensure_directories_exist()
+        tmp_path = self.images_dir / f".upload-{uuid.uuid4().hex}.tmp"
+        hasher = hashlib.sha256()
+        chunks = []
+        try:
+            with span("upload.save", filename=filename), open(tmp_path, "wb") as f:
+                while True:
+                    chunk = image_file.stream.read(INGEST_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    chunks.append(chunk)
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        return IngestedImage(
+            filename=filename,
+            path=tmp_path,
+            sha256=hasher.hexdigest(),
+            data=b"".join(chunks),
+        )
+
+    def _with_image_hash(self, item):
+        """
+        Return the item with the SHA-256 of its image, hashing the file if needed
+
+        Items stored before uploads were hashed lack image_sha256, so their
+        images would not be recognized as duplicates. Items whose image is
+        missing are returned unchanged.
+        """
+        if item.get("image_sha256"):
+            return item
+        if item.get("image_path"):
+            path = Path(item["image_path"])
+        elif item.get("image_filename"):
+            path = self.images_dir / item["image_filename"]
+        else:
+            return item
+
+        hasher = hashlib.sha256()
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(INGEST_CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+        except OSError as e:
+            logger.warning(f"Cannot hash the image of item {item.get('id')}: {e}")
+            return item
+        return {**item, "image_sha256": hasher.hexdigest()}
+
+    def discard_image(self, image):
+        """Remove an ingested image that was not added to the closet"""
+        if not image.committed:
+            image.path.unlink(missing_ok=True)
+
+    def _commit_image(self, image):
+        """Move an ingested image to its final name in the images directory"""
+        filepath = self.images_dir / image.filename
+        if filepath.exists():
+            # Never overwrite the image of another item
+            filepath = filepath.with_name(
+                f"{filepath.stem}-{image.sha256[:8]}{filepath.suffix}"
+            )
+        os.replace(image.path, filepath)
+        image.filename = filepath.name
+        image.path = filepath
+        image.committed = True
+        return image.filename, image.filepath
+
+    def _store_image(self, image):
+        """Store the image of a new item, return its (filename, filepath)"""
+        if isinstance(image, IngestedImage):
+            return self._commit_image(image)
+        return self.save_image(image)
+
     def add_item(self, item_data, image_file):
         """Add a new clothing item to the closet"""
+        raise NotImplementedError
+
+    def update_item(self, item_id, fields):
+        """Update fields of an existing item, return the updated item or None"""
+        raise NotImplementedError
+
+    def get_all_items(self):
+        """Get all items in the closet"""
+        raise NotImplementedError
+
+    def get_item(self, item_id):
+        """Get a specific item from the closet"""
+        raise NotImplementedError
+
+    def find_by_hash(self, image_sha256):
+        """Get the item whose image has the given SHA-256, if any"""
+        for item in self.get_all_items():
+            if item.get("image_sha256") == image_sha256:
+                return item
+        return None
+
+    @property
+    def version(self):
+        """Value that changes whenever the closet contents change"""
+        raise NotImplementedError
+
+    def query_items(
+        self,
+        category=None,
+        item_type=None,
+        season=None,
+        formality=None,
+        color=None,
+        limit=None,
+        cursor=None,
+    ):
+        """Filter and paginate with the backend's own indexes, see ClosetIndex.query"""
+        raise NotImplementedError
+
+
+class ClosetStorage(BaseClosetStorage):
+    """
+    Closet storage backed by a JSON snapshot plus an append-only journal.
+
+    Every write is appended to ``closet.journal.jsonl`` as one ``put`` record,
+    and the journal is periodically compacted into ``closet.json`` by a
+    background thread. Snapshots are written to a temporary file and renamed
+    into place, so a crash leaves either the old or the new snapshot intact.
+    """
+
+    backend = "json"
+
+    def __init__(self):
+        super().__init__()
+        self.closet_file = self.closet_dir / "closet.json"
+        self.journal_file = self.closet_dir / "closet.journal.jsonl"
+        self.lock_file = self.closet_dir / "closet.lock"
+
+        # In-memory copy of the closet, indexed by item id. It is reloaded only
+        # when the (mtime, size) signature of the closet files changes on disk.
+        self._lock = threading.RLock()
+        self._items = []
+        self._index = {}
+        self._position = {}
+        self._by_hash = {}
+        self._signature = None
+        self._version = 0
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._compaction_thread = None
+        self._backfill_thread = None
+        self._backfill_lock = threading.Lock()
+        # Nothing is read or created until first use: a missing snapshot is
+        # an empty closet, and the directories are created by the first write
+
+    def _load_closet(self):
+        """Load the closet snapshot"""
         try:
-            # Save the image first
-            filename, filepath = self.save_image(image_file)
+            with open(self.closet_file, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"items": []}
+        except json.JSONDecodeError:
+            # Keep the damaged file around for manual recovery instead of
+            # overwriting it; the journal still holds the most recent items.
+            corrupt_file = self.closet_file.with_name(
+                f"{self.closet_file.name}.corrupt-{datetime.now():%Y%m%d%H%M%S}"
+            )
+            os.replace(self.closet_file, corrupt_file)
+            logger.error(f"Corrupted closet file, moved it to {corrupt_file}")
+            return {"items": []}
+
+    def _save_closet(self, closet_data):
+        """Atomically replace the closet snapshot"""
+        tmp_file = self.closet_file.with_name(
+            f"{self.closet_file.name}.{os.getpid()}.tmp"
+        )
+        with open(tmp_file, "w") as f:
+            json.dump(closet_data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.closet_file)
+
+    def _file_signature(self, path):
+        """Return the (mtime, size) signature of a file"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _storage_signature(self):
+        """Return the signatures of the snapshot and journal files"""
+        return (
+            self._file_signature(self.closet_file),
+            self._file_signature(self.journal_file),
+        )
 
-            # Load current closet
+    def _apply(self, item):
+        """Insert or replace an item in the in-memory closet"""
+        existing = self._index.get(item["id"])
+        if existing is None:
+            self._position[item["id"]] = len(self._items)
+            self._items.append(item)
+        else:
+            self._items[self._position[item["id"]]] = item
+            self._by_hash.pop(existing.get("image_sha256"), None)
+        self._index[item["id"]] = item
+        if item.get("image_sha256"):
+            self._by_hash[item["image_sha256"]] = item
+
+    def _replay_journal(self, path, offset=0):
+        """Apply journal records starting at offset, return the new offset"""
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Torn write from a crashed writer, retry on next refresh
+                        break
+                    offset += len(line)
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping corrupted journal record in {path}")
+                        continue
+                    if record.get("op") == "put":
+                        self._apply(record["item"])
+                        self._journal_entries += 1
+        except FileNotFoundError:
+            pass
+        return offset
+
+    def _refresh(self):
+        """Reload the in-memory closet if the files changed on disk"""
+        signature = self._storage_signature()
+        if signature == self._signature:
+            return
+
+        journal_signature = signature[1]
+        if (
+            self._signature is not None
+            and signature[0] == self._signature[0]
+            and journal_signature is not None
+            and journal_signature[1] >= self._journal_offset
+        ):
+            # Only the journal grew: replay the new records
+            self._journal_offset = self._replay_journal(
+                self.journal_file, self._journal_offset
+            )
+        else:
             closet = self._load_closet()
+            self._items = []
+            self._index = {}
+            self._position = {}
+            self._by_hash = {}
+            self._journal_entries = 0
+            for item in closet["items"]:
+                self._apply(item)
+            self._journal_offset = self._replay_journal(self.journal_file)
+            logger.info(f"Loaded {len(self._items)} items from {self.closet_dir}")
+            self._maybe_backfill()
+
+        self._version += 1
+
+        self._signature = self._storage_signature()
+        self._maybe_compact()
+
+    def _append_journal(self, item):
+        """Durably append a put record to the journal"""
+        line = (json.dumps({"op": "put", "item": item}) + "\n").encode("utf-8")
+        with open(self.journal_file, "ab") as f:
+            if f.tell() > self._journal_offset:
+                # Terminate a torn record so it can't swallow this one
+                line = b"\n" + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+            self._journal_offset = f.tell()
+        self._journal_entries += 1
+
+    def _maybe_compact(self):
+        """Start a background compaction once the journal is long enough"""
+        if self._journal_entries < COMPACTION_THRESHOLD:
+            return
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(
+            target=self.compact, name="closet-compaction", daemon=True
+        )
+        self._compaction_thread.start()
+
+    def _maybe_backfill(self):
+        """Start hashing the images of items stored without image_sha256"""
+        if self._backfill_thread is not None:
+            return
+        if all(item.get("image_sha256") for item in self._items):
+            return
+        self._backfill_thread = threading.Thread(
+            target=self.backfill_image_hashes, name="closet-backfill", daemon=True
+        )
+        self._backfill_thread.start()
+
+    def backfill_image_hashes(self):
+        """
+        Hash the images of items stored without image_sha256 and journal them
+
+        Images are read without holding the closet lock, and the hashes are
+        written as put records so they are computed only once.
+
+        Returns:
+            Number of items updated
+        """
+        try:
+            with self._backfill_lock:
+                return self._backfill_image_hashes()
+        except Exception as e:
+            logger.error(f"Error backfilling image hashes: {e}")
+            return 0
+
+    def _backfill_image_hashes(self):
+        """Hash missing image hashes, then journal them under the writer lock"""
+        missing = [
+            item for item in self.get_all_items() if not item.get("image_sha256")
+        ]
+        hashes = {}
+        for item in missing:
+            hashed = self._with_image_hash(item)
+            if hashed.get("image_sha256"):
+                hashes[item["id"]] = (item, hashed["image_sha256"])
+        if not hashes:
+            return 0
+
+        updated = 0
+        with self._writer_lock(), self._lock:
+            self._refresh()
+            for item_id, (item, image_sha256) in hashes.items():
+                # Skip items changed since they were read
+                if self._index.get(item_id) != item:
+                    continue
+                item = {**item, "image_sha256": image_sha256}
+                self._append_journal(item)
+                self._apply(item)
+                updated += 1
+            if updated:
+                self._version += 1
+                self._signature = self._storage_signature()
+                self._maybe_compact()
+
+        logger.info(f"Backfilled image hashes of {updated} items")
+        return updated
+
+    @contextmanager
+    def _writer_lock(self):
+        """Serialize journal writers and compaction across threads and processes"""
+        self._ensure_directories_exist()
+        with open(self.lock_file, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
 
-            # Add metadata to the item
-            item_data["id"] = str(len(closet["items"]) + 1)
-            item_data["date_added"] = datetime.now().isoformat()
-            item_data["image_filename"] = filename
-            item_data["image_path"] = str(filepath)
+    def compact(self):
+        """Fold the journal into a new closet snapshot"""
+        try:
+            with self._writer_lock():
+                with self._lock:
+                    self._refresh()
+                    items = list(self._items)
+
+                # Items are never mutated in place, so the copy stays consistent
+                # while readers keep using the in-memory closet. The snapshot
+                # lands before the journal is dropped; replaying a journal that
+                # is already in the snapshot is harmless because puts are
+                # idempotent by id.
+                self._save_closet({"items": items})
+                self.journal_file.unlink(missing_ok=True)
+
+                with self._lock:
+                    self._journal_offset = 0
+                    self._journal_entries = 0
+                    self._signature = self._storage_signature()
+
+            logger.info(f"Compacted closet journal into snapshot ({len(items)} items)")
+
+        except Exception as e:
+            logger.error(f"Error compacting closet journal: {e}")
+
+    def add_item(self, item_data, image_file):
+        """Add a new clothing item to the closet"""
+        try:
+            # Save the image first
+            filename, filepath = self._store_image(image_file)
 
-            # Add to closet
-            closet["items"].append(item_data)
+            with self._measure_write("add"):
+                with self._writer_lock(), self._lock:
+                    self._refresh()
 
-            # Save updated closet
-            self._save_closet(closet)
+                    # Add metadata to the item
+                    item_data["id"] = str(len(self._items) + 1)
+                    item_data["date_added"] = datetime.now().isoformat()
+                    item_data["image_filename"] = filename
+                    item_data["image_path"] = str(filepath)
+
+                    # Append to the journal, then update the in-memory copy
+                    self._append_journal(item_data)
+                    self._apply(item_data)
+                    self._version += 1
+                    self._signature = self._storage_signature()
+                    self._maybe_compact()
 
             logger.info(f"Added item {item_data['id']} to closet")
             return item_data["id"]
@@ -79,11 +511,44 @@ class ClosetStorage:
             logger.error(f"Error adding item to closet: {e}")
             raise
 
+    def update_item(self, item_id, fields):
+        """Update fields of an existing item, return the updated item or None"""
+        try:
+            with self._measure_write("update"):
+                with self._writer_lock(), self._lock:
+                    self._refresh()
+                    existing = self._index.get(item_id)
+                    if existing is None:
+                        return None
+
+                    # Items are replaced rather than mutated in place
+                    item = {**existing, **fields, "id": item_id}
+                    self._append_journal(item)
+                    self._apply(item)
+                    self._version += 1
+                    self._signature = self._storage_signature()
+                    self._maybe_compact()
+
+            logger.info(f"Updated item {item_id} in closet")
+            return item
+
+        except Exception as e:
+            logger.error(f"Error updating item {item_id}: {e}")
+            raise
+
+    @property
+    def version(self):
+        """Value that changes whenever the closet contents change"""
+        with self._lock:
+            self._refresh()
+            return self._version
+
     def get_all_items(self):
         """Get all items in the closet"""
         try:
-            closet = self._load_closet()
-            return closet["items"]
+            with self._measure_read("get_all_items"), self._lock:
+                self._refresh()
+                return list(self._items)
         except Exception as e:
             logger.error(f"Error getting closet items: {e}")
             raise
@@ -91,11 +556,27 @@ class ClosetStorage:
     def get_item(self, item_id):
         """Get a specific item from the closet"""
         try:
-            closet = self._load_closet()
-            for item in closet["items"]:
-                if item["id"] == item_id:
-                    return item
-            return None
+            with self._measure_read("get_item"), self._lock:
+                self._refresh()
+                return self._index.get(item_id)
         except Exception as e:
             logger.error(f"Error getting item {item_id}: {e}")
             raise
+
+    def find_by_hash(self, image_sha256):
+        """Get the item whose image has the given SHA-256, if any"""
+        with self._measure_read("find_by_hash"), self._lock:
+            self._refresh()
+            return self._by_hash.get(image_sha256)
+
+
+def get_closet_storage():
+    """Create the closet storage backend selected by CLOSET_STORAGE_BACKEND"""
+    backend = os.getenv("CLOSET_STORAGE_BACKEND", "json").lower()
+    if backend == "json":
+        return ClosetStorage()
+    if backend == "sqlite":
+        from src.utils.sqlite_storage import SqliteClosetStorage
+
+        return SqliteClosetStorage()
+    raise ValueError(f"Unknown closet storage backend: {backend}")
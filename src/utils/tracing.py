@@ -0,0 +1,155 @@
+"""
+OpenTelemetry spans around the slow stages of a request
+
+    with span("openai.vision", model=payload["model"]):
+        ...
+
+Tracing is off unless TRACING_ENABLED is set; span() then returns a shared
+no-op context manager and OpenTelemetry is not even imported. When enabled,
+finished spans are exported in the background by a BatchSpanProcessor.
+
+Settings:
+    TRACING_ENABLED: true to record spans (default false)
+    TRACING_EXPORTER: otlp (default), console, or module:factory returning a
+        SpanExporter
+    TRACING_ENDPOINT: OTLP/HTTP traces endpoint (default Phoenix on :6006,
+        see docker-compose.arize.yml)
+    TRACING_SERVICE_NAME: service.name of the spans (default personal-stylist)
+"""
+
+import importlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACING_ENDPOINT = "http://localhost:6006/v1/traces"
+
+_lock = threading.Lock()
+_tracer = None
+_provider = None
+
+
+class _NoopSpan:
+    """Stands in for a span and its context manager when tracing is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def record_exception(self, exception, attributes=None):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name, **attributes):
+    """
+    Return a context manager recording a span around a stage
+
+    The span becomes the current one, so spans opened inside it (also in
+    coroutines awaited within) are its children. Exceptions are recorded on
+    the span and re-raised.
+
+    Args:
+        name: Span name, such as "openai.chat"
+        **attributes: Span attributes (str, bool, int or float values)
+    """
+    if _tracer is None:
+        return _NOOP_SPAN
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+def _create_exporter(name):
+    """Create the span exporter selected by TRACING_EXPORTER"""
+    if name == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        endpoint = os.getenv("TRACING_ENDPOINT", DEFAULT_TRACING_ENDPOINT)
+        return OTLPSpanExporter(endpoint=endpoint)
+    if name == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        return ConsoleSpanExporter()
+    if ":" in name:
+        module_name, factory = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), factory)()
+    raise ValueError(
+        f"Unknown TRACING_EXPORTER {name!r}, use otlp, console or module:factory"
+    )
+
+
+def configure_tracing(exporter=None, enabled=None) -> bool:
+    """
+    Start recording spans, once per process
+
+    The settings are read when this is called, after config/.env is loaded.
+
+    Args:
+        exporter: SpanExporter to use instead of the TRACING_EXPORTER one
+        enabled: Overrides TRACING_ENABLED (an exporter implies true)
+
+    Returns:
+        Whether tracing is enabled
+    """
+    global _provider, _tracer
+
+    if enabled is None:
+        enabled = exporter is not None or os.getenv(
+            "TRACING_ENABLED", "false"
+        ).lower() in ("1", "true")
+    if not enabled:
+        return False
+
+    with _lock:
+        if _tracer is not None:
+            return True
+        try:
+            from opentelemetry import trace
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+            if exporter is None:
+                exporter = _create_exporter(os.getenv("TRACING_EXPORTER", "otlp"))
+        except (ImportError, AttributeError, ValueError) as e:
+            logger.error(f"Tracing disabled, cannot set up the exporter: {e}")
+            return False
+
+        # Spans are queued and exported from a background thread, so a slow
+        # or unreachable collector never delays a request
+        provider = TracerProvider(
+            resource=Resource.create(
+                {"service.name": os.getenv("TRACING_SERVICE_NAME", "personal-stylist")}
+            )
+        )
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        _provider = provider
+        _tracer = provider.get_tracer(__name__)
+
+    logger.info(f"Tracing enabled, exporting spans with {type(exporter).__name__}")
+    return True
+
+
+def shutdown_tracing(timeout=5.0):
+    """Export the queued spans and stop recording"""
+    global _provider, _tracer
+
+    with _lock:
+        provider, _provider, _tracer = _provider, None, None
+    if provider is not None:
+        provider.force_flush(timeout_millis=int(timeout * 1000))
+        provider.shutdown()
@@ -0,0 +1,13 @@
+"""
+WSGI entry point, for servers that import the application object
+
+    gunicorn --worker-class gevent --workers 1 src.wsgi:app
+"""
+
+from src.config import load_config
+
+load_config()
+
+from src.app import create_app  # noqa: E402
+
+app = create_app()
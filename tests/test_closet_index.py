@@ -0,0 +1,146 @@
+import pytest
+
+from src.utils.closet_index import ClosetIndex
+from src.utils.sqlite_storage import SqliteClosetStorage
+
+
+def make_item(item_id, category, formality, seasons, colors, item_type="shirt"):
+    return {
+        "id": item_id,
+        "type": item_type,
+        "category": category,
+        "colors": [{"name": name, "hex": "#000000"} for name in colors],
+        "derived_properties": {
+            "formality": formality,
+            "season_suitability": {season: True for season in seasons},
+        },
+    }
+
+
+ITEMS = [
+    make_item("1", "tops", "casual", ["summer"], ["navy blue"]),
+    make_item("2", "bottoms", "casual", ["summer", "fall"], ["black"], "jeans"),
+    make_item("3", "tops", "smart_casual", ["winter"], ["white", "sky blue"]),
+    make_item("4", "tops", "casual", ["summer", "spring"], ["red"], "T-Shirt"),
+    make_item("5", "shoes", "formal", [], ["black"]),
+    make_item("6", "tops", "Smart Casual", ["summer"], ["blue"]),
+]
+
+
+class FakeStorage:
+    """In-memory storage exposing what ClosetIndex needs"""
+
+    indexed_queries = False
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.version = 1
+        self.reads = 0
+
+    def get_all_items(self):
+        self.reads += 1
+        return list(self.items)
+
+
+def ids(page):
+    return [item["id"] for item in page[0]]
+
+
+@pytest.fixture
+def index():
+    return ClosetIndex(FakeStorage(ITEMS))
+
+
+def test_no_filters_returns_every_item_in_closet_order(index):
+    items, next_cursor, total = index.query()
+    assert [item["id"] for item in items] == ["1", "2", "3", "4", "5", "6"]
+    assert next_cursor is None
+    assert total == 6
+
+
+def test_filters_are_combined_and_normalized(index):
+    assert ids(index.query(category="tops", season="Summer")) == ["1", "4", "6"]
+    assert ids(index.query(formality="smart casual")) == ["3", "6"]
+    assert ids(index.query(formality="SMART_CASUAL", category="tops")) == ["3", "6"]
+    assert ids(index.query(category="dresses")) == []
+
+
+def test_type_filter(index):
+    assert ids(index.query(item_type="shirt")) == ["1", "3", "5", "6"]
+    assert ids(index.query(item_type="t-shirt", category="tops")) == ["4"]
+    assert ids(index.query(item_type="jeans", season="winter")) == []
+
+
+def test_color_matches_full_names_and_words(index):
+    assert ids(index.query(color="blue")) == ["1", "3", "6"]
+    assert ids(index.query(color="navy blue")) == ["1"]
+
+
+def test_cursor_pagination_walks_every_match(index):
+    seen = []
+    cursor = None
+    while True:
+        items, cursor, total = index.query(category="tops", limit=2, cursor=cursor)
+        assert total == 4
+        assert len(items) <= 2
+        seen.extend(item["id"] for item in items)
+        if cursor is None:
+            break
+    assert seen == ["1", "3", "4", "6"]
+
+
+def test_last_full_page_has_no_next_cursor(index):
+    assert index.query(limit=6)[1] is None
+    assert index.query(limit=3, cursor="3")[1] is None
+
+
+def test_cursor_outside_the_filtered_items(index):
+    # Item 2 is not a top, pages still continue after its position
+    assert ids(index.query(category="tops", cursor="2")) == ["3", "4", "6"]
+
+
+def test_invalid_cursor_raises(index):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        index.query(cursor="missing")
+
+
+def test_rebuilds_only_when_the_version_changes(index):
+    index.query()
+    index.query(category="tops")
+    assert index.storage.reads == 1
+
+    index.storage.items.append(make_item("7", "tops", "casual", [], []))
+    index.storage.version += 1
+    assert ids(index.query(category="tops"))[-1] == "7"
+    assert index.storage.reads == 2
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"category": "tops", "season": "summer"},
+        {"formality": "smart_casual"},
+        {"item_type": "T-shirt"},
+        {"item_type": "shirt", "category": "tops", "limit": 1, "cursor": "1"},
+        {"color": "blue", "limit": 1},
+        {"category": "tops", "limit": 2, "cursor": "3"},
+        {"season": "autumn"},
+    ],
+)
+def test_sqlite_queries_match_the_in_memory_index(tmp_path, monkeypatch, filters):
+    monkeypatch.chdir(tmp_path)
+    storage = SqliteClosetStorage()
+    storage.import_items(ITEMS)
+
+    page = ClosetIndex(storage).query(**filters)
+    expected = ClosetIndex(FakeStorage(ITEMS)).query(**filters)
+    assert (ids(page), page[1], page[2]) == (ids(expected), expected[1], expected[2])
+
+
+def test_sqlite_invalid_cursor_raises(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = SqliteClosetStorage()
+    storage.import_items(ITEMS)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        ClosetIndex(storage).query(cursor="missing")
@@ -0,0 +1,168 @@
+import io
+import json
+import threading
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from src.utils import storage as storage_module
+from src.utils.storage import ClosetStorage
+
+
+@pytest.fixture
+def closet(tmp_path, monkeypatch):
+    """JSON closet storage under a temporary working directory"""
+    monkeypatch.chdir(tmp_path)
+    return ClosetStorage()
+
+
+@pytest.fixture(autouse=True)
+def background_threads(monkeypatch):
+    """Let compactions and backfills finish in the test's working directory"""
+    yield
+    # A backfill can start a compaction, join until none is left
+    while True:
+        threads = [
+            thread
+            for thread in threading.enumerate()
+            if thread.name.startswith("closet-")
+        ]
+        if not threads:
+            break
+        for thread in threads:
+            thread.join(timeout=10)
+
+
+def upload(name, data=None):
+    return FileStorage(io.BytesIO(data or name.encode()), filename=name)
+
+
+def add(closet, name, **fields):
+    return closet.add_item({"type": "shirt", **fields}, upload(name))
+
+
+def journal_records(closet):
+    with open(closet.journal_file) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_writes_are_appended_to_the_journal(closet):
+    add(closet, "a.jpg")
+    add(closet, "b.jpg")
+    closet.update_item("1", {"type": "jacket"})
+
+    assert not closet.closet_file.exists()
+    records = journal_records(closet)
+    assert [record["op"] for record in records] == ["put", "put", "put"]
+    assert [record["item"]["id"] for record in records] == ["1", "2", "1"]
+
+
+def test_journal_is_replayed_by_a_new_instance(closet):
+    add(closet, "a.jpg")
+    add(closet, "b.jpg")
+    closet.update_item("1", {"type": "jacket"})
+
+    reloaded = ClosetStorage()
+    items = reloaded.get_all_items()
+    assert [item["id"] for item in items] == ["1", "2"]
+    assert reloaded.get_item("1")["type"] == "jacket"
+    assert reloaded.get_item("2")["type"] == "shirt"
+
+
+def test_other_instances_see_new_writes(closet):
+    reader = ClosetStorage()
+    assert reader.get_all_items() == []
+    version = reader.version
+
+    add(closet, "a.jpg")
+    assert [item["id"] for item in reader.get_all_items()] == ["1"]
+    assert reader.version != version
+
+
+def test_compact_folds_the_journal_into_the_snapshot(closet):
+    add(closet, "a.jpg")
+    add(closet, "b.jpg")
+    closet.update_item("2", {"type": "jeans"})
+
+    closet.compact()
+
+    assert not closet.journal_file.exists()
+    with open(closet.closet_file) as f:
+        snapshot = json.load(f)
+    assert [item["id"] for item in snapshot["items"]] == ["1", "2"]
+    assert snapshot["items"][1]["type"] == "jeans"
+
+    reloaded = ClosetStorage()
+    assert [(item["id"], item["type"]) for item in reloaded.get_all_items()] == [
+        ("1", "shirt"),
+        ("2", "jeans"),
+    ]
+
+
+def test_writes_after_compaction_are_kept(closet):
+    add(closet, "a.jpg")
+    closet.compact()
+    add(closet, "b.jpg")
+
+    assert [record["item"]["id"] for record in journal_records(closet)] == ["2"]
+    assert [item["id"] for item in ClosetStorage().get_all_items()] == ["1", "2"]
+
+
+def test_compaction_starts_at_the_threshold(closet, monkeypatch):
+    monkeypatch.setattr(storage_module, "COMPACTION_THRESHOLD", 3)
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        add(closet, name)
+    closet._compaction_thread.join(timeout=10)
+
+    assert not closet.journal_file.exists()
+    assert [item["id"] for item in ClosetStorage().get_all_items()] == ["1", "2", "3"]
+
+
+def test_torn_and_corrupted_records_are_skipped(closet):
+    add(closet, "a.jpg")
+    with open(closet.journal_file, "a") as f:
+        f.write("not json\n")
+        f.write('{"op": "put", "item": {"id": "9"')
+
+    reloaded = ClosetStorage()
+    assert [item["id"] for item in reloaded.get_all_items()] == ["1"]
+
+    # The torn record is terminated before the next one is appended
+    add(reloaded, "b.jpg")
+    assert [item["id"] for item in ClosetStorage().get_all_items()] == ["1", "2"]
+
+
+def test_find_by_hash_after_replay(closet):
+    item_id = add(closet, "a.jpg", image_sha256="abc")
+    closet.update_item(item_id, {"image_sha256": "def"})
+
+    reloaded = ClosetStorage()
+    assert reloaded.find_by_hash("abc") is None
+    assert reloaded.find_by_hash("def")["id"] == item_id
+
+
+def test_missing_image_hashes_are_backfilled_once(closet, monkeypatch):
+    closet._ensure_directories_exist()
+    image = closet.images_dir / "old.jpg"
+    image.write_bytes(b"old image")
+    item = {"id": "1", "type": "shirt", "image_path": image.as_posix()}
+    closet.closet_file.write_text(json.dumps({"items": [item]}))
+
+    reloaded = ClosetStorage()
+    reloaded.get_all_items()
+    reloaded._backfill_thread.join(timeout=10)
+    digest = reloaded.get_item("1")["image_sha256"]
+    assert reloaded.find_by_hash(digest)["id"] == "1"
+    assert [record["item"]["image_sha256"] for record in journal_records(closet)] == [
+        digest
+    ]
+
+    # The hash is read back from the journal, the image is not hashed again
+    hashed = []
+    monkeypatch.setattr(
+        ClosetStorage, "_with_image_hash", lambda self, item: hashed.append(item)
+    )
+    restarted = ClosetStorage()
+    assert restarted.get_item("1")["image_sha256"] == digest
+    assert restarted._backfill_thread is None
+    assert hashed == []
@@ -0,0 +1,35 @@
+import io
+
+import pytest
+from PIL import Image
+
+from src.utils.image_derivatives import DERIVATIVE_SIZES, ImageDerivatives
+
+
+@pytest.fixture
+def derivatives(tmp_path):
+    images_dir = tmp_path / "images"
+    images_dir.mkdir()
+    Image.new("RGB", (2000, 1000), (200, 30, 30)).save(images_dir / "red.png")
+    return ImageDerivatives(images_dir, cache_dir=tmp_path / "cache")
+
+
+@pytest.mark.parametrize("size", ["thumb", "medium"])
+def test_derivatives_are_downscaled_jpegs(derivatives, size):
+    path, etag = derivatives.get("red.png", size)
+    assert etag.startswith(f"{size}-")
+    with Image.open(io.BytesIO(path.read_bytes())) as image:
+        assert image.format == "JPEG"
+        assert max(image.size) == DERIVATIVE_SIZES[size]
+
+
+def test_derivatives_are_cached(derivatives):
+    first = derivatives.get("red.png", "thumb")
+    assert derivatives.get("red.png", "thumb") == first
+
+
+def test_missing_and_unsafe_names(derivatives):
+    assert derivatives.get("missing.png", "thumb") is None
+    assert derivatives.get("../images/red.png", "thumb") is None
+    with pytest.raises(KeyError):
+        derivatives.get("red.png", "huge")
@@ -0,0 +1,38 @@
+from src.services.jobs import COMPLETED, PENDING, JobRegistry
+
+
+def test_jobs_are_kept_in_memory():
+    jobs = JobRegistry()
+    job = jobs.create("classify", item_id="1")
+    assert jobs.get(job["id"])["status"] == PENDING
+
+    jobs.update(job["id"], status=COMPLETED, result={"id": "1"})
+    assert jobs.get(job["id"])["result"] == {"id": "1"}
+    assert jobs.get("unknown") is None
+    assert jobs.update("unknown", status=COMPLETED) is None
+
+
+def test_oldest_jobs_are_evicted():
+    jobs = JobRegistry(max_jobs=2)
+    first = jobs.create("classify")
+    jobs.create("classify")
+    jobs.create("classify")
+    assert jobs.get(first["id"]) is None
+
+
+def test_shared_jobs_are_visible_to_other_registries(tmp_path):
+    worker, other = JobRegistry(shared_dir=tmp_path), JobRegistry(shared_dir=tmp_path)
+    job = worker.create("classify", item_id="1")
+    assert other.get(job["id"])["status"] == PENDING
+
+    worker.update(job["id"], status=COMPLETED, result={"id": "1"})
+    assert other.get(job["id"])["result"] == {"id": "1"}
+    assert other.get("../secret") is None
+
+
+def test_evicted_shared_jobs_are_removed(tmp_path):
+    jobs = JobRegistry(max_jobs=1, shared_dir=tmp_path)
+    first = jobs.create("classify")
+    second = jobs.create("classify")
+    assert [path.name for path in tmp_path.iterdir()] == [f"{second['id']}.json"]
+    assert JobRegistry(shared_dir=tmp_path).get(first["id"]) is None
@@ -0,0 +1,180 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.services.llm import transport as transport_module
+from src.services.llm.transport import BACKOFF_MAX_SECONDS, LLMTransport
+
+COMPLETION = {"choices": [{"message": {"content": "ok"}}], "usage": {}}
+
+
+class MockedTransport(LLMTransport):
+    """LLMTransport whose clients answer from a list of canned responses"""
+
+    def __init__(self, responses, **kwargs):
+        super().__init__(base_url="https://openai.test/v1", **kwargs)
+        self.responses = list(responses)
+        self.requests = []
+
+    def _handle(self, request):
+        self.requests.append(request)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def _client_kwargs(self):
+        return {
+            **super()._client_kwargs(),
+            "transport": httpx.MockTransport(self._handle),
+        }
+
+
+class FakeRateLimiter:
+    def __init__(self):
+        self.acquired = 0
+        self.backoffs = []
+
+    def acquire(self):
+        self.acquired += 1
+
+    def backoff(self, delay):
+        self.backoffs.append(delay)
+
+
+@pytest.fixture(autouse=True)
+def sleeps(monkeypatch):
+    """Record retry delays instead of sleeping"""
+    delays = []
+
+    async def async_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(transport_module.time, "sleep", delays.append)
+    monkeypatch.setattr(transport_module.asyncio, "sleep", async_sleep)
+    return delays
+
+
+def test_returns_the_json_body():
+    transport = MockedTransport([httpx.Response(200, json=COMPLETION)])
+    assert transport.chat_completion({"model": "gpt-4o"}) == COMPLETION
+
+    request = transport.requests[0]
+    assert request.url == "https://openai.test/v1/chat/completions"
+    assert request.headers["Authorization"] == "Bearer test-key"
+    assert json.loads(request.content) == {"model": "gpt-4o"}
+
+
+def test_retries_server_errors(sleeps):
+    transport = MockedTransport(
+        [
+            httpx.Response(503),
+            httpx.Response(500),
+            httpx.Response(200, json=COMPLETION),
+        ]
+    )
+    assert transport.chat_completion({}) == COMPLETION
+    assert len(transport.requests) == 3
+    assert len(sleeps) == 2
+
+
+def test_retries_transport_errors(sleeps):
+    transport = MockedTransport(
+        [httpx.ConnectError("refused"), httpx.Response(200, json=COMPLETION)]
+    )
+    assert transport.chat_completion({}) == COMPLETION
+    assert len(sleeps) == 1
+
+
+def test_honours_retry_after(sleeps):
+    transport = MockedTransport(
+        [
+            httpx.Response(429, headers={"Retry-After": "7"}),
+            httpx.Response(200, json=COMPLETION),
+        ]
+    )
+    transport.chat_completion({})
+    assert sleeps == [7.0]
+
+
+def test_caps_retry_after(sleeps):
+    transport = MockedTransport(
+        [
+            httpx.Response(429, headers={"Retry-After": "600"}),
+            httpx.Response(200, json=COMPLETION),
+        ]
+    )
+    transport.chat_completion({})
+    assert sleeps == [BACKOFF_MAX_SECONDS]
+
+
+def test_backs_off_exponentially_without_retry_after(sleeps):
+    transport = MockedTransport(
+        [httpx.Response(503)] * 3 + [httpx.Response(200, json=COMPLETION)]
+    )
+    transport.chat_completion({})
+    # base * 2**attempt plus up to 50% jitter
+    for attempt, delay in enumerate(sleeps):
+        assert 2**attempt <= delay <= 1.5 * 2**attempt
+
+
+def test_gives_up_after_max_retries(sleeps):
+    transport = MockedTransport([httpx.Response(500)] * 3, max_retries=2)
+    with pytest.raises(httpx.HTTPStatusError):
+        transport.chat_completion({})
+    assert len(transport.requests) == 3
+    assert len(sleeps) == 2
+
+
+def test_client_errors_are_not_retried(sleeps):
+    transport = MockedTransport([httpx.Response(400, json={"error": {}})])
+    with pytest.raises(httpx.HTTPStatusError):
+        transport.chat_completion({})
+    assert len(transport.requests) == 1
+    assert sleeps == []
+
+
+def test_rate_limits_pause_the_shared_limiter(sleeps):
+    limiter = FakeRateLimiter()
+    transport = MockedTransport(
+        [
+            httpx.Response(429, headers={"Retry-After": "3"}),
+            httpx.Response(200, json=COMPLETION),
+        ]
+    )
+    transport.chat_completion({}, rate_limiter=limiter)
+    assert limiter.backoffs == [3.0]
+    assert limiter.acquired == 2
+    assert sleeps == []
+
+
+def test_async_post_honours_retry_after(sleeps):
+    transport = MockedTransport(
+        [
+            httpx.Response(429, headers={"Retry-After": "2"}),
+            httpx.Response(200, json=COMPLETION),
+        ]
+    )
+    assert asyncio.run(transport.achat_completion({})) == COMPLETION
+    assert sleeps == [2.0]
+
+
+def test_stream_retries_before_the_first_event(sleeps):
+    events = [
+        {"choices": [{"delta": {"content": "Hel"}}]},
+        {"choices": [{"delta": {"content": "lo"}}]},
+        {"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 2}},
+    ]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events)
+    transport = MockedTransport(
+        [
+            httpx.Response(503, headers={"Retry-After": "1"}),
+            httpx.Response(200, text=body + "data: [DONE]\n\n"),
+        ]
+    )
+    assert "".join(transport.stream_chat_completion({"model": "gpt-4o"})) == "Hello"
+    assert sleeps == [1.0]
+    assert json.loads(transport.requests[-1].content)["stream"] is True
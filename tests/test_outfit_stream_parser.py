@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from src.services.llm.outfit_recommender import OutfitStreamParser
+
+OUTFITS = [
+    {
+        "items": ["1", "4"],
+        "style_description": 'A {bold} look with a "statement" } piece \\ and more',
+        "occasions": ["casual", "weekend"],
+        "styling_tips": "Tuck in the shirt {loosely}.",
+    },
+    {
+        "items": ["2", "3"],
+        "style_description": "Layered",
+        "occasions": [],
+        "styling_tips": "Add a belt",
+        "details": {"palette": {"main": "navy"}},
+    },
+]
+
+RESPONSE = "```json\n" + json.dumps({"outfits": OUTFITS}, indent=2) + "\n```"
+
+
+def parse(chunks):
+    parser = OutfitStreamParser()
+    outfits = []
+    for chunk in chunks:
+        outfits.extend(parser.feed(chunk))
+    return outfits
+
+
+def split(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_whole_response():
+    assert parse([RESPONSE]) == OUTFITS
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_split_chunks(size):
+    assert parse(split(RESPONSE, size)) == OUTFITS
+
+
+def test_outfits_are_returned_as_soon_as_they_are_complete():
+    parser = OutfitStreamParser()
+    first_end = RESPONSE.index('"Layered"')
+    assert parser.feed(RESPONSE[:first_end]) == OUTFITS[:1]
+    assert parser.feed(RESPONSE[first_end:]) == OUTFITS[1:]
+
+
+def test_escaped_quote_split_across_chunks():
+    text = json.dumps({"outfits": [{"style_description": 'say \\"hi\\" {'}]})
+    escape = text.index("\\\\")
+    assert parse([text[: escape + 1], text[escape + 1 :]]) == [
+        {"style_description": 'say \\"hi\\" {'}
+    ]
+
+
+def test_text_before_the_outfits_array_is_ignored():
+    text = '{"note": "{not an outfit}", "outfits": [{"items": ["1"]}]}'
+    assert parse(split(text, 5)) == [{"items": ["1"]}]
+
+
+def test_malformed_outfits_are_skipped():
+    text = '{"outfits": [{"items": [1,]}, {"items": ["2"]}]}'
+    assert parse([text]) == [{"items": ["2"]}]
+
+
+def test_incomplete_stream_yields_only_complete_outfits():
+    assert parse([RESPONSE[: RESPONSE.index('"Layered"')]]) == OUTFITS[:1]
@@ -0,0 +1,126 @@
+import threading
+import time
+
+from src.services.outfits.cache import RecommendationCache
+
+
+class FakeStorage:
+    def __init__(self):
+        self.version = 1
+
+
+class Generator:
+    """Outfit generator counting its calls; results name the closet version"""
+
+    def __init__(self, storage, release=None):
+        self.storage = storage
+        self.release = release
+        self.calls = []
+        self.done = threading.Event()
+
+    def __call__(self, occasion, season, style):
+        if self.release is not None:
+            self.release.wait(timeout=10)
+        self.calls.append((occasion, season, style))
+        self.done.set()
+        return [{"version": self.storage.version, "occasion": occasion}]
+
+
+def make_cache(**kwargs):
+    storage = FakeStorage()
+    generate = Generator(storage, kwargs.pop("release", None))
+    options = {"ttl": 60, "max_entries": 8, "stale_while_revalidate": False}
+    return RecommendationCache(storage, generate, **{**options, **kwargs})
+
+
+def test_fresh_entries_are_served_from_the_cache():
+    cache = make_cache()
+    first = cache.get(occasion="casual")
+    assert cache.get(occasion="casual") is first
+    assert len(cache.generate.calls) == 1
+
+
+def test_equivalent_filters_share_an_entry():
+    cache = make_cache()
+    cache.get(occasion="Business_Casual", season=" Summer ")
+    cache.get(occasion="business casual", season="summer")
+    assert cache.generate.calls == [("business casual", "summer", None)]
+
+
+def test_closet_changes_invalidate_entries():
+    cache = make_cache()
+    assert cache.get()[0]["version"] == 1
+
+    cache.storage.version = 2
+    assert cache.peek() is None
+    assert cache.get()[0]["version"] == 2
+    assert len(cache.generate.calls) == 2
+
+
+def test_expired_entries_are_regenerated():
+    cache = make_cache(ttl=0)
+    cache.get()
+    assert cache.peek() is None
+    cache.get()
+    assert len(cache.generate.calls) == 2
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = make_cache(max_entries=2)
+    cache.get(occasion="a")
+    cache.get(occasion="b")
+    cache.get(occasion="a")
+    cache.get(occasion="c")
+
+    assert cache.peek(occasion="a") is not None
+    assert cache.peek(occasion="b") is None
+    assert cache.peek(occasion="c") is not None
+
+
+def test_peek_never_generates():
+    cache = make_cache()
+    assert cache.peek(occasion="casual") is None
+    assert cache.generate.calls == []
+
+
+def test_put_stores_outfits_for_a_version():
+    cache = make_cache()
+    cache.put([{"items": ["1"]}], version=1, occasion="casual")
+    assert cache.get(occasion="casual") == [{"items": ["1"]}]
+    assert cache.generate.calls == []
+
+
+def test_stale_entries_are_served_while_revalidating():
+    cache = make_cache(stale_while_revalidate=True)
+    stale = cache.get()
+    cache.generate.done.clear()
+
+    cache.storage.version = 2
+    assert cache.get() is stale
+
+    # The refreshed entry is stored right after the generator returns
+    assert cache.generate.done.wait(timeout=10)
+    deadline = time.monotonic() + 10
+    while cache.peek() is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get()[0]["version"] == 2
+    assert len(cache.generate.calls) == 2
+
+
+def test_concurrent_misses_generate_once():
+    release = threading.Event()
+    cache = make_cache(release=release)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get(occasion="party")))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert len(results) == 5
+    assert len(cache.generate.calls) == 1
+    assert all(result is results[0] for result in results)
@@ -0,0 +1,48 @@
+import pytest
+
+from src.utils.sqlite_storage import SqliteClosetStorage
+
+
+@pytest.fixture
+def closet(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = SqliteClosetStorage()
+    storage.import_items([{"id": "1", "type": "shirt", "category": "tops"}])
+    return storage
+
+
+def test_update_bumps_the_version(closet):
+    version = closet.version
+    assert closet.update_item("1", {"type": "jacket"})["type"] == "jacket"
+    assert closet.version == version + 1
+    assert closet.get_item("1")["type"] == "jacket"
+
+
+def test_update_of_an_unknown_item_keeps_the_version(closet):
+    version = closet.version
+    assert closet.update_item("42", {"type": "jacket"}) is None
+    assert closet.version == version
+
+
+def test_items_are_cached_until_the_version_changes(closet):
+    first = closet.get_all_items()
+    assert closet.get_all_items() == first
+
+    closet.update_item("1", {"type": "jacket"})
+    assert closet.get_all_items()[0]["type"] == "jacket"
+
+
+def test_older_schemas_are_migrated(closet):
+    # A version 2 database: raw type values and no type index
+    conn = closet._connection()
+    conn.execute("DROP INDEX idx_items_type")
+    conn.execute("UPDATE items SET type = 'Shirt'")
+    conn.execute("PRAGMA user_version = 2")
+
+    reopened = SqliteClosetStorage()
+    conn = reopened._connection()
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT data FROM items WHERE type = 'shirt'"
+    ).fetchall()
+    assert any("idx_items_type" in row[-1] for row in plan)
+    assert [item["id"] for item in reopened.query_items(item_type="Shirt")[0]] == ["1"]